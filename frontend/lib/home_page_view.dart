@@ -440,6 +440,16 @@ Widget _buildHeader(BuildContext context, LeonardoService leonardo) {
             ),
           ),
         ),
+
+        // Sessione interrotta con lo stesso obiettivo: riprenderla invece di ricominciare
+        if (leonardo.canResume) ...[
+          const SizedBox(height: 12),
+          TextButton(
+            onPressed: () => leonardo.acknowledgeAdvice(resume: true),
+            child: const Text("RESUME THE INTERRUPTED SESSION",
+              style: TextStyle(fontSize: 13, letterSpacing: 1.2, fontWeight: FontWeight.bold)),
+          ),
+        ],
       ],
     );
   }
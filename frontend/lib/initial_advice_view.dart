@@ -643,25 +643,41 @@ class _HomeScreenState extends State<HomeScreen> with TickerProviderStateMixin {
         if (leonardo.isGeneratingReport)
           GlassCard(
             padding: const EdgeInsets.all(20),
-            child: Row(
-              mainAxisAlignment: MainAxisAlignment.center,
+            child: Column(
               children: [
-                SizedBox(
-                  width: 20,
-                  height: 20,
-                  child: CircularProgressIndicator(
-                    strokeWidth: 2,
-                    color: LeonardoTheme.accent,
-                  ),
+                Row(
+                  mainAxisAlignment: MainAxisAlignment.center,
+                  children: [
+                    SizedBox(
+                      width: 20,
+                      height: 20,
+                      child: CircularProgressIndicator(
+                        strokeWidth: 2,
+                        color: LeonardoTheme.accent,
+                      ),
+                    ),
+                    const SizedBox(width: 16),
+                    Text(
+                      "Leonardo is inscribing his observations...",
+                      style: GoogleFonts.inter(
+                        fontStyle: FontStyle.italic,
+                        color: LeonardoTheme.inkLight,
+                      ),
+                    ),
+                  ],
                 ),
-                const SizedBox(width: 16),
-                Text(
-                  "Leonardo is inscribing his observations...",
-                  style: GoogleFonts.inter(
-                    fontStyle: FontStyle.italic,
-                    color: LeonardoTheme.inkLight,
+                // Il Codex appare mentre viene scritto
+                if (leonardo.streamingReport != null) ...[
+                  const SizedBox(height: 16),
+                  ConstrainedBox(
+                    constraints: const BoxConstraints(maxHeight: 320),
+                    child: Markdown(
+                      data: leonardo.streamingReport!,
+                      padding: EdgeInsets.zero,
+                      shrinkWrap: true,
+                    ),
                   ),
-                ),
+                ],
               ],
             ),
           )
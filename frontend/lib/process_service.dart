@@ -1,11 +1,16 @@
 import 'dart:convert';
 import 'dart:io';
 import 'package:flutter/foundation.dart';
+import 'package:flutter/widgets.dart';
 import 'package:universal_io/io.dart';
 import 'package:path/path.dart' as p;
 
-class LeonardoService extends ChangeNotifier {
+class LeonardoService extends ChangeNotifier with WidgetsBindingObserver {
   Process? _process;
+
+  LeonardoService() {
+    WidgetsBinding.instance.addObserver(this);
+  }
   
   // Stato UI
   bool isRunning = false;
@@ -16,6 +21,7 @@ class LeonardoService extends ChangeNotifier {
   // Gestione Consigli Iniziali
   String? initialAdvice; 
   bool isAdviceAcknowledged = false;
+  bool canResume = false; // sessione interrotta (crash) con lo stesso obiettivo: si può riprendere
 
   // Dati in tempo reale
   String activeWindow = "Waiting...";
@@ -23,12 +29,15 @@ class LeonardoService extends ChangeNotifier {
   int switches = 0;
   int keyPresses = 0;
   int mouseClicks = 0;
+  int mouseDistance = 0; // pixel percorsi dal puntatore ('mouse')
   List<dynamic> topApps = [];
   
   // Report finale
   String? finalReport;
+  String? streamingReport; // Codex in arrivo (report_chunk), sostituito dal report finale
   Map<String, dynamic>? finalStats; // ⭐ AGGIUNTO per metriche reali
   Map<String, dynamic>? reportStats; // Manteniamo per compatibilità
+  Map<String, dynamic>? liveStats; // Risposta a STATS durante la sessione
 
   // Feedback Leonardo
   String emotion = "neutral"; 
@@ -54,18 +63,22 @@ class LeonardoService extends ChangeNotifier {
     );
   }
   
-  final String scriptName = 'trackers.py';
+  // LEO_DAEMON=1: lancia lo shim, che riusa un processo Python già caldo (vedi daemon.py)
+  final String scriptName =
+      Platform.environment['LEO_DAEMON'] == '1' ? 'daemon.py' : 'trackers.py';
   
   Future<void> startSession(String context) async {
     currentContext = context;
     isRunning = true;
     finalReport = null;
+    streamingReport = null;
     finalStats = null; // ⭐ Reset stats
     reportStats = null;
     
     // Reset advice per la nuova sessione
     initialAdvice = null;
     isAdviceAcknowledged = false;
+    canResume = false;
     isWaitingForAdvice = true;
     
     // Reset metriche
@@ -126,6 +139,7 @@ class LeonardoService extends ChangeNotifier {
         case 'initial_advice':
           print("📜 Advice received from Python");
           initialAdvice = data['content'];
+          canResume = data['resumable'] == true;
           isWaitingForAdvice = false;
           isAdviceAcknowledged = false;
           notifyListeners();
@@ -135,12 +149,14 @@ class LeonardoService extends ChangeNotifier {
         // UPDATE REAL-TIME (ogni secondo)
         // ============================================
         case 'update':
-          activeWindow = data['active_window'] ?? "Idle";
-          totalTime = data['total_time'] ?? 0;
-          switches = data['switches'] ?? 0;
-          keyPresses = data['keys'] ?? 0;
-          mouseClicks = data['mouse'] ?? 0;
-          topApps = data['top_apps'] ?? [];
+          // Dopo il primo pacchetto ("full": true) arrivano solo i campi cambiati
+          activeWindow = data['active_window'] ?? activeWindow;
+          totalTime = data['total_time'] ?? totalTime;
+          switches = data['switches'] ?? switches;
+          keyPresses = data['keys'] ?? keyPresses;
+          mouseDistance = data['mouse'] ?? mouseDistance;
+          mouseClicks = data['clicks'] ?? mouseClicks;
+          topApps = data['top_apps'] ?? topApps;
           notifyListeners();
           break;
 
@@ -225,6 +241,17 @@ class LeonardoService extends ChangeNotifier {
           notifyListeners();
           break;
 
+        // ============================================
+        // REPORT IN STREAMING (pezzi in ordine, poi arriva 'report')
+        // ============================================
+        case 'report_chunk':
+          isGeneratingReport = true;
+          // reset: il provider è cambiato a metà, il testo ricevuto finora non vale più
+          final prefix = data['reset'] == true ? "" : (streamingReport ?? "");
+          streamingReport = prefix + (data['content'] ?? "");
+          notifyListeners();
+          break;
+
         // ============================================
         // REPORT FINALE ⭐ CON STATS COMPLETO
         // ============================================
@@ -232,6 +259,7 @@ class LeonardoService extends ChangeNotifier {
           print("📊 Report ricevuto da Python");
           
           finalReport = data['content'];
+          streamingReport = null;
           
           // ⭐ Estrai stats completo
           if (data.containsKey('stats')) {
@@ -260,6 +288,23 @@ class LeonardoService extends ChangeNotifier {
           _process?.kill(); 
           break;
 
+        // ============================================
+        // COMANDI (risposte a RATE / PAUSE / STATS ...)
+        // ============================================
+        case 'stats':
+          liveStats = data['stats'] as Map<String, dynamic>?;
+          notifyListeners();
+          break;
+
+        case 'ack':
+          if (data['ok'] == false) {
+            print("⚠️ Command ${data['command']} rejected: ${data['message']}");
+          }
+          break;
+
+        case 'protocol':
+          break;
+
         // ============================================
         // ERRORE
         // ============================================
@@ -297,10 +342,12 @@ class LeonardoService extends ChangeNotifier {
   // ============================================
   // ACKNOWLEDGE ADVICE (sblocca Python)
   // ============================================
-  void acknowledgeAdvice() {
+  void acknowledgeAdvice({bool resume = false}) {
     print("✅ User acknowledged advice");
-    _process?.stdin.writeln('START'); 
+    // START RESUME riprende la sessione interrotta, START ne inizia una nuova
+    _process?.stdin.writeln(resume && canResume ? 'START RESUME' : 'START');
     isAdviceAcknowledged = true;
+    canResume = false;
     notifyListeners();
   }
 
@@ -315,6 +362,35 @@ class LeonardoService extends ChangeNotifier {
     await Future.delayed(const Duration(milliseconds: 500));
   }
 
+  // ============================================
+  // COMANDI LIVE (vedi leonardo_backend/trackers/commands.py)
+  // ============================================
+  void sendCommand(String command) {
+    _process?.stdin.writeln(command);
+  }
+
+  // Intervallo minimo tra i pacchetti "update" (es. 5000 quando la finestra è in background)
+  void setUpdateRate(int milliseconds) => sendCommand('RATE $milliseconds');
+
+  void pauseUpdates() => sendCommand('PAUSE');
+
+  // Riprende lo stream e riceve subito un pacchetto completo
+  void resumeUpdates() => sendCommand('RESUME');
+
+  void requestStats() => sendCommand('STATS');
+
+  // Finestra nascosta/minimizzata: aggiornamenti lenti; di nuovo visibile: veloci + snapshot
+  @override
+  void didChangeAppLifecycleState(AppLifecycleState state) {
+    if (!isRunning) return;
+    if (state == AppLifecycleState.resumed) {
+      setUpdateRate(1000);
+      sendCommand('SNAPSHOT');
+    } else if (state == AppLifecycleState.hidden || state == AppLifecycleState.paused) {
+      setUpdateRate(5000);
+    }
+  }
+
   // ============================================
   // RESET (nuova sessione)
   // ============================================
@@ -323,8 +399,10 @@ class LeonardoService extends ChangeNotifier {
     
     // Report e stats
     finalReport = null;
+    streamingReport = null;
     finalStats = null;
     reportStats = null;
+    liveStats = null;
     
     // Stato sessione
     isRunning = false;
@@ -336,12 +414,14 @@ class LeonardoService extends ChangeNotifier {
     switches = 0;
     keyPresses = 0;
     mouseClicks = 0;
+    mouseDistance = 0;
     topApps = [];
     
     // Context e consigli
     currentContext = "";
     initialAdvice = null;
     isAdviceAcknowledged = false;
+    canResume = false;
     isWaitingForAdvice = false;
     
     // Leonardo feedback
@@ -378,6 +458,7 @@ class LeonardoService extends ChangeNotifier {
   // ============================================
   @override
   void dispose() {
+    WidgetsBinding.instance.removeObserver(this);
     _process?.kill();
     super.dispose();
   }
@@ -0,0 +1,233 @@
+import threading
+import time
+from collections import deque, namedtuple
+
+# ============================================
+# TIME ACCOUNTING
+# ============================================
+# Instead of adding 0.5 s to every window ever seen on every tick, the
+# accountant records when windows enter and leave the foreground (monotonic
+# clock) and derives foreground / background time when somebody asks.
+# Every update touches at most the current window, so a tick is O(1).
+
+
+class _TopClosed:
+    """
+    The k largest closed foreground totals, kept incrementally.
+    Totals only ever grow, so an entry that drops out can only come back by
+    growing again, which goes through update() like any other change.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self.items = []   # [(seconds, window)], largest first
+
+    def update(self, window, seconds):
+        items = self.items
+        for i, (_, w) in enumerate(items):
+            if w == window:
+                items[i] = (seconds, window)
+                break
+        else:
+            if len(items) >= self.k and seconds <= items[-1][0]:
+                return
+            items.append((seconds, window))
+        items.sort(reverse=True)
+        del items[self.k:]
+
+
+class TimeAccountant:
+    """Enter/leave bookkeeping per window with lazily derived totals"""
+
+    def __init__(self, clock=time.monotonic, top_k=10):
+        self._clock = clock
+        self._top = _TopClosed(top_k)
+        self._foreground = {}   # window -> seconds spent in front (closed intervals only)
+        self._first_seen = {}   # window -> when it first came to the foreground
+        self._reading = {}      # window -> seconds in front while the user was active
+        self._current = None
+        self._entered_at = None
+
+    @property
+    def current(self):
+        return self._current
+
+    def switch(self, window, at=None):
+        """Close the interval of the current window and open one for `window` (None = nothing)"""
+        at = self._clock() if at is None else at
+        if self._entered_at is not None and at < self._entered_at:
+            at = self._entered_at   # late event: never count negative time
+        if self._current is not None:
+            total = self._foreground.get(self._current, 0.0) + (at - self._entered_at)
+            self._foreground[self._current] = total
+            self._top.update(self._current, total)
+        self._current = window
+        self._entered_at = at
+        if window is not None:
+            self._first_seen.setdefault(window, at)
+            self._foreground.setdefault(window, 0.0)
+
+    def restore(self, foreground, background, reading, at=None):
+        """Continue from checkpointed totals (session recovery); nothing is in front yet"""
+        at = self._clock() if at is None else at
+        for window, seconds in foreground.items():
+            self._foreground[window] = seconds
+            self._first_seen[window] = at - seconds - background.get(window, 0.0)
+            self._top.update(window, seconds)
+        self._reading = dict(reading)
+
+    def add_reading(self, seconds):
+        """Credit active (reading/working) time to the window currently in front"""
+        if self._current is not None:
+            self._reading[self._current] = self._reading.get(self._current, 0.0) + seconds
+
+    # -----------------------------
+    # DERIVED VALUES (computed on read)
+    # -----------------------------
+    def foreground_time(self, window, at=None):
+        total = self._foreground.get(window, 0.0)
+        if window is not None and window == self._current:
+            total += (self._clock() if at is None else at) - self._entered_at
+        return total
+
+    def top(self, n=5, at=None):
+        """
+        [(window, seconds)] for the n longest-used windows, without a full sort.
+        Only the current window's total is growing, so it is enough to merge
+        its live value into the closed top list (which keeps n + 1 spares).
+        """
+        candidates = [(seconds, w) for seconds, w in self._top.items if w != self._current]
+        if self._current is not None:
+            candidates.append((self.foreground_time(self._current, at), self._current))
+        candidates.sort(reverse=True)
+        return [(w, seconds) for seconds, w in candidates[:n]]
+
+    def background_time(self, window, at=None):
+        """Time since the window was first seen that it did NOT spend in front"""
+        first = self._first_seen.get(window)
+        if first is None:
+            return 0.0
+        at = self._clock() if at is None else at
+        return max(0.0, (at - first) - self.foreground_time(window, at))
+
+    def reading_time(self, window):
+        return self._reading.get(window, 0.0)
+
+    def windows(self):
+        return list(self._first_seen)
+
+    def foreground_times(self, at=None):
+        at = self._clock() if at is None else at
+        return {w: self.foreground_time(w, at) for w in self._first_seen}
+
+    def background_times(self, at=None):
+        at = self._clock() if at is None else at
+        return {w: self.background_time(w, at) for w in self._first_seen}
+
+    def reading_times(self):
+        return dict(self._reading)
+
+
+# ============================================
+# ACCOUNTING ENGINE (single writer)
+# ============================================
+# The monitor thread, the window source and the report loop all used to add
+# elapsed time into the same dicts without a lock, so time was counted twice.
+# Now they only post events; the engine applies them in order under one lock
+# and hands out consistent snapshots for the UI packets and the final stats.
+
+AccountingSnapshot = namedtuple(
+    "AccountingSnapshot",
+    ["foreground", "background", "reading", "distracted", "hourly", "current"]
+)
+
+_SWITCH = 0
+_READING = 1
+_DISTRACTED = 2
+_ACTIVITY = 3
+
+
+class AccountingEngine:
+    """Owns every time counter; other threads only post events"""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._events = deque()          # append/popleft are atomic, no lock needed to post
+        self._apply_lock = threading.Lock()
+        self._accountant = TimeAccountant(clock)
+        self._distracted = 0.0
+        self._hourly = {}
+
+    # -----------------------------
+    # PRODUCERS (any thread)
+    # -----------------------------
+    def switch(self, window, at=None):
+        """`at`: when the switch happened (same clock as the engine), default now"""
+        self._events.append((_SWITCH, window, self._clock() if at is None else at))
+
+    def add_reading(self, seconds):
+        self._events.append((_READING, seconds, None))
+
+    def add_distracted(self, seconds):
+        self._events.append((_DISTRACTED, seconds, None))
+
+    def add_activity(self, hour, seconds):
+        self._events.append((_ACTIVITY, hour, seconds))
+
+    # -----------------------------
+    # WRITER
+    # -----------------------------
+    def _drain(self):
+        events = self._events
+        accountant = self._accountant
+        while events:
+            kind, a, b = events.popleft()
+            if kind == _SWITCH:
+                accountant.switch(a, b)
+            elif kind == _READING:
+                accountant.add_reading(a)
+            elif kind == _DISTRACTED:
+                self._distracted += a
+            elif kind == _ACTIVITY:
+                self._hourly[a] = self._hourly.get(a, 0.0) + b
+
+    def restore(self, snapshot):
+        """Start again from a checkpointed snapshot() (as plain dicts, hourly keys may be strings)"""
+        with self._apply_lock:
+            self._events.clear()
+            self._accountant = TimeAccountant(self._clock)
+            self._accountant.restore(snapshot["foreground"], snapshot.get("background") or {},
+                                     snapshot.get("reading") or {})
+            self._distracted = snapshot.get("distracted", 0.0)
+            self._hourly = {int(hour): seconds for hour, seconds in (snapshot.get("hourly") or {}).items()}
+
+    def top(self, n=5):
+        """Top-n windows by foreground time; cost does not depend on how many windows were seen"""
+        with self._apply_lock:
+            self._drain()
+            return self._accountant.top(n)
+
+    def distracted_time(self):
+        with self._apply_lock:
+            self._drain()
+            return self._distracted
+
+    def snapshot(self, include_background=False):
+        """Apply pending events and return a consistent view of every counter"""
+        with self._apply_lock:
+            self._drain()
+            at = self._clock()
+            accountant = self._accountant
+            return AccountingSnapshot(
+                foreground=accountant.foreground_times(at),
+                background=accountant.background_times(at) if include_background else None,
+                reading=accountant.reading_times(),
+                distracted=self._distracted,
+                hourly=dict(self._hourly),
+                current=accountant.current
+            )
+
+
+def top_windows(foreground, n=5):
+    """[(window, seconds), ...] sorted by time, longest first"""
+    return sorted(foreground.items(), key=lambda x: x[1], reverse=True)[:n]
@@ -0,0 +1,141 @@
+import json
+import os
+import time
+
+# ============================================
+# CHECKPOINT JOURNAL
+# ============================================
+# Crash safety for a running session. Every few seconds the tracker hands
+# its resumable state to checkpoint(); only what changed since the previous
+# checkpoint is appended, as one small JSON line:
+#
+#   {"t": "delta", "set": {...}, "merge": {key: {sub: value}}, "append": {key: [items]}}
+#
+# Every `snapshot_every` seconds the journal is compacted: the full state is
+# written to a temp file that replaces the journal, so recovery reads one
+# snapshot plus at most a few minutes of deltas, never the whole session.
+# A torn last line (crash mid-write) is ignored on load.
+
+_MISSING = object()
+
+
+def _plain(state):
+    """Deep copy through JSON: also proves the state is serializable"""
+    return json.loads(json.dumps(state))
+
+
+def diff_state(old, new):
+    """(set, merge, append) turning `old` into `new`, one level deep for dicts and lists"""
+    set_, merge, append = {}, {}, {}
+    for key, value in new.items():
+        previous = old.get(key, _MISSING)
+        if previous == value:
+            continue
+        if isinstance(value, list) and isinstance(previous, list) \
+                and len(value) >= len(previous) and value[:len(previous)] == previous:
+            append[key] = value[len(previous):]
+        elif isinstance(value, dict) and isinstance(previous, dict) and not (previous.keys() - value.keys()):
+            merge[key] = {k: v for k, v in value.items() if previous.get(k, _MISSING) != v}
+        else:
+            set_[key] = value
+    return set_, merge, append
+
+
+def apply_delta(state, record):
+    for key, value in record.get("set", {}).items():
+        state[key] = value
+    for key, changes in record.get("merge", {}).items():
+        state.setdefault(key, {}).update(changes)
+    for key, items in record.get("append", {}).items():
+        state.setdefault(key, []).extend(items)
+    return state
+
+
+class CheckpointJournal:
+    """Append-only journal of one session's state: a snapshot followed by deltas"""
+
+    def __init__(self, path, snapshot_every=300.0, clock=time.time):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self._clock = clock
+        self._last = None
+        self._last_snapshot_at = None
+        self._file = None
+        self.deltas_written = 0
+        self.snapshots_written = 0
+
+    def checkpoint(self, state):
+        """Record `state`; cheap when little changed (one short line, no fsync)"""
+        state = _plain(state)
+        now = self._clock()
+        if self._last is None or now - self._last_snapshot_at >= self.snapshot_every:
+            self._write_snapshot(state, now)
+            return
+        set_, merge, append = diff_state(self._last, state)
+        if not (set_ or merge or append):
+            return
+        record = {"t": "delta", "ts": now}
+        if set_:
+            record["set"] = set_
+        if merge:
+            record["merge"] = merge
+        if append:
+            record["append"] = append
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        # Flushed to the OS: survives the process being killed (not a power cut)
+        self._file.flush()
+        self._last = state
+        self.deltas_written += 1
+
+    def _write_snapshot(self, state, now):
+        # Compaction: the new journal is just this snapshot, swapped in atomically
+        if self._file is not None:
+            self._file.close()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"t": "snapshot", "ts": now, "state": state}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._last = state
+        self._last_snapshot_at = now
+        self.snapshots_written += 1
+
+    def finish(self):
+        """Session delivered its report: nothing left to recover"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._last = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def load(path, max_age=None, clock=time.time):
+        """(state, last write time) of an unfinished session, or None"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError:
+            return None
+        state = None
+        last_ts = None
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break   # torn write: everything before it is still good
+            if record.get("t") == "snapshot":
+                state = record["state"]
+            elif record.get("t") == "delta" and state is not None:
+                apply_delta(state, record)
+            last_ts = record.get("ts", last_ts)
+        if state is None:
+            return None
+        if max_age is not None and last_ts is not None and clock() - last_ts > max_age:
+            return None
+        return state, last_ts
@@ -0,0 +1,129 @@
+import re
+from collections import namedtuple
+
+# ============================================
+# WINDOW TITLE CLASSIFIER
+# ============================================
+# All the "is this a system window / a distraction / a browser" questions are
+# answered by one compiled multi-pattern matcher, built once from the config
+# lists, and memoized per normalized (title, document) pair.
+
+TitleClass = namedtuple(
+    "TitleClass",
+    ["system", "productive", "distracting", "distracting_tab", "browser", "category"]
+)
+
+BROWSERS = ["Chrome", "Safari", "Firefox", "Edge", "Arc"]
+SHARING_NOTICES = ["compartiendo tu pantalla", "is sharing your screen"]
+
+_KIND_SYSTEM = "system"
+_KIND_DISTRACTING = "distracting"
+_KIND_BROWSER = "browser"
+
+
+class _MultiMatcher:
+    """
+    Finds every term occurring in a string with a single regex scan.
+    Terms are tried longest-first inside a lookahead, so at each position the
+    longest term wins and shorter terms that are its prefixes are recovered
+    from a precomputed table instead of being shadowed.
+    """
+
+    def __init__(self, terms_by_kind, word_bounded=()):
+        terms = {}
+        for kind, words in terms_by_kind.items():
+            for word in words:
+                word = word.lower()
+                if word:
+                    terms.setdefault(word, set()).add(kind)
+
+        self._word_bounded = set(word_bounded)
+        self._prefixes = {}
+        for term in terms:
+            self._prefixes[term] = [
+                (kind, len(other))
+                for other, kinds in terms.items() if term.startswith(other)
+                for kind in kinds
+            ]
+
+        if terms:
+            ordered = sorted(terms, key=len, reverse=True)
+            self._regex = re.compile("(?=(" + "|".join(re.escape(t) for t in ordered) + "))")
+        else:
+            self._regex = None
+
+    def kinds(self, text):
+        found = set()
+        if self._regex is None or not text:
+            return found
+        for match in self._regex.finditer(text):
+            start = match.start(1)
+            for kind, length in self._prefixes[match.group(1)]:
+                if kind in self._word_bounded and not _is_word(text, start, start + length):
+                    continue
+                found.add(kind)
+        return found
+
+
+def _is_word(text, start, end):
+    before = text[start - 1] if start > 0 else " "
+    after = text[end] if end < len(text) else " "
+    return not before.isalnum() and not after.isalnum()
+
+
+class TitleClassifier:
+    """Classify a window title (plus its document/tab name) in one pass"""
+
+    def __init__(self, system_processes, distracting_apps, productive_apps,
+                 browser_distractions, app_categories, max_memo=4096):
+        self._title_matcher = _MultiMatcher(
+            {
+                _KIND_SYSTEM: list(system_processes) + SHARING_NOTICES,
+                _KIND_DISTRACTING: distracting_apps,
+                _KIND_BROWSER: BROWSERS,
+            },
+            word_bounded=(_KIND_BROWSER,)
+        )
+        self._doc_matcher = _MultiMatcher({_KIND_DISTRACTING: browser_distractions})
+        self._productive = {app.lower() for app in productive_apps}
+        self._categories = {}
+        for category, apps in app_categories.items():
+            for app in apps:
+                self._categories.setdefault(app.lower(), category)
+        self._memo = {}
+        self._max_memo = max_memo
+
+    def classify(self, title, doc_name=""):
+        key = ((title or "").strip().lower(), (doc_name or "").lower())
+        result = self._memo.get(key)
+        if result is None:
+            result = self._classify(*key)
+            if len(self._memo) >= self._max_memo:
+                self._memo.clear()
+            self._memo[key] = result
+        return result
+
+    def _classify(self, title, doc):
+        if len(title) < 2:
+            return TitleClass(True, False, False, False, False, "other")
+
+        kinds = self._title_matcher.kinds(title)
+        browser = _KIND_BROWSER in kinds
+        distracting_tab = browser and bool(self._doc_matcher.kinds(doc))
+        distracting = _KIND_DISTRACTING in kinds or distracting_tab
+
+        category = self._categories.get(title)
+        if category is None:
+            category = "distracting" if distracting_tab else "other"
+
+        return TitleClass(
+            system=_KIND_SYSTEM in kinds,
+            productive=title in self._productive,
+            distracting=distracting,
+            distracting_tab=distracting_tab,
+            browser=browser,
+            category=category
+        )
+
+    def memo_size(self):
+        return len(self._memo)
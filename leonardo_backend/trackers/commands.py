@@ -0,0 +1,74 @@
+import threading
+
+# ============================================
+# STDIN COMMAND PROTOCOL
+# ============================================
+# One command per line from Flutter:
+#
+#   START / STOP               session control (unchanged)
+#   PROTO <framing>            pre-START only, see packets.py
+#   RATE <ms>                  minimum interval between "update" packets
+#   PAUSE / RESUME             stop / restart the "update" stream (tracking continues)
+#   SNAPSHOT                   send a full "update" packet now
+#   STATS                      send a "stats" packet with the running totals
+#   SUBSCRIBE <t1,t2,...>      only emit these packet types ("ALL" restores everything)
+#
+# Packets the UI cannot work without are always delivered.
+
+ALWAYS_DELIVERED = {"report", "status", "error", "protocol", "ack", "stats"}
+
+MIN_RATE_MS = 100
+MAX_RATE_MS = 60000
+
+
+class CommandError(ValueError):
+    pass
+
+
+def parse_command(line):
+    """'RATE 500' -> ('RATE', ['500']); blank lines -> (None, [])"""
+    parts = line.strip().split()
+    if not parts:
+        return None, []
+    return parts[0].upper(), parts[1:]
+
+
+class OutputControl:
+    """What the UI asked to receive, shared by the command thread and the report loop"""
+
+    def __init__(self, update_interval=1.0):
+        self.update_interval = update_interval
+        self.paused = False
+        self.subscriptions = None        # None = every packet type
+        self._snapshot_requested = threading.Event()
+
+    def allows(self, packet_type):
+        if packet_type in ALWAYS_DELIVERED:
+            return True
+        if self.paused and packet_type == "update":
+            return False
+        return self.subscriptions is None or packet_type in self.subscriptions
+
+    def set_rate(self, args):
+        if len(args) != 1 or not args[0].isdigit():
+            raise CommandError("Usage: RATE <milliseconds>")
+        ms = min(MAX_RATE_MS, max(MIN_RATE_MS, int(args[0])))
+        self.update_interval = ms / 1000.0
+        return ms
+
+    def subscribe(self, args):
+        types = {t.strip().lower() for arg in args for t in arg.split(",") if t.strip()}
+        if not types:
+            raise CommandError("Usage: SUBSCRIBE <packet types, comma separated> | ALL")
+        self.subscriptions = None if "all" in types else types
+        return sorted(types)
+
+    def request_snapshot(self):
+        self._snapshot_requested.set()
+
+    def take_snapshot_request(self):
+        """True once per SNAPSHOT/RESUME (the report loop then sends a full packet)"""
+        if self._snapshot_requested.is_set():
+            self._snapshot_requested.clear()
+            return True
+        return False
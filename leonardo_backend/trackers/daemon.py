@@ -0,0 +1,306 @@
+import asyncio
+import hmac
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+# ============================================
+# DAEMON MODE
+# ============================================
+# Starting trackers.py for every session pays for importing pynput, tkinter
+# and the LLM clients and for starting the input listeners before the user
+# sees anything. In daemon mode one warm tracker process keeps all of that
+# loaded and runs a session per connection:
+#
+#   client -> "OPEN <user context>\n", then the usual START / STOP / RATE ... lines
+#   daemon -> the usual packets, connection closed when the session ends
+#
+# Other first lines: "PING" (answers a pong packet) and "QUIT" (stops the daemon).
+# Sessions share one keyboard and one mouse, so they run one at a time;
+# every session starts from freshly reset state.
+#
+#   python trackers.py --daemon           warm tracker process
+#   python daemon.py "<user context>"     stdin/stdout shim with the trackers.py contract
+#
+# LEO_DAEMON_ADDRESS: unix:/path/to.sock or tcp:127.0.0.1:47820
+# (default: ~/.leofocus/daemon.sock, TCP on Windows)
+#
+# The unix socket is created owner-only. Any local user can reach a TCP
+# port, so over TCP the daemon writes a random token to an owner-only file
+# (LEO_DAEMON_TOKEN_PATH, default ~/.leofocus/daemon.token) and a client's
+# first line must be "AUTH <token>".
+
+DEFAULT_TCP_PORT = 47820
+IDLE_EXIT_SECONDS = float(os.environ.get("LEO_DAEMON_IDLE_EXIT", "1800"))
+
+
+def default_address():
+    address = os.environ.get("LEO_DAEMON_ADDRESS")
+    if address:
+        return address
+    if sys.platform.startswith("win") or not hasattr(socket, "AF_UNIX"):
+        return f"tcp:127.0.0.1:{DEFAULT_TCP_PORT}"
+    return "unix:" + os.path.join(os.path.expanduser("~"), ".leofocus", "daemon.sock")
+
+
+def default_token_path():
+    return os.environ.get("LEO_DAEMON_TOKEN_PATH",
+                          os.path.join(os.path.expanduser("~"), ".leofocus", "daemon.token"))
+
+
+def write_token(path):
+    """New random token in a file only this user can read; returns the token"""
+    token = secrets.token_hex(32)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        os.unlink(tmp)      # O_CREAT keeps the mode of a file that already exists
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(token)
+    os.replace(tmp, path)
+    return token
+
+
+def read_token(path=None):
+    try:
+        with open(path or default_token_path(), "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def parse_address(address):
+    """'unix:/tmp/x.sock' -> ('unix', '/tmp/x.sock'); 'tcp:host:port' -> ('tcp', (host, port))"""
+    kind, _, rest = address.partition(":")
+    if kind == "unix" and rest:
+        return "unix", rest
+    if kind == "tcp":
+        host, _, port = rest.rpartition(":")
+        return "tcp", (host or "127.0.0.1", int(port))
+    raise ValueError(f"Bad daemon address '{address}' (expected unix:<path> or tcp:<host>:<port>)")
+
+
+# -----------------------------
+# SERVER SIDE
+# -----------------------------
+class ConnectionStream:
+    """File-like view of a connection, so the packet writers can use it like stdout"""
+
+    def __init__(self, writer, binary=False):
+        self._writer = writer
+        self._binary = binary
+        self._loop = asyncio.get_running_loop()
+
+    @property
+    def buffer(self):
+        return ConnectionStream(self._writer, binary=True)
+
+    def write(self, data):
+        if not self._binary:
+            data = data.encode("utf-8")
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._writer.write(data)
+        else:
+            self._loop.call_soon_threadsafe(self._writer.write, data)
+
+    def flush(self):
+        # The transport buffers and sends on its own
+        pass
+
+
+class SessionDaemon:
+    """
+    Accepts connections and runs session_factory(user_context, readline, stream)
+    for each one. The factory is injected so this module never imports the tracker.
+    """
+
+    def __init__(self, session_factory, address=None, idle_exit=IDLE_EXIT_SECONDS, token_path=None):
+        self._session_factory = session_factory
+        self.address = address or default_address()
+        self.idle_exit = idle_exit
+        self.token_path = token_path or default_token_path()
+        self._token = None      # TCP only
+        self._busy = False
+        self._last_activity = time.monotonic()
+        self._server = None
+        self.sessions_served = 0
+
+    async def serve(self):
+        kind, target = parse_address(self.address)
+        if kind == "unix":
+            os.makedirs(os.path.dirname(target) or ".", mode=0o700, exist_ok=True)
+            if os.path.exists(target):
+                os.unlink(target)   # left over by a daemon that died
+            # Owner-only from the moment it exists (a chmod after bind() leaves a window)
+            old_umask = os.umask(0o177)
+            try:
+                self._server = await asyncio.start_unix_server(self._handle, target)
+            finally:
+                os.umask(old_umask)
+        else:
+            self._token = write_token(self.token_path)
+            self._server = await asyncio.start_server(self._handle, *target)
+
+        print(f"Leo daemon listening on {self.address}", file=sys.stderr)
+        watchdog = asyncio.create_task(self._exit_when_idle())
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            watchdog.cancel()
+            if kind == "unix" and os.path.exists(target):
+                os.unlink(target)
+            if self._token is not None and read_token(self.token_path) == self._token:
+                os.unlink(self.token_path)
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+
+    async def _exit_when_idle(self):
+        # Nobody needs a warm process forever
+        while self.idle_exit > 0:
+            await asyncio.sleep(min(60.0, self.idle_exit))
+            if not self._busy and time.monotonic() - self._last_activity > self.idle_exit:
+                print("Leo daemon idle, exiting", file=sys.stderr)
+                self.close()
+                return
+
+    async def _handle(self, reader, writer):
+        async def readline():
+            return (await reader.readline()).decode("utf-8", "replace")
+
+        self._last_activity = time.monotonic()
+        try:
+            if self._token is not None:
+                given = (await readline()).strip().encode("utf-8")
+                if not hmac.compare_digest(given, ("AUTH " + self._token).encode("utf-8")):
+                    writer.write(b'{"type": "error", "message": "Not authorized"}\n')
+                    return
+            command, _, user_context = (await readline()).strip().partition(" ")
+            command = command.upper()
+            if command == "PING":
+                writer.write(b'{"type": "pong"}\n')
+            elif command == "QUIT":
+                self.close()
+            elif command != "OPEN":
+                writer.write(b'{"type": "error", "message": "Expected OPEN <user context>"}\n')
+            elif self._busy:
+                writer.write(b'{"type": "error", "message": "A session is already running"}\n')
+            else:
+                self._busy = True
+                try:
+                    await self._session_factory(user_context or "General Work Session",
+                                                readline, ConnectionStream(writer))
+                    self.sessions_served += 1
+                finally:
+                    self._busy = False
+                    self._last_activity = time.monotonic()
+        except Exception as e:
+            print(f"Daemon session failed: {e!r}", file=sys.stderr)
+        finally:
+            try:
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+
+# -----------------------------
+# CLIENT SIDE (shim)
+# -----------------------------
+def connect(address=None, timeout=1.0, token_path=None):
+    """Connected (and over TCP authenticated) socket to the daemon, or None if nobody is listening"""
+    kind, target = parse_address(address or default_address())
+    family = socket.AF_UNIX if kind == "unix" else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(target)
+        if kind == "tcp":
+            token = read_token(token_path)
+            if token is None:
+                raise OSError("no daemon token")
+            sock.sendall(("AUTH " + token + "\n").encode("utf-8"))
+    except OSError:
+        sock.close()
+        return None
+    sock.settimeout(None)
+    return sock
+
+
+def spawn_daemon(tracker_script):
+    """Start `trackers.py --daemon` detached from this shim"""
+    kwargs = {"stdin": subprocess.DEVNULL, "stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+    if sys.platform.startswith("win"):
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    subprocess.Popen([sys.executable, "-u", tracker_script, "--daemon"], **kwargs)
+
+
+def _pump_stdin(sock):
+    stdin = sys.stdin.buffer
+    try:
+        for line in iter(stdin.readline, b""):
+            sock.sendall(line)
+    except OSError:
+        return
+    # Flutter closed our stdin: the daemon treats EOF as STOP
+    try:
+        sock.shutdown(socket.SHUT_WR)
+    except OSError:
+        pass
+
+
+def run_shim(user_context, address=None, tracker_script=None, start_timeout=15.0):
+    """
+    Relay stdin/stdout to a daemon session. Starts the daemon if needed;
+    returns None when it cannot be reached (the caller then runs the tracker directly).
+    """
+    sock = connect(address)
+    if sock is None and tracker_script:
+        spawn_daemon(tracker_script)
+        deadline = time.monotonic() + start_timeout
+        while sock is None and time.monotonic() < deadline:
+            time.sleep(0.1)
+            sock = connect(address)
+    if sock is None:
+        return None
+
+    sock.sendall(("OPEN " + " ".join(user_context.split()) + "\n").encode("utf-8"))
+    threading.Thread(target=_pump_stdin, args=(sock,), name="shim-stdin", daemon=True).start()
+
+    # Bytes are copied as-is, so binary framing (PROTO) works through the shim too
+    stdout = sys.stdout.buffer
+    while True:
+        data = sock.recv(65536)
+        if not data:
+            break
+        stdout.write(data)
+        stdout.flush()
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    context = sys.argv[1] if len(sys.argv) > 1 else "General Work Session"
+    tracker = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trackers.py")
+    code = run_shim(context, tracker_script=tracker)
+    if code is None:
+        # No daemon: same behaviour as launching the tracker directly
+        print("Leo daemon unavailable, running the tracker in-process", file=sys.stderr)
+        code = subprocess.call([sys.executable, "-u", tracker, context])
+    sys.exit(code)
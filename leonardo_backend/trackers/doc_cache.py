@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+
+# ============================================
+# DOCUMENT NAME CACHE
+# ============================================
+# get_document_name() may fork osascript or open a COM dispatch. The answer
+# rarely changes while the same window stays in front, so lookups are cached
+# per window title with a TTL and an LRU size bound.
+
+
+class DocumentNameCache:
+    """TTL + LRU cache keyed by window title"""
+
+    def __init__(self, ttl=5.0, max_size=256, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._clock = clock
+        self._entries = OrderedDict()   # title -> (expires_at, doc_name)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, window_name, loader):
+        """Return the cached document name, calling loader(window_name) on a miss"""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(window_name)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(window_name)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Load outside the lock: osascript can take tens of milliseconds
+        doc_name = loader(window_name)
+        self.put(window_name, doc_name)
+        return doc_name
+
+    def put(self, window_name, doc_name):
+        """Store a value obtained elsewhere (e.g. from an OS helper snapshot)"""
+        with self._lock:
+            self._entries[window_name] = (self._clock() + self.ttl, doc_name)
+            self._entries.move_to_end(window_name)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, window_name=None):
+        """Drop one title (or everything when window_name is None)"""
+        with self._lock:
+            if window_name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(window_name, None)
+
+    def reset(self):
+        """Drop everything and zero the counters (a new session)"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "hit_rate": round(self.hits / total, 3) if total else 0.0
+            }
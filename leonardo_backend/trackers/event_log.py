@@ -0,0 +1,86 @@
+import bisect
+import time
+from array import array
+from enum import IntEnum
+
+# ============================================
+# SESSION EVENT LOG
+# ============================================
+# Columnar replacement for the old list of (time.ctime(), title, state)
+# tuples. Titles are interned to integer ids, event types are one byte and
+# timestamps are float64 monotonic seconds, each in its own array. Columns
+# grow a chunk at a time and, since timestamps only increase, range queries
+# are a binary search.
+
+
+class EventType(IntEnum):
+    FOREGROUND = 0
+    BACKGROUND = 1
+    CLOSED = 2
+
+
+class EventLog:
+    """Append-only, interned, array-backed log of window events"""
+
+    def __init__(self, chunk_size=1024, clock=time.monotonic):
+        self.chunk_size = chunk_size
+        self._clock = clock
+        # wall = monotonic + offset, for human-readable output only
+        self._wall_offset = time.time() - clock()
+        self._times = array("d")
+        self._kinds = array("B")
+        self._title_ids = array("I")
+        self._length = 0
+        self._ids = {}
+        self._titles = []
+
+    def intern(self, title):
+        title_id = self._ids.get(title)
+        if title_id is None:
+            title_id = len(self._titles)
+            self._ids[title] = title_id
+            self._titles.append(title)
+        return title_id
+
+    def append(self, kind, title, at=None):
+        at = self._clock() if at is None else at
+        if self._length == len(self._times):
+            self._grow()
+        i = self._length
+        self._times[i] = at
+        self._kinds[i] = kind
+        self._title_ids[i] = self.intern(title)
+        self._length += 1
+
+    def _grow(self):
+        self._times.extend(array("d", bytes(8 * self.chunk_size)))
+        self._kinds.extend(array("B", bytes(self.chunk_size)))
+        self._title_ids.extend(array("I", bytes(self._title_ids.itemsize * self.chunk_size)))
+
+    def __len__(self):
+        return self._length
+
+    def _row(self, i):
+        return self._times[i], self._titles[self._title_ids[i]], EventType(self._kinds[i])
+
+    def __iter__(self):
+        for i in range(self._length):
+            yield self._row(i)
+
+    def range(self, start=None, end=None):
+        """Events with start <= timestamp < end (monotonic seconds)"""
+        lo = 0 if start is None else bisect.bisect_left(self._times, start, 0, self._length)
+        hi = self._length if end is None else bisect.bisect_left(self._times, end, lo, self._length)
+        for i in range(lo, hi):
+            yield self._row(i)
+
+    def titles(self):
+        return list(self._titles)
+
+    def wall_time(self, timestamp):
+        return timestamp + self._wall_offset
+
+    def memory_bytes(self):
+        """Approximate footprint of the columns plus the intern table"""
+        columns = sum(col.buffer_info()[1] * col.itemsize for col in (self._times, self._kinds, self._title_ids))
+        return columns + sum(len(t) for t in self._titles)
@@ -0,0 +1,109 @@
+import math
+import threading
+import time
+
+# ============================================
+# INPUT AGGREGATION
+# ============================================
+# pynput calls our callbacks on its own listener threads, hundreds of times
+# per second for mouse motion. Each callback now bumps counters in a slot
+# that only its own listener writes to (no shared read-modify-write, no
+# lock). A periodic flush() reads every slot and returns what changed since
+# the previous flush, which the tracker merges into activity_state.
+# Counters are never reset by the reader, so no increment can be lost.
+
+
+class InputSlot:
+    """Counters written by exactly one listener thread"""
+
+    __slots__ = ("name", "counts", "last_input", "_clock")
+
+    def __init__(self, name, clock):
+        self.name = name
+        self.counts = {}
+        self.last_input = 0.0
+        self._clock = clock
+
+    def add(self, key, n=1):
+        counts = self.counts
+        counts[key] = counts.get(key, 0) + n
+        self.last_input = self._clock()
+
+    def touch(self):
+        self.last_input = self._clock()
+
+
+class InputAggregator:
+    """Owns the slots and merges them on flush()"""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._slots = {}
+        self._flushed = {}   # (slot name, key) -> value already reported
+        self._lock = threading.Lock()
+
+    def slot(self, name):
+        with self._lock:
+            slot = self._slots.get(name)
+            if slot is None:
+                slot = self._slots[name] = InputSlot(name, self._clock)
+            return slot
+
+    def last_input(self):
+        """Monotonic time of the most recent event on any slot (0.0 if none yet)"""
+        return max((slot.last_input for slot in list(self._slots.values())), default=0.0)
+
+    def flush(self):
+        """Return {key: increment since the previous flush} summed over all slots"""
+        deltas = {}
+        with self._lock:
+            for name, slot in self._slots.items():
+                # dict() copies in C while holding the GIL, so the writer can't tear it
+                for key, value in dict(slot.counts).items():
+                    previous = self._flushed.get((name, key), 0)
+                    if value != previous:
+                        self._flushed[(name, key)] = value
+                        deltas[key] = deltas.get(key, 0) + (value - previous)
+        return deltas
+
+
+# ============================================
+# MOUSE MOTION COALESCING
+# ============================================
+# Counting raw motion events measures the mouse's polling rate more than the
+# user. The sampler looks at the pointer at most once per `sample_interval`
+# (other events return after one clock read) and adds path length and
+# active-movement seconds to its slot, so the cost stays flat whether the
+# mouse reports at 125 Hz or 1000 Hz.
+
+
+class MouseMotionSampler:
+    """Path length (px) and active-movement seconds, sampled into an InputSlot"""
+
+    def __init__(self, slot, sample_interval=0.02, active_gap=0.25, clock=time.monotonic):
+        self._slot = slot
+        self.sample_interval = sample_interval
+        self.active_gap = active_gap
+        self._clock = clock
+        self._next_sample = 0.0
+        self._last_sample = None
+        self._last_pos = None
+
+    def on_move(self, x, y):
+        now = self._clock()
+        if now < self._next_sample:
+            return
+        self._next_sample = now + self.sample_interval
+
+        distance = 0.0
+        active = 0.0
+        if self._last_pos is not None:
+            distance = math.hypot(x - self._last_pos[0], y - self._last_pos[1])
+            # Continuous motion accrues real time; an isolated nudge counts as one gap at most
+            active = min(now - self._last_sample, self.active_gap)
+        self._last_pos = (x, y)
+        self._last_sample = now
+
+        # Feeds the counters and the last-input timestamp used by the idle detector
+        self._slot.add("mouse_distance", distance)
+        self._slot.add("mouse_active_seconds", active)
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# ============================================
+# LLM RESPONSE CACHE
+# ============================================
+# The startup advice for "Studying for exams" is the same every session, and
+# a final report for identical stats is the same report; both used to cost a
+# full LLM round trip and API quota each time. Call sites that opt in
+# (ask_llm(..., cache=True)) look the answer up here first.
+#
+# Entries are content-addressed: the key is a SHA-256 of provider, model,
+# prompt, max_tokens and temperature, so any change to the prompt is a new
+# entry. Storage is one small SQLite file; entries expire after `ttl` and the
+# least recently used ones are evicted once the file holds more than
+# `max_bytes` of responses.
+#
+# Environment:
+#   LEO_LLM_CACHE             "off" disables the cache
+#   LEO_LLM_CACHE_PATH        database file (default ~/.leofocus/llm_cache.sqlite3)
+#   LEO_LLM_CACHE_TTL         seconds an answer stays valid (default 7 days)
+#   LEO_LLM_CACHE_MAX_BYTES   responses kept at most (default 5 MB)
+
+
+def cache_key(provider, model, prompt, max_tokens, temperature):
+    material = json.dumps([provider, model, prompt, max_tokens, temperature], ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Content-addressed response store with TTL and size-bounded LRU eviction"""
+
+    def __init__(self, path, ttl=7 * 24 * 3600.0, max_bytes=5 * 1024 * 1024, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._db = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls):
+        if os.environ.get("LEO_LLM_CACHE") == "off":
+            return None
+        return cls(
+            os.environ.get("LEO_LLM_CACHE_PATH",
+                           os.path.join(os.path.expanduser("~"), ".leofocus", "llm_cache.sqlite3")),
+            ttl=float(os.environ.get("LEO_LLM_CACHE_TTL", str(7 * 24 * 3600))),
+            max_bytes=int(os.environ.get("LEO_LLM_CACHE_MAX_BYTES", str(5 * 1024 * 1024))),
+        )
+
+    def _connect(self):
+        # Opened on first use; shared by the LLM executor threads under the lock
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_used)")
+            self._db = db
+        return self._db
+
+    def get(self, key):
+        """Cached response or None (expired entries count as misses and are removed)"""
+        now = self._clock()
+        with self._lock:
+            db = self._connect()
+            row = db.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, response):
+        now = self._clock()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            db = self._connect()
+            db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)", (key, response, size, now, now))
+            self._evict(db, now)
+
+    def _evict(self, db, now):
+        db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Least recently used first, until the store fits again
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -1,41 +1,83 @@
 import os
-import requests
 import json
 import sys
+# One pooled, keep-alive connection set and one SDK client per provider (see llm_transport.py)
+from llm_transport import clients, post_json, CONNECT_TIMEOUT, READ_TIMEOUT
+from llm_cache import ResponseCache, cache_key
+from llm_failover import ProviderChain, ProviderError, StreamGate
+from prompt_compaction import PromptStats, compact_text, compact_windows, estimate_tokens
+
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+if not OLLAMA_HOST.startswith("http"):
+    OLLAMA_HOST = "http://" + OLLAMA_HOST
+
+# Model per provider (also part of the response cache key)
+PROVIDER_MODELS = {
+    "groq": "llama-3.1-8b-instant",  # or "mixtral-8x7b-32768"
+    "huggingface": "meta-llama/Llama-3.2-3B-Instruct",
+    "ollama": "llama3.2",  # or "mistral", "phi3"
+}
+
+# Seconds a call may take across the whole provider chain, unless the call site says otherwise
+DEFAULT_BUDGET = float(os.getenv("LEO_LLM_BUDGET", "30"))
+# The 30 s evaluation must land well inside the tracker's 20 s worker deadline
+MEMORY_BUDGET = 8.0
+REPORT_BUDGET = 120.0
+
+# Input token budgets for the 30 s evaluation prompt (estimated, see prompt_compaction.py)
+WINDOWS_TOKEN_BUDGET = 120
+SUMMARY_TOKEN_BUDGET = 80
+memory_prompt_stats = PromptStats()
+
+# Providers whose answer can be streamed token by token (ask_llm on_chunk=...)
+STREAMING_PROVIDERS = ("groq", "ollama")
+
+# Opt-in response cache for prompts that repeat across sessions (None when LEO_LLM_CACHE=off)
+response_cache = ResponseCache.from_env()
 
-_client = None
 # ============================================
 # OPTION 1: Groq (FREE, very fast!)
 # ============================================
-def get_groq_llm():
-    """Initialize Groq client (FREE API, very fast)"""
+def _new_groq_client():
     try:
         from groq import Groq
     except ImportError:
         raise ImportError("Install: pip install groq")
-    
-    global _client
-    _client = Groq(api_key="") # use your desired API key here
-    if _client is None:
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            raise ValueError(
-                "Get free API key from https://console.groq.com/keys\n"
-                "Then: export GROQ_API_KEY='your-key'"
-            )
-        _client = Groq(api_key=api_key)
-    return _client
-
-def ask_llm_groq(prompt: str, max_tokens: int = 100, temperature: float = 0.2):
-    """Groq - FREE and lightning fast!"""
+
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise ValueError(
+            "Get free API key from https://console.groq.com/keys\n"
+            "Then: export GROQ_API_KEY='your-key'"
+        )
+    import httpx
+    # The SDK keeps its own keep-alive pool; built once, it is reused by every call
+    return Groq(api_key=api_key, timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT), max_retries=1)
+
+def get_groq_llm():
+    """Groq client (FREE API, very fast), created on first use and shared afterwards"""
+    return clients.get("groq", _new_groq_client)
+
+def ask_llm_groq(prompt: str, max_tokens: int = 100, temperature: float = 0.2, on_chunk=None):
+    """Groq - FREE and lightning fast! on_chunk(text) receives the tokens as they arrive"""
     client = get_groq_llm()
     response = client.chat.completions.create(
-        model="llama-3.1-8b-instant",  # or "mixtral-8x7b-32768"
+        model=PROVIDER_MODELS["groq"],
         messages=[{"role": "user", "content": prompt}],
         max_tokens=max_tokens,
-        temperature=temperature
+        temperature=temperature,
+        stream=on_chunk is not None
     )
-    return response.choices[0].message.content.strip()
+    if on_chunk is None:
+        return response.choices[0].message.content.strip()
+
+    parts = []
+    for chunk in response:
+        piece = chunk.choices[0].delta.content if chunk.choices else None
+        if piece:
+            parts.append(piece)
+            on_chunk(piece)
+    return "".join(parts).strip()
 
 
 # ============================================
@@ -50,19 +92,20 @@ def ask_llm_huggingface(prompt: str, max_tokens: int = 100, temperature: float =
             "Then: export HF_API_KEY='your-key'"
         )
     
-    API_URL = "https://api-inference.huggingface.co/models/meta-llama/Llama-3.2-3B-Instruct"
+    API_URL = f"https://api-inference.huggingface.co/models/{PROVIDER_MODELS['huggingface']}"
     headers = {"Authorization": f"Bearer {api_key}"}
     
-    response = requests.post(
+    response = post_json(
+        "huggingface",
         API_URL,
-        headers=headers,
-        json={
+        {
             "inputs": prompt,
             "parameters": {
                 "max_new_tokens": max_tokens,
                 "temperature": temperature
             }
-        }
+        },
+        headers=headers
     )
     
     if response.status_code == 200:
@@ -74,46 +117,170 @@ def ask_llm_huggingface(prompt: str, max_tokens: int = 100, temperature: float =
 # ============================================
 # OPTION 3: Ollama (100% FREE, runs locally)
 # ============================================
-def ask_llm_ollama(prompt: str, max_tokens: int = 100, temperature: float = 0.2):
-    """Ollama - Completely free, runs on your machine"""
+def ask_llm_ollama(prompt: str, max_tokens: int = 100, temperature: float = 0.2, on_chunk=None):
+    """
+    Ollama - Completely free, runs on your machine. on_chunk(text) receives the tokens as they arrive;
+    a failure after the first token raises (the caller already shows part of an answer)
+    """
+    parts = []
     try:
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": "llama3.2",  # or "mistral", "phi3"
+        response = post_json(
+            "ollama",
+            f"{OLLAMA_HOST}/api/generate",
+            {
+                "model": PROVIDER_MODELS["ollama"],
                 "prompt": prompt,
-                "stream": False,
+                "stream": on_chunk is not None,
                 "options": {
                     "num_predict": max_tokens,
                     "temperature": temperature
                 }
-            }
+            },
+            stream=on_chunk is not None
         )
-        return response.json()["response"]
+        if on_chunk is None:
+            return response.json()["response"]
+
+        # One JSON object per line: {"response": "<token>", "done": false}
+        for line in response.iter_lines():
+            if not line:
+                continue
+            data = json.loads(line)
+            piece = data.get("response", "")
+            if piece:
+                parts.append(piece)
+                on_chunk(piece)
+            if data.get("done"):
+                break
+        return "".join(parts)
     except Exception as e:
+        if parts:
+            raise
         return f"Error: Install Ollama from https://ollama.com\nThen run: ollama pull llama3.2"
 
 
 # ============================================
 # Easy wrapper function
 # ============================================
-def ask_llm(prompt: str, max_tokens: int = 100, temperature: float = 0.2, provider: str = "groq"):
+PROVIDER_FUNCTIONS = {
+    "groq": ask_llm_groq,
+    "huggingface": ask_llm_huggingface,
+    "ollama": ask_llm_ollama,
+}
+
+def _call_provider(name, prompt, max_tokens, temperature, on_chunk=None, strict=False):
+    """One provider; strict=True turns the "Error: ..." answers some providers return into exceptions"""
+    provider_ask = PROVIDER_FUNCTIONS[name]
+    if on_chunk is not None and name in STREAMING_PROVIDERS:
+        response = provider_ask(prompt, max_tokens, temperature, on_chunk=on_chunk)
+    else:
+        response = provider_ask(prompt, max_tokens, temperature)
+    if strict and (not response or response.startswith("Error")):
+        raise ProviderError(response or "empty answer")
+    if on_chunk is not None and name not in STREAMING_PROVIDERS:
+        on_chunk(response)
+    return response
+
+def _chain_member(name):
+    def ask(prompt, max_tokens, temperature, stream=None):
+        # Every attempt streams through its own gate entry: a failed provider cannot write on
+        on_chunk = stream.attempt() if stream is not None else None
+        return _call_provider(name, prompt, max_tokens, temperature, on_chunk, strict=True)
+    return ask
+
+# Providers tried in order when ask_llm() is not given one (see llm_failover.py)
+LLM_CHAIN = [name.strip() for name in os.getenv("LEO_LLM_CHAIN", "groq,ollama").split(",")
+             if name.strip() in PROVIDER_FUNCTIONS]
+llm_chain = ProviderChain([(name, _chain_member(name)) for name in LLM_CHAIN])
+
+def ask_llm(prompt: str, max_tokens: int = 100, temperature: float = 0.2, provider: str = None,
+            cache: bool = False, on_chunk=None, budget: float = None, fallback=None, on_reset=None):
     """
-    Universal LLM function
+    Universal LLM function.
+    provider=None tries the LEO_LLM_CHAIN providers (failover, hedging, circuit breakers)
+    within `budget` seconds and answers with fallback() when none makes it (raises
+    ChainExhausted without one); naming a provider calls only that provider.
+    cache=True answers repeated prompts from the on-disk response cache (see llm_cache.py).
+    on_chunk(text) receives the answer while it is generated (token by token on Groq and
+    Ollama, in one piece elsewhere); the full text is still returned at the end. When a
+    provider fails mid-stream and another one starts over, on_reset() is called first: the
+    text received so far must be discarded. No on_chunk call happens after ask_llm returns.
     """
-    if provider == "groq":
-        return ask_llm_groq(prompt, max_tokens, temperature)
-    elif provider == "huggingface":
-        return ask_llm_huggingface(prompt, max_tokens, temperature)
-    elif provider == "ollama":
-        return ask_llm_ollama(prompt, max_tokens, temperature)
-    else:
+    if provider is not None and provider not in PROVIDER_FUNCTIONS:
         raise ValueError(f"Unknown provider: {provider}")
 
+    stream = StreamGate(on_chunk, on_reset) if on_chunk is not None else None
+
+    def ask():
+        """(answer, who answered)"""
+        if provider is not None:
+            return _call_provider(provider, prompt, max_tokens, temperature,
+                                  stream.attempt() if stream else None), provider
+        # A stream cannot be raced: with on_chunk only one request is in flight at a time
+        try:
+            response, source = llm_chain.call((prompt, max_tokens, temperature), budget or DEFAULT_BUDGET,
+                                              fallback=fallback, hedge=stream is None, stream=stream)
+            if source == "fallback" and stream is not None:
+                stream.replace(response)
+            return response, source
+        finally:
+            # Settled: a provider still running past the budget stays muted
+            if stream is not None:
+                stream.close()
+
+    if not cache or response_cache is None:
+        return ask()[0]
+
+    if provider is None:
+        key = cache_key("chain:" + ",".join(LLM_CHAIN), ",".join(PROVIDER_MODELS[name] for name in LLM_CHAIN),
+                        prompt, max_tokens, temperature)
+    else:
+        key = cache_key(provider, PROVIDER_MODELS[provider], prompt, max_tokens, temperature)
+    try:
+        cached = response_cache.get(key)
+    except Exception as e:
+        print(f"LLM cache unavailable: {e}", file=sys.stderr)
+        return ask()[0]
+    if cached is not None:
+        if stream is not None:
+            stream.replace(cached)
+            stream.close()
+        return cached
+
+    response, source = ask()
+    # Neither a template fallback nor an "Error: ..." text may be replayed later
+    if response and source != "fallback" and not response.startswith("Error"):
+        try:
+            response_cache.put(key, response)
+        except Exception as e:
+            print(f"LLM cache write failed: {e}", file=sys.stderr)
+    return response
+
 # ============================================
 # Creates json every n seconds
 # ============================================
 
+TEMPLATE_COMMENTS = {
+    "happy": "Bene! Your virtù shines today.",
+    "normal": "I observe. Keep your hand steady.",
+    "angry": "Basta! Genius wasted is genius lost.",
+}
+
+def template_memory(focus_score, recent_distraction, previous_context):
+    """Deterministic evaluation (same JSON as the LLM's) for when no provider answers in time"""
+    if recent_distraction <= 30:
+        emotion = "happy"
+    elif recent_distraction <= 70:
+        emotion = "normal"
+    else:
+        emotion = "angry"
+    return json.dumps({
+        "focus_score": focus_score,
+        "leonardo_emotion": emotion,
+        "summary_so_far": previous_context.get('summary_so_far', 'Session started.'),
+        "leonardo_comment": TEMPLATE_COMMENTS[emotion],
+    })
+
 def create_json_memory(current_log, previous_context, user_goal):
     
     recent_distraction = current_log.get('recent_distraction', 0)
@@ -121,17 +288,24 @@ def create_json_memory(current_log, previous_context, user_goal):
     
     # Focus Score uses global average for the session
     focus_score = int(100 - global_distraction)
-    
+
+    # Compaction: normalized, merged titles ranked by time share, summary within its budget
+    raw_windows = json.dumps(current_log.get('windows', []))
+    window_seconds = current_log.get('window_seconds') or {w: 1.0 for w in current_log.get('windows', [])}
+    windows, windows_tokens = compact_windows(window_seconds, WINDOWS_TOKEN_BUDGET)
+    raw_summary = previous_context.get('summary_so_far', 'Session started.')
+    summary = compact_text(raw_summary, SUMMARY_TOKEN_BUDGET)
+
     prompt = f"""
     You are Leonardo da Vinci. You will be guiding the user through their goal. User goal: "{user_goal}". Always use english when communicating, apart from very few italian words.
     
     CURRENT SITUATION (Last 30s):
     - Recent Distraction: {recent_distraction}% (Use this for your Emotion)
     - Session Global Distraction: {global_distraction}% (Use this for Focus Score)
-    - Apps Used: {json.dumps(current_log.get('windows', []))}
+    - Apps Used (share of the 30s): {json.dumps(windows, ensure_ascii=False)}
     
     PREVIOUS HISTORY SUMMARY:
-    "{previous_context.get('summary_so_far', 'Session started.')}"
+    "{summary}"
 
     TASK:
     1. REWRITE the 'summary_so_far' concisely (max 3 sentences). Merge old and new. The summary should include how the user has been behaving during the whole session.
@@ -153,9 +327,17 @@ def create_json_memory(current_log, previous_context, user_goal):
     
     print("\n" + "="*50, file=sys.stderr)
     print(f"[DEBUG LLM] DISTRAZIONE CALCOLATA: {global_distraction}%", file=sys.stderr)
+    prompt_tokens = estimate_tokens(prompt)
+    raw_tokens = estimate_tokens(raw_windows) + estimate_tokens(raw_summary)
+    compact_tokens = windows_tokens + estimate_tokens(summary)
+    memory_prompt_stats.record(prompt_tokens, raw_tokens, compact_tokens)
+    print(f"[DEBUG LLM] prompt ≈{prompt_tokens} tokens (apps + summary {raw_tokens} → {compact_tokens})",
+          file=sys.stderr)
     print("="*50 + "\n", file=sys.stderr)
 
-    response = ask_llm(prompt, max_tokens=350, provider="groq") 
+    # Within budget or not at all: a late comment is worse than a plain one
+    response = ask_llm(prompt, max_tokens=350, budget=MEMORY_BUDGET,
+                       fallback=lambda: template_memory(focus_score, recent_distraction, previous_context)) 
     
     try:
         start = response.find('{')
@@ -175,10 +357,13 @@ def create_json_memory(current_log, previous_context, user_goal):
 import json
 from llm_client_2 import ask_llm
 
-def generate_final_report_from_memory(final_context, user_context="General Creator", stats_package=None):
+def generate_final_report_from_memory(final_context, user_context="General Creator", stats_package=None,
+                                      on_chunk=None, on_reset=None):
     """
     Generate a visually stunning final report with REAL metrics from session.
     Uses actual data from memory_context and stats_package.
+    on_chunk(text) receives the Markdown while it is written, on_reset() when a new provider
+    starts over; the return value is the whole report.
     """
     print("DEBUG: Inizio generazione report con dati reali...")
     
@@ -285,6 +470,14 @@ def generate_final_report_from_memory(final_context, user_context="General Creat
             top_apps_str += f"  - {app_name}: {app_minutes}min ({app_seconds}s)\n"
     else:
         top_apps_str = "  - No app data available\n"
+
+    # G) SWITCH TIMELINE (last focus changes, oldest first)
+    switch_timeline = stats_package.get('switch_timeline', [])
+    timeline_str = ""
+    for event in switch_timeline:
+        timeline_str += f"  - {event.get('at', '?')} → {event.get('window', 'Unknown')}\n"
+    if not timeline_str:
+        timeline_str = "  - No switches recorded\n"
     
     # 3. PREPARATION OF VISUAL ELEMENTS
     avg_focus = max(0, min(100, avg_focus))
@@ -367,6 +560,8 @@ You are Leonardo da Vinci—Renaissance polymath reborn—crafting a SESSION COD
 
 **TOP APPS USED:**
 {top_apps_str}
+**RECENT SWITCHES (oldest first):**
+{timeline_str}
 
 **LEONARDO'S CONTINUOUS OBSERVATIONS:**
 Summary: {leonardo_final_summary}
@@ -403,6 +598,7 @@ Write 2-3 SHORT paragraphs (max 150 words total) analyzing:
 - What the trend ({trend}) reveals about their discipline
 - The relationship between deep work time ({deep_work_percentage}%) and distractions ({distractions_count})
 - Reference specific apps from the top list
+- What the recent switches reveal about their rhythm (bouncing between apps vs. long stretches)
 
 Be STRICT but ENCOURAGING. Use REAL numbers from the data.
 
@@ -449,7 +645,9 @@ Current score: {final_focus_score}/100, Distractions: {distractions_count}
     
     # 6. CALL TO LLM
     try:
-        report = ask_llm(prompt, max_tokens=900, temperature=0.3, provider="groq")
+        # Identical stats give an identical prompt: no need to pay for the same Codex twice
+        report = ask_llm(prompt, max_tokens=900, temperature=0.3, cache=True,
+                         on_chunk=on_chunk, on_reset=on_reset, budget=REPORT_BUDGET)
         print("Report generato con successo")
         return report
     except Exception as e:
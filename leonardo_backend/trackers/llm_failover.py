@@ -0,0 +1,267 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# ============================================
+# PROVIDER FAILOVER
+# ============================================
+# ask_llm() used to depend on one provider: a slow or failing Groq either
+# stalled the session or ended in an except. A ProviderChain tries providers
+# in order (e.g. groq -> ollama) within a latency budget per call:
+#
+#   - when a provider fails, the next one is tried at once (failover);
+#   - when it is slower than its own observed p95, the next provider is
+#     started in parallel and whichever answers first wins (hedging);
+#   - a provider that keeps failing is skipped for a while (circuit breaker);
+#   - when the budget runs out the call site's deterministic fallback is
+#     used, so a 30 s comment still arrives on time.
+#
+# Requests that lose a race are not cancelled (threads cannot be), their
+# outcome still feeds the latency and breaker statistics.
+#
+# Streams are not raced, but a provider can fail halfway through its answer:
+# a StreamGate lets only the current attempt's tokens through, tells the
+# caller to discard what it got so far when another provider takes over, and
+# drops everything once the call has settled (a late provider cannot write
+# after the final answer).
+
+
+class ProviderError(RuntimeError):
+    pass
+
+
+class ChainExhausted(ProviderError):
+    """No provider answered within the budget and there is no fallback"""
+
+
+class CircuitBreaker:
+    """closed -> open after `threshold` consecutive failures -> one trial call after `reset_after` s"""
+
+    def __init__(self, threshold=3, reset_after=30.0, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return "closed"
+        return "half-open" if self._clock() - self._opened_at >= self.reset_after else "open"
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._clock() - self._opened_at < self.reset_after or self._trial:
+                return False
+            self._trial = True      # one request finds out whether it is back
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.threshold:
+                self._opened_at = self._clock()
+            self._trial = False
+
+
+class LatencyTracker:
+    """Recent successful call latencies of one provider"""
+
+    def __init__(self, window=50, min_samples=5):
+        self._samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def add(self, seconds):
+        self._samples.append(seconds)
+
+    def p95(self):
+        """None until there are enough samples to mean anything"""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class StreamGate:
+    """on_chunk for a chain call: one attempt at a time, reset on failover, closed when settled"""
+
+    def __init__(self, on_chunk, on_reset=None):
+        self._on_chunk = on_chunk
+        self._on_reset = on_reset
+        self._attempt = 0
+        self._owner = None      # attempt whose tokens the caller has seen
+        self._open = True
+        self._lock = threading.Lock()
+        self.resets = 0
+
+    def attempt(self):
+        """on_chunk for the attempt starting now; earlier attempts are muted"""
+        with self._lock:
+            self._attempt += 1
+            number = self._attempt
+        return lambda text: self._push(number, text)
+
+    def _push(self, number, text):
+        # Under the lock: close() waits for a chunk already on its way out
+        with self._lock:
+            if not self._open or number != self._attempt or not text:
+                return
+            self._take_over(number)
+            self._on_chunk(text)
+
+    def replace(self, text):
+        """The whole answer from outside the stream (fallback, cache)"""
+        with self._lock:
+            if not self._open:
+                return
+            self._attempt += 1
+            self._take_over(self._attempt)
+            self._on_chunk(text)
+
+    def _take_over(self, number):
+        if self._owner is not None and self._owner != number:
+            self.resets += 1
+            if self._on_reset is not None:
+                self._on_reset()
+        self._owner = number
+
+    def close(self):
+        with self._lock:
+            self._open = False
+
+    @property
+    def started(self):
+        return self._owner is not None
+
+
+class ProviderChain:
+    """Ordered providers with failover, p95 hedging and per-provider circuit breakers"""
+
+    def __init__(self, providers, default_hedge=5.0, max_workers=4, clock=time.monotonic):
+        # providers: [(name, fn(prompt, max_tokens, temperature, **kwargs))], in order of preference
+        self.providers = list(providers)
+        self.default_hedge = default_hedge
+        self._clock = clock
+        self.breakers = {name: CircuitBreaker(clock=clock) for name, _ in self.providers}
+        self.latency = {name: LatencyTracker() for name, _ in self.providers}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-chain")
+        self._counted_lock = threading.Lock()
+        self.hedges = 0
+        self.failovers = 0
+        self.fallbacks = 0
+
+    @property
+    def names(self):
+        return [name for name, _ in self.providers]
+
+    def hedge_delay(self, name, remaining):
+        """Start the next provider once this one is slower than usual"""
+        p95 = self.latency[name].p95()
+        delay = self.default_hedge if p95 is None else p95
+        return min(delay, remaining / 2)
+
+    def _claim(self, future):
+        """True once per attempt: the done-callback and the timeout path race to count it"""
+        with self._counted_lock:
+            if getattr(future, "counted", False):
+                return False
+            future.counted = True
+            return True
+
+    def _start(self, name, fn, args, kwargs):
+        started = self._clock()
+        future = self._executor.submit(fn, *args, **kwargs)
+
+        def record(done):
+            if done.cancelled():
+                return
+            failed = done.exception() is not None
+            if not failed:
+                # A late answer is still a real latency sample
+                self.latency[name].add(self._clock() - started)
+            if not self._claim(done):
+                return      # already counted as a timeout
+            if failed:
+                self.breakers[name].record_failure()
+            else:
+                self.breakers[name].record_success()
+
+        future.add_done_callback(record)
+        return future
+
+    def call(self, args, budget, fallback=None, hedge=True, **kwargs):
+        """
+        Run fn(*args, **kwargs) on the chain; returns (result, provider name).
+        hedge=False keeps one request in flight at a time (streaming callers).
+        """
+        deadline = self._clock() + budget
+        queue = list(self.providers)
+        pending = {}
+        errors = []
+        hedge_at = None
+
+        while queue or pending:
+            now = self._clock()
+            remaining = deadline - now
+            if remaining <= 0:
+                break
+            if queue and (not pending or (hedge and hedge_at is not None and now >= hedge_at)):
+                name, fn = queue.pop(0)
+                # Asked only now: a half-open breaker lets exactly one real request through
+                if not self.breakers[name].allow():
+                    continue
+                if pending:
+                    self.hedges += 1
+                elif errors:
+                    self.failovers += 1
+                pending[self._start(name, fn, args, kwargs)] = name
+                hedge_at = now + self.hedge_delay(name, remaining)
+                continue
+
+            timeout = remaining
+            if queue and hedge and hedge_at is not None:
+                timeout = max(0.0, min(timeout, hedge_at - now))
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    return future.result(), name
+                except Exception as e:
+                    errors.append(f"{name}: {e}")
+
+        # Out of time: whatever is still running counts as a failure for its breaker,
+        # and its done-callback will find the attempt already counted
+        for future, name in pending.items():
+            if self._claim(future):
+                self.breakers[name].record_failure()
+                errors.append(f"{name}: no answer within {budget:.1f}s")
+        if fallback is not None:
+            self.fallbacks += 1
+            return fallback(), "fallback"
+        raise ChainExhausted("; ".join(errors) or "no provider available")
+
+    def stats(self):
+        return {
+            "providers": {
+                name: {
+                    "state": self.breakers[name].state,
+                    "p95_ms": None if self.latency[name].p95() is None else round(self.latency[name].p95() * 1000),
+                }
+                for name in self.names
+            },
+            "hedges": self.hedges,
+            "failovers": self.failovers,
+            "fallbacks": self.fallbacks,
+        }
@@ -0,0 +1,145 @@
+import json
+import os
+import sys
+import threading
+import time
+
+# ============================================
+# LLM TRANSPORT
+# ============================================
+# Every provider used to open its own connection per call: requests.post()
+# without a Session (new TCP + TLS handshake each time, no timeout, so a
+# stuck server hung the caller forever) and a new Groq client per call.
+# Now there is one pooled keep-alive HTTP session per provider and one SDK
+# client per provider per process, all with connect / read timeouts.
+#
+# Environment:
+#   LEO_LLM_CONNECT_TIMEOUT   seconds to establish a connection (default 3)
+#   LEO_LLM_READ_TIMEOUT      seconds to wait for the response (default 30)
+#   LEO_LLM_POOL_SIZE         keep-alive connections per provider (default 4)
+#
+#   python llm_transport.py --bench [N]    per-call overhead against a local stand-in server
+
+CONNECT_TIMEOUT = float(os.environ.get("LEO_LLM_CONNECT_TIMEOUT", "3"))
+READ_TIMEOUT = float(os.environ.get("LEO_LLM_READ_TIMEOUT", "30"))
+POOL_SIZE = int(os.environ.get("LEO_LLM_POOL_SIZE", "4"))
+
+
+class ProviderPool:
+    """One lazily built client per provider name, shared by every thread of the process"""
+
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, factory):
+        client = self._clients.get(name)
+        if client is not None:
+            return client
+        with self._lock:
+            # Two threads may race to the first call: only one builds the client
+            client = self._clients.get(name)
+            if client is None:
+                client = factory()
+                self._clients[name] = client
+            return client
+
+    def close(self):
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for client in clients.values():
+            close = getattr(client, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except Exception:
+                    pass
+
+
+clients = ProviderPool()
+
+
+def new_http_session(pool_size=None):
+    """requests.Session with a bounded keep-alive pool and no hidden retries"""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    pool_size = POOL_SIZE if pool_size is None else pool_size
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def http_session(provider):
+    return clients.get(f"http:{provider}", new_http_session)
+
+
+def post_json(provider, url, payload, headers=None, timeout=None, stream=False):
+    """
+    POST JSON over the provider's pooled session; raises on network errors and timeouts.
+    stream=True returns as soon as the headers arrive (the read timeout then applies per chunk)
+    """
+    timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+    return http_session(provider).post(url, json=payload, headers=headers, timeout=timeout, stream=stream)
+
+
+# -----------------------------
+# BENCH (local stand-in server)
+# -----------------------------
+def _serve_stand_in():
+    """Ollama-shaped /api/generate on 127.0.0.1, HTTP/1.1 keep-alive; returns (server, url)"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class StandIn(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are separate writes: without this, Nagle + delayed ACK add ~40 ms
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            body = json.dumps({"response": "Bene."}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+
+
+def bench(calls=200):
+    import requests
+
+    server, url = _serve_stand_in()
+    payload = {"model": "stand-in", "prompt": "x" * 2000, "stream": False}
+    try:
+        start = time.perf_counter()
+        for _ in range(calls):
+            requests.post(url, json=payload).json()
+        per_call = (time.perf_counter() - start) / calls * 1000
+        print(f"requests.post (new connection per call): {per_call:.3f} ms/call")
+
+        post_json("bench", url, payload).json()   # warm the pool
+        start = time.perf_counter()
+        for _ in range(calls):
+            post_json("bench", url, payload).json()
+        per_call = (time.perf_counter() - start) / calls * 1000
+        print(f"pooled keep-alive session:               {per_call:.3f} ms/call")
+    finally:
+        clients.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] == "--bench":
+        bench(int(args[1]) if len(args) > 1 else 200)
+    else:
+        print("Usage: llm_transport.py --bench [calls]")
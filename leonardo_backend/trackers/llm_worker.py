@@ -0,0 +1,88 @@
+import asyncio
+import sys
+from collections import deque
+
+# ============================================
+# LLM EVALUATION WORKER
+# ============================================
+# The report loop used to call the LLM inline, so a slow or hung provider
+# froze the 1 Hz update packets. Now the loop only submit()s the finished
+# 30-second chunk and goes on ticking. One worker task evaluates chunks one
+# at a time: if newer chunks pile up while a call is running, the oldest are
+# dropped (a late verdict on stale data is worth less than a fresh one), and
+# every call has a deadline after which its result is ignored.
+
+
+class LatestWinsQueue:
+    """Bounded asyncio queue that drops the oldest item instead of blocking the producer"""
+
+    def __init__(self, maxsize=1):
+        self._items = deque(maxlen=maxsize)
+        self._ready = asyncio.Event()
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, item):
+        if len(self._items) == self._items.maxlen:
+            self.dropped += 1
+        self._items.append(item)
+        self._ready.set()
+
+    async def get(self):
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._items.popleft()
+
+
+class EvaluationWorker:
+    """
+    Runs evaluate(chunk) through `run` (e.g. AsyncRuntime.run_llm) for the
+    newest chunks and hands each result to on_result(chunk, result) on the loop.
+    """
+
+    def __init__(self, run, evaluate, on_result, deadline=20.0, maxsize=1):
+        self._run = run
+        self._evaluate = evaluate
+        self._on_result = on_result
+        self.deadline = deadline
+        self._queue = LatestWinsQueue(maxsize)
+        self.completed = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    def submit(self, chunk):
+        """Never blocks; a chunk still waiting for the worker is replaced"""
+        self._queue.put(chunk)
+
+    async def run(self):
+        while True:
+            chunk = await self._queue.get()
+            try:
+                result = await asyncio.wait_for(self._run(self._evaluate, chunk), self.deadline)
+            except asyncio.TimeoutError:
+                # The provider thread may still finish; its answer is simply not used
+                self.timeouts += 1
+                print(f"LLM evaluation exceeded {self.deadline}s, skipped", file=sys.stderr)
+                continue
+            except Exception as e:
+                self.errors += 1
+                print(f"LLM Error: {e}", file=sys.stderr)
+                continue
+            self.completed += 1
+            try:
+                self._on_result(chunk, result)
+            except Exception as e:
+                self.errors += 1
+                print(f"LLM result handling failed: {e}", file=sys.stderr)
+
+    def stats(self):
+        return {
+            "completed": self.completed,
+            "dropped": self._queue.dropped,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "pending": len(self._queue),
+        }
@@ -2,6 +2,12 @@ import json
 import re
 from llm_client_2 import ask_llm
 
+# The advice is on the startup path: past this budget the session starts with the canned advice
+ADVICE_BUDGET = 8.0
+FALLBACK_ADVICE = """- Put away the glowing distractions; knowledge enters only a quiet mind.
+- Do not sip too much of the black potion; it clouds the judgment.
+- Finish one work before you begin the next, as a maestro finishes a fresco."""
+
 def sanitize_title(t):
     """Remove sensitive info from titles"""
     if not t: 
@@ -45,7 +51,9 @@ def get_start_session_advice(user_context):
     - Listen to the voice of instruction, not the chatter of the idle.
     """
     try:
-        return ask_llm(prompt, max_tokens=250, temperature=0.5)
+        # Same role, same advice: repeated goals start instantly from the response cache
+        return ask_llm(prompt, max_tokens=250, temperature=0.5, cache=True,
+                       budget=ADVICE_BUDGET, fallback=lambda: FALLBACK_ADVICE)
     except Exception as e:
         return f"Leonardo is currently meditating. Error: {e}"
 
@@ -0,0 +1,392 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+# ============================================
+# OS QUERY HELPER
+# ============================================
+# On macOS every active-app / document / window-list lookup used to start a
+# new `osascript` interpreter. This module runs ONE long-lived helper process
+# that keeps compiled AppleScripts around and answers JSON-line requests over
+# a pipe. A "snapshot" request returns frontmost app, active document and the
+# visible process list in a single round trip.
+#
+#   python os_helper.py --serve [--backend mac|standin]   (helper side)
+#   python os_helper.py --bench [N]                        (helper vs one process per query)
+
+# (needle in app name, AppleScript returning the active document/tab title)
+MAC_DOCUMENT_SCRIPTS = [
+    ("Word", 'tell application "Microsoft Word" to get name of active document'),
+    ("Excel", 'tell application "Microsoft Excel" to get name of active workbook'),
+    ("Safari", 'tell application "Safari" to get name of front document'),
+    ("Chrome", 'tell application "Google Chrome" to get title of active tab of front window'),
+    ("Edge", 'tell application "Microsoft Edge" to get title of active tab of front window'),
+]
+
+MAC_FRONTMOST_SCRIPT = 'tell application "System Events" to get name of first application process whose frontmost is true'
+MAC_PROCESSES_SCRIPT = 'tell application "System Events" to get name of every process whose background only is false'
+
+
+def mac_document_script(app_name):
+    for needle, script in MAC_DOCUMENT_SCRIPTS:
+        if needle in app_name:
+            return script
+    return None
+
+
+# -----------------------------
+# HELPER-SIDE BACKENDS
+# -----------------------------
+class MacBackend:
+    """Runs AppleScript in-process through NSAppleScript, compiled once per source"""
+
+    def __init__(self):
+        try:
+            from Foundation import NSAppleScript
+            self._NSAppleScript = NSAppleScript
+        except ImportError:
+            # No pyobjc: still one osascript per *snapshot* instead of three
+            self._NSAppleScript = None
+        self._compiled = {}
+
+    def applescript(self, source):
+        if self._NSAppleScript is None:
+            return subprocess.check_output(['osascript', '-e', source], stderr=subprocess.DEVNULL).decode('utf-8').strip()
+
+        script = self._compiled.get(source)
+        if script is None:
+            script = self._NSAppleScript.alloc().initWithSource_(source)
+            script.compileAndReturnError_(None)
+            self._compiled[source] = script
+        result, error = script.executeAndReturnError_(None)
+        if error is not None or result is None:
+            raise RuntimeError(f"AppleScript failed: {error}")
+        if result.numberOfItems() > 0:
+            # Lists come back as descriptors; join like osascript does
+            return ", ".join(result.descriptorAtIndex_(i).stringValue() or "" for i in range(1, result.numberOfItems() + 1))
+        return (result.stringValue() or "").strip()
+
+    def active_app(self):
+        return self.applescript(MAC_FRONTMOST_SCRIPT)
+
+    def document(self, app_name):
+        script = mac_document_script(app_name or "")
+        if script is None:
+            return None
+        try:
+            return self.applescript(script)
+        except Exception:
+            return None
+
+    def windows(self):
+        output = self.applescript(MAC_PROCESSES_SCRIPT)
+        return [a.strip() for a in output.split(",") if a.strip()]
+
+
+class StandInBackend:
+    """
+    Linux/CI stand-in with the same interface: the process list comes from
+    /proc and the frontmost app from LEO_STANDIN_ACTIVE, so the helper can be
+    exercised and benchmarked without macOS. applescript() understands
+    "delay N" (a script that hangs) and "crash" (the helper dies).
+    """
+
+    def applescript(self, source):
+        if source.startswith("delay "):
+            time.sleep(float(source.split()[1]))
+        elif source == "crash":
+            os._exit(1)
+        return ""
+
+    def active_app(self):
+        return os.environ.get("LEO_STANDIN_ACTIVE", "Terminal")
+
+    def document(self, app_name):
+        return os.environ.get("LEO_STANDIN_DOCUMENT", app_name)
+
+    def windows(self):
+        names = set()
+        try:
+            for pid in os.listdir("/proc"):
+                if pid.isdigit():
+                    try:
+                        with open(f"/proc/{pid}/comm", "r") as f:
+                            names.add(f.read().strip())
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        return sorted(n for n in names if n)
+
+
+def _make_backend(name):
+    if name == "mac":
+        return MacBackend()
+    if name == "standin":
+        return StandInBackend()
+    raise ValueError(f"Unknown helper backend: {name}")
+
+
+def _handle(backend, request):
+    op = request.get("op")
+    args = request.get("args") or {}
+    if op == "snapshot":
+        active = backend.active_app()
+        return {
+            "active_app": active,
+            "document": backend.document(active),
+            "windows": backend.windows() if args.get("windows", True) else None
+        }
+    if op == "active_app":
+        return backend.active_app()
+    if op == "document":
+        return backend.document(args.get("app_name", ""))
+    if op == "windows":
+        return backend.windows()
+    if op == "applescript":
+        return backend.applescript(args["source"])
+    if op == "ping":
+        return "pong"
+    raise ValueError(f"Unknown op: {op}")
+
+
+def serve(backend_name):
+    """Helper main loop: one JSON request per stdin line, one JSON reply per stdout line"""
+    backend = _make_backend(backend_name)
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError:
+            continue
+        reply = {"id": request.get("id")}
+        try:
+            reply["result"] = _handle(backend, request)
+        except Exception as e:
+            reply["error"] = str(e)
+        sys.stdout.write(json.dumps(reply) + "\n")
+        sys.stdout.flush()
+
+
+# -----------------------------
+# BACKEND-SIDE CLIENT
+# -----------------------------
+class OSHelperError(RuntimeError):
+    pass
+
+
+class OSQueryClient:
+    """
+    Talks to the helper process. Requests are pipelined: submit() writes and
+    returns a Future immediately, a reader thread resolves futures by id.
+    If the helper dies or a query times out (a hung AppleScript blocks every
+    request behind it), pending futures fail and the next request restarts it.
+    At most `max_restarts` restarts per `restart_window` seconds: past that the
+    helper is unavailable until the window moves on, and callers fall back to
+    their in-process queries.
+    """
+
+    def __init__(self, backend=None, timeout=2.0, max_restarts=5, restart_window=300.0, clock=time.monotonic):
+        self.backend = backend or default_backend()
+        self.timeout = timeout
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self._clock = clock
+        self._restart_times = deque()
+        self.restarts = 0
+        self._proc = None
+        self._pending = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    # --- process management ---
+    def _restart_allowed(self):
+        cutoff = self._clock() - self.restart_window
+        while self._restart_times and self._restart_times[0] < cutoff:
+            self._restart_times.popleft()
+        return len(self._restart_times) < self.max_restarts
+
+    def available(self):
+        """False while the helper is dead and out of restarts for this window"""
+        with self._lock:
+            return self._proc is None or self._proc.poll() is None or self._restart_allowed()
+
+    def _ensure_running(self):
+        if self._proc is not None and self._proc.poll() is None:
+            return
+        if self._proc is not None:
+            if not self._restart_allowed():
+                raise OSHelperError(f"OS helper died {self.max_restarts} times in {self.restart_window:.0f}s")
+            self._restart_times.append(self._clock())
+            self.restarts += 1
+            # Requests sent to the dead helper will never be answered
+            stale, self._pending = self._pending, {}
+            for future in stale.values():
+                if not future.done():
+                    future.set_exception(OSHelperError("OS helper restarted"))
+        self._proc = subprocess.Popen(
+            [sys.executable, "-u", os.path.abspath(__file__), "--serve", "--backend", self.backend],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            bufsize=1
+        )
+        threading.Thread(target=self._read_replies, args=(self._proc,), daemon=True).start()
+
+    def _read_replies(self, proc):
+        for line in proc.stdout:
+            try:
+                reply = json.loads(line)
+            except ValueError:
+                continue
+            with self._lock:
+                future = self._pending.pop(reply.get("id"), None)
+            if future is None:
+                continue
+            if "error" in reply:
+                future.set_exception(OSHelperError(reply["error"]))
+            else:
+                future.set_result(reply.get("result"))
+        # EOF: the helper exited, fail whatever was still waiting on it. Reap it first:
+        # until then poll() says "running" and a new request would go to the dead pipe
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        self._fail_pending(proc, OSHelperError("OS helper exited"))
+
+    def _fail_pending(self, proc, error):
+        with self._lock:
+            if proc is not self._proc:
+                return
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    # --- requests ---
+    def submit(self, op, **args):
+        future = Future()
+        with self._lock:
+            self._ensure_running()
+            self._next_id += 1
+            request_id = self._next_id
+            self._pending[request_id] = future
+            proc = self._proc
+        try:
+            proc.stdin.write(json.dumps({"id": request_id, "op": op, "args": args}) + "\n")
+            proc.stdin.flush()
+        except (OSError, ValueError) as e:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            proc.kill()
+            future.set_exception(OSHelperError(f"OS helper pipe broken: {e}"))
+        return future
+
+    def query(self, op, **args):
+        future = self.submit(op, **args)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # Replies come in order: whatever is stuck blocks everything queued behind it
+            self._kill(OSHelperError(f"OS helper did not answer {op} within {self.timeout}s"))
+            raise OSHelperError(f"OS helper timed out on {op}")
+
+    def _kill(self, error):
+        """Stop a hung helper and fail its outstanding requests; the next request restarts it"""
+        with self._lock:
+            proc = self._proc
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+            try:
+                proc.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                pass
+
+    def snapshot(self, windows=True):
+        """Frontmost app, its document/tab title and the visible process list in one round trip"""
+        return self.query("snapshot", windows=windows)
+
+    def close(self):
+        if self._proc is not None:
+            try:
+                self._proc.stdin.close()
+                self._proc.wait(timeout=1)
+            except Exception:
+                self._proc.kill()
+            self._proc = None
+
+
+def default_backend():
+    """Helper backend for this OS, or None where in-process queries are already cheap"""
+    forced = os.environ.get("LEO_OS_HELPER")
+    if forced:
+        return None if forced == "off" else forced
+    if sys.platform == "darwin":
+        return "mac"
+    return None
+
+
+# -----------------------------
+# BENCHMARK
+# -----------------------------
+def _bench(n, backend):
+    client = OSQueryClient(backend=backend)
+    client.query("ping")  # exclude startup from the numbers
+
+    start = time.perf_counter()
+    for _ in range(n):
+        client.snapshot()
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    futures = [client.submit("snapshot") for _ in range(n)]
+    for future in futures:
+        future.result(timeout=10)
+    pipelined = time.perf_counter() - start
+    client.close()
+
+    # Baseline: a fresh interpreter per query, like one osascript per lookup
+    start = time.perf_counter()
+    for _ in range(n):
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--serve", "--backend", backend],
+            input=json.dumps({"id": 1, "op": "snapshot"}) + "\n",
+            capture_output=True, text=True
+        )
+        json.loads(proc.stdout)
+    spawn = time.perf_counter() - start
+
+    print(f"backend={backend} queries={n}")
+    print(f"  process per query : {spawn / n * 1000:8.2f} ms/query")
+    print(f"  helper sequential : {sequential / n * 1000:8.2f} ms/query")
+    print(f"  helper pipelined  : {pipelined / n * 1000:8.2f} ms/query")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    backend_name = "mac" if sys.platform == "darwin" else "standin"
+    if "--backend" in args:
+        backend_name = args[args.index("--backend") + 1]
+
+    if "--serve" in args:
+        serve(backend_name)
+    elif "--bench" in args:
+        i = args.index("--bench")
+        count = int(args[i + 1]) if len(args) > i + 1 and args[i + 1].isdigit() else 50
+        _bench(count, backend_name)
+    else:
+        print("Usage: os_helper.py --serve [--backend mac|standin] | --bench [N]")
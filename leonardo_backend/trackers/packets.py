@@ -0,0 +1,258 @@
+import json
+import struct
+import sys
+import threading
+import time
+
+# ============================================
+# UI PACKETS
+# ============================================
+# The per-second "update" packet is delta-encoded: the first packet (and any
+# packet after reset()) is a full snapshot marked "full": true, afterwards
+# only the fields whose value changed are sent. Flutter keeps the previous
+# value for every field that is missing.
+
+
+class DeltaEncoder:
+    """Turns a stream of full packets into full-then-delta packets of the same type"""
+
+    def __init__(self, packet_type="update"):
+        self.packet_type = packet_type
+        self._last = None
+
+    def reset(self):
+        """Next encode() sends a full snapshot (new client, or a SNAPSHOT request)"""
+        self._last = None
+
+    def encode(self, fields):
+        """Return the packet to send, or None when nothing changed"""
+        if self._last is None:
+            self._last = dict(fields)
+            packet = {"type": self.packet_type, "full": True}
+            packet.update(fields)
+            return packet
+
+        changed = {k: v for k, v in fields.items() if self._last.get(k, _MISSING) != v}
+        if not changed:
+            return None
+        self._last.update(changed)
+        packet = {"type": self.packet_type}
+        packet.update(changed)
+        return packet
+
+
+_MISSING = object()
+
+
+class ChunkCoalescer:
+    """
+    Streamed text (LLM tokens) as ordered packets of `packet_type`: the first
+    piece goes out at once, later ones are merged for `min_interval` seconds
+    so the UI re-renders a few times per second instead of once per token.
+    add() may be called from a worker thread. reset() starts the text over
+    (seq 0, "reset": true), close() drops anything that arrives afterwards.
+    """
+
+    def __init__(self, emit, packet_type="report_chunk", min_interval=0.05, clock=time.monotonic):
+        self._emit = emit
+        self.packet_type = packet_type
+        self.min_interval = min_interval
+        self._clock = clock
+        self._pending = []
+        self._last_emit = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self.sent = 0
+
+    def add(self, text):
+        if not text:
+            return
+        with self._lock:
+            if self._closed:
+                return
+            self._pending.append(text)
+            now = self._clock()
+            if self._last_emit is None or now - self._last_emit >= self.min_interval:
+                self._send(now)
+
+    def flush(self):
+        """Send whatever is still pending (before the final packet)"""
+        with self._lock:
+            if self._pending:
+                self._send(self._clock())
+
+    def reset(self):
+        """The text sent so far is void (the provider changed mid-stream): the UI clears it"""
+        with self._lock:
+            if self._closed:
+                return
+            self._pending = []
+            self.sent = 0
+            self._send(self._clock(), reset=True)
+
+    def close(self):
+        """Flush, then ignore late pieces: the final packet is about to go out"""
+        with self._lock:
+            if self._pending:
+                self._send(self._clock())
+            self._closed = True
+
+    def _send(self, now, reset=False):
+        packet = {"type": self.packet_type, "seq": self.sent, "content": "".join(self._pending)}
+        if reset:
+            packet["reset"] = True
+        self._pending = []
+        self._last_emit = now
+        self.sent += 1
+        self._emit(packet)
+
+
+# ============================================
+# WIRE FRAMING
+# ============================================
+# JSON lines stay the default. Before START, Flutter may send
+#     PROTO msgpack      (or PROTO cbor)
+# and, if the codec is installed, every later packet is written as
+#     [4-byte big-endian body length][1-byte packet type tag][body]
+# where body is the msgpack/CBOR encoding of the packet dict.
+#
+#   python packets.py --bench [N]   (encode/decode throughput vs json.dumps)
+
+PACKET_TAGS = {
+    "update": 1,
+    "leo_comment": 2,
+    "initial_advice": 3,
+    "status": 4,
+    "report": 5,
+    "error": 6,
+    "protocol": 7,
+    "ack": 8,
+    "stats": 9,
+    "startup_profile": 10,
+    "report_chunk": 11,
+}
+TAG_NAMES = {tag: name for name, tag in PACKET_TAGS.items()}
+
+_HEADER = struct.Struct(">IB")
+
+
+def load_codec(name):
+    """Return (encode, decode) for 'msgpack' or 'cbor', or None if the library is missing"""
+    try:
+        if name == "msgpack":
+            import msgpack
+            return (lambda obj: msgpack.packb(obj, use_bin_type=True),
+                    lambda data: msgpack.unpackb(data, raw=False))
+        if name == "cbor":
+            import cbor2
+            return cbor2.dumps, cbor2.loads
+    except ImportError:
+        return None
+    return None
+
+
+class JsonLinesWriter:
+    """Default wire format: one json.dumps() per line"""
+
+    framing = "json"
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, packet):
+        self.write_many((packet,))
+
+    def write_many(self, packets):
+        """Several packets, one flush (one pipe write for the whole batch)"""
+        self._stream.write("".join(json.dumps(packet) + "\n" for packet in packets))
+        self._stream.flush()
+
+
+class FramedWriter:
+    """Length-prefixed binary frames with a packet type tag"""
+
+    def __init__(self, binary_stream, framing="msgpack"):
+        codec = load_codec(framing)
+        if codec is None:
+            raise ValueError(f"Framing '{framing}' is not available (library not installed)")
+        self.framing = framing
+        self._encode = codec[0]
+        self._stream = binary_stream
+
+    def encode(self, packet):
+        body = self._encode(packet)
+        return _HEADER.pack(len(body), PACKET_TAGS.get(packet.get("type"), 0)) + body
+
+    def write(self, packet):
+        self.write_many((packet,))
+
+    def write_many(self, packets):
+        self._stream.write(b"".join(self.encode(packet) for packet in packets))
+        self._stream.flush()
+
+
+def read_frames(binary_stream, framing="msgpack"):
+    """Yield (type name, packet) from a framed stream (the consumer side, used by tests/bench)"""
+    decode = load_codec(framing)[1]
+    while True:
+        header = binary_stream.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return
+        length, tag = _HEADER.unpack(header)
+        yield TAG_NAMES.get(tag, "unknown"), decode(binary_stream.read(length))
+
+
+# -----------------------------
+# BENCHMARK
+# -----------------------------
+def _sample_packets():
+    update = {
+        "type": "update", "active_window": "Google Chrome (Calculus notes - Week 4)",
+        "total_time": 1834, "switches": 57, "keys": 4211, "mouse": 93211, "is_inactive": False,
+        "top_apps": [["Visual Studio Code", 812.4], ["Google Chrome", 533.1], ["Terminal", 201.0],
+                     ["Slack", 95.7], ["Notion", 61.2]]
+    }
+    leo_comment = {
+        "type": "leo_comment", "content": "Your virtù shines, ragazzo mio. Keep the brush steady.",
+        "focus_score": 82, "emotion": "happy"
+    }
+    report = {
+        "type": "report", "content": "# 🎨 Session Codex\n\n" + "| Metric | Value |\n|:--|:--|\n" * 40 + "Lorem ipsum " * 200,
+        "stats": {"duration_seconds": 3600, "total_switches": 120, "focus_score": 74,
+                  "top_apps": [{"name": f"App {i}", "seconds": 600 - i * 50} for i in range(5)],
+                  "total_distraction_time": 540, "pause_count": 4, "key_presses": 9000, "mouse_clicks": 700},
+        "final_score": 74, "grade": "B", "total_iterations": 120
+    }
+    return {"update": update, "leo_comment": leo_comment, "report": report}
+
+
+def _bench(n):
+    codecs = {"json": (lambda p: (json.dumps(p) + "\n").encode("utf-8"), lambda b: json.loads(b))}
+    for name in ("msgpack", "cbor"):
+        codec = load_codec(name)
+        if codec is not None:
+            codecs[name] = codec
+        else:
+            print(f"({name} not installed, skipped)")
+
+    for packet_name, packet in _sample_packets().items():
+        print(f"{packet_name}:")
+        for codec_name, (encode, decode) in codecs.items():
+            start = time.perf_counter()
+            for _ in range(n):
+                data = encode(packet)
+            encode_time = time.perf_counter() - start
+            start = time.perf_counter()
+            for _ in range(n):
+                decode(data)
+            decode_time = time.perf_counter() - start
+            print(f"  {codec_name:8s} {len(data):6d} B   encode {n / encode_time:10.0f}/s   decode {n / decode_time:10.0f}/s")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--bench" in args:
+        i = args.index("--bench")
+        _bench(int(args[i + 1]) if len(args) > i + 1 and args[i + 1].isdigit() else 20000)
+    else:
+        print("Usage: packets.py --bench [N]")
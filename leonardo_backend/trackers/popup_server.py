@@ -0,0 +1,363 @@
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+
+# ============================================
+# POPUP SERVER
+# ============================================
+# The scolding popup used to be a fresh `python -c POPUP_SCRIPT_CODE` per
+# scolding: a new interpreter, a tkinter import, angry.png decoded and the
+# whole widget tree built before anything appeared. The popup server is one
+# long-lived process that builds the window once (hidden) and then only
+# changes the text and shows / hides it on JSON-line commands over a pipe.
+#
+#   python popup_server.py --serve [--headless] [--image angry.png]   (server side)
+#
+# Requests: {"id", "op": "show" | "hide" | "ping", "args": {...}}
+# Replies:  {"id", "result"} or {"id", "error"}
+# The headless stand-in (LEO_POPUP=headless, or no display available) answers
+# the same protocol without a GUI, for tests and CI.
+
+DEFAULT_IMAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "angry.png")
+
+
+def scolding_text(app_name):
+    return (f"You dare waste your genius on\n{app_name}?\n\n"
+            f"I did not paint the Mona Lisa\nwhile distracted by such nonsense.")
+
+
+class HeadlessPopup:
+    """Stand-in with the same interface: remembers what would be on screen"""
+
+    name = "headless"
+
+    def __init__(self, img_path=None):
+        self.visible = False
+        self.message = None
+        self.shown = 0
+
+    def show(self, app_name):
+        self.visible = True
+        self.message = scolding_text(app_name)
+        self.shown += 1
+        return {"visible": True, "shown": self.shown}
+
+    def hide(self):
+        self.visible = False
+        return {"visible": False}
+
+    def run(self, commands):
+        """Serve until stdin closes (no GUI event loop to share)"""
+        for request in commands:
+            _reply(self, request)
+
+
+class TkPopup:
+    """The Leonardo popup, built once and re-shown with a new message"""
+
+    name = "tk"
+
+    def __init__(self, img_path=None):
+        import tkinter as tk
+        self._tk = tk
+        self.root = root = tk.Tk()
+        root.title("Leonardo is Displeased")
+        # Built hidden; show() reveals it
+        root.withdraw()
+        self.shown = 0
+
+        # --- THEME ---
+        bg_color = "#FAF8F5"
+        text_color = "#1A1614"
+        accent_color = "#B8442C"
+        btn_bg = "#1A1614"
+
+        # --- GEOMETRY ---
+        self.size = (420, 520)
+        root.configure(bg=accent_color)
+        root.attributes("-topmost", True)
+        # Borderless logic (Safe for all platforms)
+        try:
+            root.overrideredirect(True)
+        except Exception:
+            pass
+
+        root.bind("<Escape>", self._close)
+        root.bind("<Button-1>", self._close)
+
+        # --- CONTENT ---
+        inner_frame = tk.Frame(root, bg=bg_color)
+        inner_frame.pack_propagate(False)
+        inner_frame.pack(expand=True, fill="both", padx=5, pady=5)
+        inner_frame.bind("<Button-1>", self._close)
+
+        tk.Label(inner_frame, text="Che disastro!", font=("Times New Roman", 22, "bold italic"),
+                 bg=bg_color, fg=accent_color).pack(pady=(20, 10))
+
+        # Image: decoded and shrunk once, for every popup of the session
+        try:
+            if not img_path or not os.path.exists(img_path):
+                raise FileNotFoundError(img_path)
+            photo = tk.PhotoImage(file=img_path)
+            while photo.width() > 220 or photo.height() > 220:
+                photo = photo.subsample(2, 2)
+            img_lbl = tk.Label(inner_frame, image=photo, bg=bg_color)
+            img_lbl.image = photo
+            img_lbl.pack(pady=5)
+            img_lbl.bind("<Button-1>", self._close)
+        except Exception:
+            tk.Label(inner_frame, text="😡", font=("Arial", 50), bg=bg_color).pack(pady=10)
+
+        self.message = tk.Label(inner_frame, text="", font=("Garamond", 15),
+                                bg=bg_color, fg=text_color, justify="center")
+        self.message.pack(pady=15, padx=10)
+        self.message.bind("<Button-1>", self._close)
+
+        # --- CUSTOM FAKE BUTTON (For High Contrast) ---
+        btn = tk.Label(inner_frame, text="I SHALL FOCUS NOW", font=("Helvetica", 11, "bold"),
+                       bg=btn_bg, fg="white", padx=20, pady=12, cursor="hand2")
+        btn.pack(side="bottom", pady=25)
+        btn.bind("<Button-1>", self._close)
+
+    def _close(self, event=None):
+        self.hide()
+
+    def show(self, app_name):
+        root = self.root
+        self.message.configure(text=scolding_text(app_name))
+
+        # Centre on the screen (it may have changed since the last popup)
+        w, h = self.size
+        x = int((root.winfo_screenwidth() / 2) - (w / 2))
+        y = int((root.winfo_screenheight() / 2) - (h / 2))
+        root.geometry(f"{w}x{h}+{x}+{y}")
+
+        root.deiconify()
+        # --- FORCE FOCUS (CRITICAL FOR MAC) ---
+        root.lift()
+        root.focus_force()
+        if sys.platform == "darwin":
+            try:
+                subprocess.Popen(["/usr/bin/osascript", "-e",
+                                  'tell app "System Events" to set frontmost of first process '
+                                  f'whose unix id is {os.getpid()} to true'],
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            except OSError:
+                pass
+        self.shown += 1
+        return {"visible": True, "shown": self.shown}
+
+    def hide(self):
+        self.root.withdraw()
+        return {"visible": False}
+
+    def run(self, commands):
+        """Tk owns the main thread; stdin is read by a thread and handed over through a queue"""
+        inbox = queue.Queue()
+
+        def pump():
+            for request in commands:
+                inbox.put(request)
+            inbox.put(None)
+
+        threading.Thread(target=pump, daemon=True).start()
+
+        def drain():
+            while True:
+                try:
+                    request = inbox.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    self.root.destroy()
+                    return
+                _reply(self, request)
+            self.root.after(100, drain)
+
+        self.root.after(0, drain)
+        self.root.mainloop()
+
+
+def _handle(popup, request):
+    op = request.get("op")
+    args = request.get("args") or {}
+    if op == "show":
+        return popup.show(args.get("app_name", "Distraction"))
+    if op == "hide":
+        return popup.hide()
+    if op == "ping":
+        return {"backend": popup.name}
+    raise ValueError(f"Unknown op: {op}")
+
+
+def _answer(popup, request):
+    reply = {"id": request.get("id")}
+    try:
+        reply["result"] = _handle(popup, request)
+    except Exception as e:
+        reply["error"] = str(e)
+    return reply
+
+
+def _reply(popup, request):
+    sys.stdout.write(json.dumps(_answer(popup, request)) + "\n")
+    sys.stdout.flush()
+
+
+def _requests(stream):
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            continue
+
+
+def serve(headless=False, img_path=DEFAULT_IMAGE):
+    popup = None
+    if not headless:
+        try:
+            popup = TkPopup(img_path)
+        except Exception as e:
+            # No display / no tkinter: keep answering, just without a window
+            print(f"Popup server running headless: {e}", file=sys.stderr)
+    if popup is None:
+        popup = HeadlessPopup(img_path)
+    popup.run(_requests(sys.stdin))
+
+
+# -----------------------------
+# BACKEND-SIDE CLIENT
+# -----------------------------
+class PopupError(RuntimeError):
+    pass
+
+
+class PopupClient:
+    """
+    Starts the popup server on first use and sends it show/hide commands.
+    Commands never wait for the GUI; if the server has died it is restarted
+    and the command is sent again. At most `max_restarts` restarts per
+    `restart_window` seconds: past that, commands go to an in-process
+    HeadlessPopup (no window, the session goes on) until the window moves on.
+    """
+
+    def __init__(self, headless=None, img_path=DEFAULT_IMAGE, max_restarts=5, restart_window=300.0,
+                 clock=time.monotonic):
+        self.headless = os.environ.get("LEO_POPUP") == "headless" if headless is None else headless
+        self.img_path = img_path
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self._clock = clock
+        self._restart_times = deque()
+        self.restarts = 0
+        self.degraded = None     # HeadlessPopup standing in while the server is out of restarts
+        self.replies = queue.Queue(maxsize=100)   # last replies, for tests and debugging
+        self._proc = None
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _restart_allowed(self):
+        cutoff = self._clock() - self.restart_window
+        while self._restart_times and self._restart_times[0] < cutoff:
+            self._restart_times.popleft()
+        return len(self._restart_times) < self.max_restarts
+
+    def _ensure_running(self):
+        if self._proc is not None and self._proc.poll() is None:
+            return
+        if self._proc is not None:
+            if not self._restart_allowed():
+                raise PopupError(f"Popup server died {self.max_restarts} times in {self.restart_window:.0f}s")
+            self._restart_times.append(self._clock())
+            self.restarts += 1
+        command = [sys.executable, "-u", os.path.abspath(__file__), "--serve", "--image", self.img_path]
+        if self.headless:
+            command.append("--headless")
+        self._proc = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            bufsize=1
+        )
+        threading.Thread(target=self._read_replies, args=(self._proc,), daemon=True).start()
+        self.degraded = None
+
+    def _read_replies(self, proc):
+        for line in proc.stdout:
+            try:
+                reply = json.loads(line)
+            except ValueError:
+                continue
+            if "error" in reply:
+                print(f"Popup server error: {reply['error']}", file=sys.stderr)
+            self._keep_reply(reply)
+
+    def _keep_reply(self, reply):
+        try:
+            self.replies.put_nowait(reply)
+        except queue.Full:
+            self.replies.get_nowait()
+            self.replies.put_nowait(reply)
+
+    def send(self, op, **args):
+        with self._lock:
+            for _ in range(2):
+                self._next_id += 1
+                request = {"id": self._next_id, "op": op, "args": args}
+                try:
+                    self._ensure_running()
+                except PopupError as e:
+                    return self._send_degraded(request, e)
+                try:
+                    self._proc.stdin.write(json.dumps(request) + "\n")
+                    self._proc.stdin.flush()
+                    return self._next_id
+                except (OSError, ValueError):
+                    # Died between the poll() and the write: restart once and resend
+                    self._proc.kill()
+                    self._proc.wait()
+            return self._send_degraded(request, PopupError("Popup server pipe broken"))
+
+    def _send_degraded(self, request, reason):
+        """No server to talk to: the command is answered in-process, without a window"""
+        if self.degraded is None:
+            print(f"Popup server unavailable ({reason}), popups are headless for now", file=sys.stderr)
+            self.degraded = HeadlessPopup(self.img_path)
+        self._keep_reply(_answer(self.degraded, request))
+        return request["id"]
+
+    def show(self, app_name):
+        return self.send("show", app_name=app_name)
+
+    def hide(self):
+        return self.send("hide")
+
+    def close(self):
+        with self._lock:
+            if self._proc is not None:
+                try:
+                    self._proc.stdin.close()
+                    self._proc.wait(timeout=1)
+                except Exception:
+                    self._proc.kill()
+                self._proc = None
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--serve" in args:
+        image = args[args.index("--image") + 1] if "--image" in args else DEFAULT_IMAGE
+        serve(headless="--headless" in args or os.environ.get("LEO_POPUP") == "headless", img_path=image)
+    else:
+        print("Usage: popup_server.py --serve [--headless] [--image path]")
@@ -0,0 +1,217 @@
+import json
+import os
+import re
+import sys
+import threading
+
+# ============================================
+# PROMPT COMPACTION
+# ============================================
+# The 30 s evaluation prompt used to embed json.dumps() of every unique
+# "App (Document)" string of the chunk (browser tabs, unread counters, full
+# paths, long titles) plus the free-text summary, hundreds of tokens on a
+# busy chunk. Before the prompt is built, window titles are normalized,
+# collapsed to app + short document, merged, ranked by time share and cut
+# to a token budget; the summary gets a budget of its own.
+#
+# Tokens are counted with a real tokenizer when one is available, otherwise
+# estimated (a BPE-like heuristic, usually within ~15% on English titles,
+# good enough for budgeting but not exact). LEO_TOKENIZER chooses:
+#   auto (default)        tiktoken cl100k_base if installed, else the heuristic
+#   tiktoken:<encoding>   a tiktoken encoding
+#   hf:<name or path>     a transformers tokenizer (e.g. a local Llama tokenizer)
+#   heuristic             always the estimate
+
+_WORD = re.compile(r"\w+|[^\w\s]")
+_UNREAD = re.compile(r"^\(\d+\)\s*|\s*\(\d+\)")
+_BROWSER_SUFFIX = re.compile(
+    r"\s+[-—–|]\s+(Google Chrome|Chrome|Mozilla Firefox|Firefox|Safari|Microsoft Edge|Edge|Brave|Opera|Arc)$",
+    re.IGNORECASE
+)
+_SEPARATOR = re.compile(r"\s+[-—–|]\s+")
+_SPACES = re.compile(r"\s+")
+
+
+def heuristic_tokens(text):
+    """BPE-like estimate: one token per ~4 characters of each word, one per punctuation mark"""
+    return sum(1 if not piece[0].isalnum() and piece[0] != "_" else (len(piece) + 3) // 4
+               for piece in _WORD.findall(text))
+
+
+_counter = None
+_counter_name = None
+
+
+def _load_counter(spec):
+    """(name, fn(text) -> tokens) for a LEO_TOKENIZER value; raises if it cannot be loaded"""
+    kind, _, arg = spec.partition(":")
+    if kind == "heuristic":
+        return "heuristic", heuristic_tokens
+    if kind == "tiktoken":
+        import tiktoken
+        encoding = tiktoken.get_encoding(arg or "cl100k_base")
+        return f"tiktoken:{encoding.name}", lambda text: len(encoding.encode(text, disallowed_special=()))
+    if kind == "hf":
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(arg)
+        return f"hf:{arg}", lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+    raise ValueError(f"Unknown tokenizer '{spec}'")
+
+
+def set_tokenizer(spec=None):
+    """Choose the token counter (see LEO_TOKENIZER); falls back to the heuristic. Returns its name"""
+    global _counter, _counter_name
+    spec = spec or os.environ.get("LEO_TOKENIZER", "auto")
+    try:
+        name, counter = _load_counter("tiktoken" if spec == "auto" else spec)
+    except Exception as e:
+        # Not installed, or the encoding cannot be downloaded (offline): estimate instead
+        if spec != "auto":
+            print(f"Tokenizer '{spec}' unavailable ({e}), estimating tokens", file=sys.stderr)
+        name, counter = "heuristic", heuristic_tokens
+    _counter, _counter_name = counter, name
+    return name
+
+
+def tokenizer_name():
+    if _counter is None:
+        set_tokenizer()
+    return _counter_name
+
+
+def estimate_tokens(text):
+    """Tokens in `text`: exact with a tokenizer, estimated without one"""
+    if _counter is None:
+        set_tokenizer()     # two threads may both load it on the first call: harmless
+    return _counter(text)
+
+
+def _redact_path(match):
+    # The file name says what is being worked on, the directories above it say nothing useful
+    name = re.split(r"[?#]", match.group(0).rstrip("/"))[0].rsplit("/", 1)[-1]
+    return "…/" + name if name else "/…"
+
+
+def _clean(text):
+    text = _UNREAD.sub("", text.strip())
+    text = _BROWSER_SUFFIX.sub("", text)
+    # Redactions like sanitize_title(): no directories, addresses or long numbers in prompts
+    text = re.sub(r"/[^\s]+", _redact_path, text)
+    text = re.sub(r"\S+@\S+", "email@…", text)
+    text = re.sub(r"\d{4,}", "####", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def split_title(title):
+    """'Chrome (Inbox (3) - Gmail)' -> ('Chrome', 'Inbox - Gmail')"""
+    app, sep, doc = title.partition(" (")
+    if sep and doc.endswith(")"):
+        doc = doc[:-1]
+    return _clean(app), _clean(doc) if sep else ""
+
+
+def _shorten(text, limit):
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+def short_doc(doc, limit=32):
+    """Shorten the title but keep its last segment: the site ("… - YouTube") decides what it is"""
+    if len(doc) <= limit:
+        return doc
+    parts = _SEPARATOR.split(doc)
+    if len(parts) > 1 and len(parts[-1]) < limit // 2:
+        site = parts[-1]
+        return f"{_shorten(parts[0], max(8, limit - len(site) - 3))} - {site}"
+    return _shorten(doc, limit)
+
+
+def compact_windows(window_seconds, token_budget=120, doc_chars=32):
+    """
+    {"App (Document)": seconds} -> (["App: doc 45%", ..., "+3 others 6%"], tokens).
+    Titles that collapse to the same app + short document are merged.
+    """
+    merged = {}
+    for title, seconds in window_seconds.items():
+        app, doc = split_title(title)
+        key = (app or "Unknown", short_doc(doc, doc_chars))
+        merged[key] = merged.get(key, 0.0) + seconds
+    total = sum(merged.values()) or 1.0
+
+    lines = []
+    used = 0
+    ranked = sorted(merged.items(), key=lambda item: item[1], reverse=True)
+    for index, ((app, doc), seconds) in enumerate(ranked):
+        line = f"{app}: {doc} {round(seconds * 100 / total)}%" if doc else f"{app} {round(seconds * 100 / total)}%"
+        cost = estimate_tokens(line) + 1
+        if used + cost > token_budget and lines:
+            rest = ranked[index:]
+            share = round(sum(s for _, s in rest) * 100 / total)
+            lines.append(f"+{len(rest)} others {share}%")
+            used += estimate_tokens(lines[-1]) + 1
+            break
+        lines.append(line)
+        used += cost
+    return lines, used
+
+
+def compact_text(text, token_budget=80):
+    """Whole sentences from the start of `text` while they fit the budget (at least one, shortened)"""
+    text = _SPACES.sub(" ", text or "").strip()
+    if estimate_tokens(text) <= token_budget:
+        return text
+    kept = []
+    used = 0
+    for sentence in re.split(r"(?<=[.!?])\s+", text):
+        cost = estimate_tokens(sentence)
+        if used + cost > token_budget:
+            break
+        kept.append(sentence)
+        used += cost
+    if kept:
+        return " ".join(kept)
+    words = text.split()
+    while words and estimate_tokens(" ".join(words)) > token_budget:
+        words = words[:max(1, len(words) * 3 // 4)] if len(words) > 1 else []
+    return " ".join(words) + "…"
+
+
+class PromptStats:
+    """Estimated prompt tokens per call, before and after compaction"""
+
+    def __init__(self):
+        self.calls = 0
+        self.tokens = 0
+        self.tokens_saved = 0
+        self.last = None
+        self._lock = threading.Lock()
+
+    def record(self, prompt_tokens, raw_tokens, compact_tokens):
+        with self._lock:
+            self.calls += 1
+            self.tokens += prompt_tokens
+            self.tokens_saved += max(0, raw_tokens - compact_tokens)
+            self.last = prompt_tokens
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "avg_prompt_tokens": round(self.tokens / self.calls) if self.calls else 0,
+            "last_prompt_tokens": self.last,
+            "tokens_saved": self.tokens_saved,
+        }
+
+
+if __name__ == "__main__":
+    sample = {
+        "Google Chrome (Inbox (12) - someone@example.com - Gmail - Google Chrome)": 4.0,
+        "Google Chrome (Lecture 7 - Fourier transforms - YouTube - Google Chrome)": 11.0,
+        "Google Chrome (Lecture 7 - Fourier transforms - YouTube)": 3.0,
+        "VSCode (/Users/me/projects/leonardo/leonardo_backend/trackers/trackers.py - leonardo)": 9.0,
+        "(3) WhatsApp": 2.0,
+        "Notion (Exam prep 2024 - Signals and Systems - week 7 notes and exercises)": 1.0,
+    }
+    raw = json.dumps(list(sample))
+    lines, tokens = compact_windows(sample, token_budget=40)
+    print(f"tokenizer: {tokenizer_name()}")
+    print(f"raw:     {estimate_tokens(raw):4d} tokens  {raw}")
+    print(f"compact: {tokens:4d} tokens  {json.dumps(lines, ensure_ascii=False)}")
@@ -0,0 +1,188 @@
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:
+    # Windows: no getrusage, stats() just reports less
+    resource = None
+
+# ============================================
+# ASYNC RUNTIME
+# ============================================
+# The backend used to run one thread per loop (window monitor, stdin reader)
+# plus a main thread sleeping between blocking LLM calls. Now every loop is a
+# task on one asyncio event loop. Calls that block (AppleScript / OS queries,
+# LLM requests) go to small bounded thread pools so they never stall the
+# loop, and STOP cancels the tasks instead of abandoning daemon threads.
+# Only the pynput listeners and the native window hooks keep their own
+# threads; they reach the loop through call_soon_threadsafe().
+
+
+class AsyncRuntime:
+    """Event loop plus bounded executors shared by every backend task"""
+
+    def __init__(self, os_workers=2, llm_workers=1):
+        self.os_workers = os_workers
+        self.llm_workers = llm_workers
+        self.loop = None
+        self._os_pool = None
+        self._llm_pool = None
+        self._tasks = set()
+        self._started = time.monotonic()
+
+    def run(self, main):
+        """Run the coroutine function main() to completion, then cancel whatever is left"""
+        return asyncio.run(self.run_async(main))
+
+    async def run_async(self, main):
+        """Same as run() on an already running loop (daemon mode: one call per session)"""
+        self.loop = asyncio.get_running_loop()
+        self._os_pool = ThreadPoolExecutor(max_workers=self.os_workers, thread_name_prefix="os-query")
+        self._llm_pool = ThreadPoolExecutor(max_workers=self.llm_workers, thread_name_prefix="llm")
+        try:
+            return await main()
+        finally:
+            await self.cancel_all()
+            self._os_pool.shutdown(wait=False, cancel_futures=True)
+            self._llm_pool.shutdown(wait=False, cancel_futures=True)
+
+    # -----------------------------
+    # TASKS
+    # -----------------------------
+    def spawn(self, coro, name=None):
+        task = self.loop.create_task(coro, name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Task {task.get_name()} failed: {task.exception()!r}", file=sys.stderr)
+
+    async def cancel_all(self):
+        """Cancel every spawned task and wait until they have all unwound"""
+        tasks = [task for task in self._tasks if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # -----------------------------
+    # BLOCKING WORK
+    # -----------------------------
+    async def run_blocking(self, fn, *args):
+        """Short blocking OS query on the bounded pool"""
+        return await self.loop.run_in_executor(self._os_pool, fn, *args)
+
+    async def run_llm(self, fn, *args):
+        """LLM request on its own pool, so a slow provider cannot starve the OS queries"""
+        return await self.loop.run_in_executor(self._llm_pool, fn, *args)
+
+    # -----------------------------
+    # OTHER THREADS
+    # -----------------------------
+    def call_soon_threadsafe(self, fn, *args):
+        """Schedule fn on the loop from any thread; False once the loop is gone"""
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return False
+        try:
+            loop.call_soon_threadsafe(fn, *args)
+        except RuntimeError:
+            return False
+        return True
+
+    def in_loop(self):
+        """True when called from the loop's own thread"""
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    async def open_line_reader(self, stream=None):
+        """
+        Return an async readline() for `stream` (stdin by default) that yields
+        '' at EOF. Pipes are read by the loop itself; where that is not
+        supported (Windows, terminals, files) one helper thread blocks instead.
+        """
+        stream = stream or sys.stdin
+        try:
+            reader = asyncio.StreamReader()
+            await self.loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), stream)
+        except (NotImplementedError, OSError, ValueError):
+            lines = asyncio.Queue()
+
+            def pump():
+                while True:
+                    line = stream.readline()
+                    if not self.call_soon_threadsafe(lines.put_nowait, line) or not line:
+                        return
+
+            threading.Thread(target=pump, name="stdin-reader", daemon=True).start()
+            return lines.get
+
+        async def readline():
+            return (await reader.readline()).decode("utf-8", "replace")
+        return readline
+
+    def stats(self):
+        """Process CPU time, thread count and context switches (≈ wakeups) so far"""
+        stats = {
+            "uptime_seconds": round(time.monotonic() - self._started, 1),
+            "cpu_seconds": round(time.process_time(), 2),
+            "threads": threading.active_count(),
+        }
+        if resource is not None:
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            stats["voluntary_switches"] = usage.ru_nvcsw
+            stats["involuntary_switches"] = usage.ru_nivcsw
+        return stats
+
+
+# ============================================
+# PACKET OUTBOX
+# ============================================
+# During a session packets are queued and written by a single task; whatever
+# piled up since its last turn goes out with one write and one flush.
+
+
+class PacketOutbox:
+    """Batches packets from any task or thread into a single writer task"""
+
+    def __init__(self, runtime, write_many):
+        self._runtime = runtime
+        self._write_many = write_many
+        self._queue = None
+
+    def put(self, packet):
+        """Queue a packet; False when the outbox is not running (caller writes it directly)"""
+        queue = self._queue
+        if queue is None:
+            return False
+        if self._runtime.in_loop():
+            queue.put_nowait(packet)
+            return True
+        return self._runtime.call_soon_threadsafe(queue.put_nowait, packet)
+
+    async def run(self):
+        self._queue = asyncio.Queue()
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                self._drain_into(batch)
+                self._write_many(batch)
+        finally:
+            # Cancelled at shutdown: nothing queued may be lost
+            batch = []
+            self._drain_into(batch)
+            self._queue = None
+            if batch:
+                self._write_many(batch)
+
+    def _drain_into(self, batch):
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+
+# ============================================
+# ADAPTIVE SAMPLING SCHEDULER
+# ============================================
+# Loops sleep through an AdaptiveScheduler instead of a fixed time.sleep().
+# While the user is idle the interval grows geometrically up to `ceiling`;
+# any input event or window switch calls poke(), which snaps it back to
+# `floor` and wakes the sleeping loop immediately.
+# Loops running on the asyncio runtime use wait_async() instead; poke() may
+# still come from any thread (pynput listeners, window sources).
+
+
+class AdaptiveScheduler:
+    """Sleep helper whose interval backs off while idle and resets on activity"""
+
+    def __init__(self, floor=0.5, ceiling=5.0, backoff=1.5):
+        if floor <= 0 or ceiling < floor:
+            raise ValueError("Scheduler needs 0 < floor <= ceiling")
+        self.floor = floor
+        self.ceiling = ceiling
+        self.backoff = backoff
+        self.interval = floor
+        self._wake = threading.Event()
+        self._last_tick = time.monotonic()
+        self._loop = None
+        self._async_wake = None
+
+    @property
+    def backed_off(self):
+        """True while sleeping longer than the floor (cheap check for hot callbacks)"""
+        return self.interval > self.floor
+
+    def reset(self):
+        """Start measuring elapsed time from now (call right before the loop starts)"""
+        self.interval = self.floor
+        self._last_tick = time.monotonic()
+
+    def bind_loop(self, loop):
+        """Let poke() wake a wait_async() running on `loop`"""
+        self._loop = loop
+        self._async_wake = asyncio.Event()
+
+    def poke(self):
+        """Activity seen: go back to the fast rate and wake the loop now"""
+        self.interval = self.floor
+        self._wake.set()
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._async_wake.set)
+            except RuntimeError:
+                # Loop already closed (session over)
+                pass
+
+    def _next_interval(self, idle):
+        if idle:
+            self.interval = min(self.ceiling, self.interval * self.backoff)
+        else:
+            self.interval = self.floor
+
+    def wait(self, idle=False):
+        """
+        Sleep for the next interval and return the real elapsed seconds since
+        the previous wait() returned, so callers can integrate over it.
+        """
+        self._next_interval(idle)
+        self._wake.wait(self.interval)
+        self._wake.clear()
+        return self._elapsed()
+
+    async def wait_async(self, idle=False):
+        """wait() for coroutines; needs bind_loop() first"""
+        self._next_interval(idle)
+        try:
+            await asyncio.wait_for(self._async_wake.wait(), self.interval)
+        except asyncio.TimeoutError:
+            pass
+        self._async_wake.clear()
+        return self._elapsed()
+
+    def _elapsed(self):
+        now = time.monotonic()
+        elapsed = now - self._last_tick
+        self._last_tick = now
+        return elapsed
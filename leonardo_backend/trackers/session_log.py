@@ -0,0 +1,205 @@
+import atexit
+import gzip
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import deque
+
+# ============================================
+# SESSION LOG
+# ============================================
+# log_debug() used to open debug_leonardo.jsonl, append one line and close
+# it on every call, which for per-second traffic meant a file open per
+# second. The session logger only appends records to a bounded in-memory
+# queue (never blocks; drops and counts when full). A background thread
+# wakes every `flush_interval` seconds, writes everything queued in one
+# write + fsync, and rotates the file by size or age, gzipping old files.
+# Packets carry window titles, document names and LLM text: by default only
+# their type is logged, the contents only with LEO_LOG_PACKETS=1 ("update"
+# packets are then sampled, everything else is logged as is).
+#
+# Environment:
+#   LEO_LOG_PATH             log file (default: ~/.leofocus/logs/debug_leonardo.jsonl)
+#   LEO_LOG_PACKETS          1 = log packet contents, not just their type (default 0)
+#   LEO_LOG_UPDATES          seconds between logged "update" packets (0 = all, off = none)
+#   LEO_LOG_FLUSH_SECONDS    writer interval (default 20)
+#   LEO_LOG_MAX_BYTES        rotate above this size (default 5 MB)
+#   LEO_LOG_COMPRESS         gzip rotated files (default 1)
+
+
+class SessionLogger:
+    """JSON-lines log fed through a bounded queue and written by one background thread"""
+
+    def __init__(self, path, max_queue=10000, flush_interval=20.0, max_bytes=5 * 1024 * 1024,
+                 max_age=24 * 3600.0, backups=5, compress=True, update_every=30.0, log_contents=False,
+                 clock=time.time):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backups = backups
+        self.compress = compress
+        self.update_every = update_every     # None = never log updates
+        self.log_contents = log_contents
+        self._clock = clock
+        self._queue = deque()
+        self._max_queue = max_queue
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._last_update_logged = None
+        self._opened_at = None
+        self.dropped = 0
+        self.written = 0
+        self.writes = 0
+        self.rotations = 0
+
+    @classmethod
+    def from_env(cls, default_path):
+        updates = os.environ.get("LEO_LOG_UPDATES", "30")
+        return cls(
+            os.environ.get("LEO_LOG_PATH", default_path),
+            flush_interval=float(os.environ.get("LEO_LOG_FLUSH_SECONDS", "20")),
+            max_bytes=int(os.environ.get("LEO_LOG_MAX_BYTES", str(5 * 1024 * 1024))),
+            compress=os.environ.get("LEO_LOG_COMPRESS", "1") != "0",
+            update_every=None if updates == "off" else float(updates),
+            log_contents=os.environ.get("LEO_LOG_PACKETS", "0") == "1",
+        )
+
+    # -----------------------------
+    # PRODUCERS (any thread, never block)
+    # -----------------------------
+    def log(self, record):
+        if len(self._queue) >= self._max_queue:
+            self.dropped += 1
+            return
+        if "ts" not in record:
+            record = dict(record, ts=self._clock())
+        self._queue.append(record)
+        if self._thread is None:
+            self.start()
+
+    def log_packet(self, packet):
+        """Log a packet sent to the UI (type only unless log_contents), sampling the per-second updates"""
+        if packet.get("type") == "report_chunk":
+            return      # the whole report is logged once, with the "report" packet
+        if packet.get("type") == "update":
+            if self.update_every is None:
+                return
+            now = self._clock()
+            if (self._last_update_logged is not None and not packet.get("full")
+                    and now - self._last_update_logged < self.update_every):
+                return
+            self._last_update_logged = now
+        if self.log_contents:
+            self.log({"kind": "packet", "packet": packet})
+        else:
+            self.log({"kind": "packet", "type": packet.get("type")})
+
+    def flush(self):
+        """Ask the writer to write now (end of a session); does not wait"""
+        self._wake.set()
+
+    # -----------------------------
+    # WRITER THREAD
+    # -----------------------------
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="session-log", daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def close(self, timeout=2.0):
+        """Write what is queued and stop the writer"""
+        if self._thread is None or self._stopping:
+            return
+        self._stopping = True
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self._write_batch()
+            except OSError as e:
+                print(f"Session log write failed: {e}", file=sys.stderr)
+            if self._stopping:
+                return
+
+    def _write_batch(self):
+        queue = self._queue
+        lines = []
+        while queue:
+            try:
+                lines.append(json.dumps(queue.popleft(), ensure_ascii=False, default=str) + "\n")
+            except (TypeError, ValueError):
+                continue
+        if not lines:
+            return
+        data = "".join(lines).encode("utf-8")
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._rotate_if_needed(len(data))
+        with open(self.path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if self._opened_at is None:
+            self._opened_at = self._clock()
+        self.written += len(lines)
+        self.writes += 1
+
+    # -----------------------------
+    # ROTATION
+    # -----------------------------
+    def _rotate_if_needed(self, incoming):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return
+        size = stat.st_size
+        if self._opened_at is None:
+            # A file left by an earlier run: its age counts from when it was started
+            self._opened_at = getattr(stat, "st_birthtime", None) or \
+                (stat.st_ctime if sys.platform == "win32" else stat.st_mtime)
+        too_big = size + incoming > self.max_bytes
+        too_old = self._opened_at is not None and self._clock() - self._opened_at > self.max_age
+        if size and (too_big or too_old):
+            self._rotate()
+
+    def _name(self, index):
+        return f"{self.path}.{index}" + (".gz" if self.compress else "")
+
+    def _rotate(self):
+        # path.(n-1) -> path.n ... path -> path.1 (gzipped), oldest dropped
+        oldest = self._name(self.backups)
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(self._name(index)):
+                os.replace(self._name(index), self._name(index + 1))
+        if self.compress:
+            with open(self.path, "rb") as src, gzip.open(self._name(1), "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(self.path)
+        else:
+            os.replace(self.path, self._name(1))
+        self._opened_at = None
+        self.rotations += 1
+
+    def stats(self):
+        return {
+            "written": self.written,
+            "writes": self.writes,
+            "dropped": self.dropped,
+            "rotations": self.rotations,
+            "queued": len(self._queue),
+        }
@@ -0,0 +1,59 @@
+import sys
+import threading
+import time
+
+# ============================================
+# STARTUP PROFILE
+# ============================================
+# `python trackers.py "<context>" --profile-startup` marks named checkpoints
+# from the moment the tracker module starts loading until the session is
+# running, then prints how long each phase took (and sends it to the UI as
+# a "startup_profile" packet). Marks may come from worker threads, since
+# several phases now overlap.
+
+_PROCESS_T0 = time.perf_counter()
+
+
+class StartupProfile:
+    """Named checkpoints since `origin`, reported as a per-phase breakdown"""
+
+    def __init__(self, enabled=False, origin=None, clock=time.perf_counter):
+        self.enabled = enabled
+        self._clock = clock
+        self._origin = _PROCESS_T0 if origin is None else origin
+        self._marks = []
+        self._lock = threading.Lock()
+
+    def restart(self):
+        """New origin (daemon mode: every session has its own startup)"""
+        with self._lock:
+            self._origin = self._clock()
+            self._marks = []
+
+    def mark(self, phase):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._marks.append((phase, self._clock()))
+
+    def phases(self):
+        """[{"phase", "ms", "at_ms"}] in the order the checkpoints were reached"""
+        with self._lock:
+            marks = sorted(self._marks, key=lambda m: m[1])
+            origin = self._origin
+        rows = []
+        previous = origin
+        for phase, at in marks:
+            rows.append({
+                "phase": phase,
+                "ms": round((at - previous) * 1000, 1),
+                "at_ms": round((at - origin) * 1000, 1),
+            })
+            previous = at
+        return rows
+
+    def report(self, stream=None):
+        stream = stream or sys.stderr
+        print("Startup profile (ms):", file=stream)
+        for row in self.phases():
+            print(f"  {row['phase']:<36s} {row['ms']:9.1f}   (t={row['at_ms']:.1f})", file=stream)
@@ -1,152 +1,39 @@
+from startup_profile import StartupProfile
+import asyncio
 import json
 import time
 import threading
 import os
 import sys
-from pynput import keyboard, mouse
 import subprocess
 from collections import Counter
-import tkinter as tk
-from tkinter import messagebox
-from local_summarizer import summarize_activity_with_llm, get_start_session_advice
-from llm_client_2 import create_json_memory, generate_final_report_from_memory
+# pynput and the LLM clients are imported where they are first used (off the startup path);
+# tkinter is only needed by the popup subprocess
+from window_source import create_window_source
+from doc_cache import DocumentNameCache
+from classifier import TitleClassifier
+from scheduler import AdaptiveScheduler
+from accounting import AccountingEngine, top_windows
+from event_log import EventLog, EventType
+from input_counters import InputAggregator, MouseMotionSampler
+from packets import DeltaEncoder, JsonLinesWriter, FramedWriter, ChunkCoalescer, load_codec
+from commands import OutputControl, CommandError, parse_command
+from runtime import AsyncRuntime, PacketOutbox
+from llm_worker import EvaluationWorker
+from daemon import SessionDaemon
+from popup_server import PopupClient
+from session_log import SessionLogger
+from checkpoint import CheckpointJournal
+from os_helper import OSQueryClient, OSHelperError, default_backend, mac_document_script, MAC_FRONTMOST_SCRIPT, MAC_PROCESSES_SCRIPT
+
+startup = StartupProfile(enabled="--profile-startup" in sys.argv[1:])
+startup.mark("imports")
 
 # FORCE UTF-8 ON WINDOWS
 if sys.platform.startswith("win"):
     sys.stdout.reconfigure(encoding='utf-8')
     sys.stderr.reconfigure(encoding='utf-8')
 
-# ============================================
-# CROSS-PLATFORM POPUP SCRIPT (The "Blueprint")
-# ============================================
-POPUP_SCRIPT_CODE = r"""
-import tkinter as tk
-import sys
-import os
-
-def show_popup(app_name, img_path):
-    try:
-        root = tk.Tk()
-        root.title("Leonardo is Displeased")
-
-        # --- THEME ---
-        bg_color = "#FAF8F5"
-        text_color = "#1A1614"
-        accent_color = "#B8442C"
-        btn_bg = "#1A1614" 
-
-        # --- SETUP HIDDEN WINDOW ---
-        # Hide window initially to prevent 'jumping' or wrong placement
-        root.withdraw()
-
-        # --- GEOMETRY CALCULATION ---
-        w, h = 420, 520
-        
-        # Get screen dimensions
-        ws = root.winfo_screenwidth()
-        hs = root.winfo_screenheight()
-        
-        # Calculate X and Y coordinates (Strict Integers)
-        x = int((ws / 2) - (w / 2))
-        y = int((hs / 2) - (h / 2))
-        
-        # Set position
-        root.geometry(f'{w}x{h}+{x}+{y}')
-
-        # --- OS SPECIFIC TWEAKS ---
-        root.configure(bg=accent_color)
-        root.attributes("-topmost", True)
-        
-        # Borderless logic (Safe for all platforms)
-        try:
-            root.overrideredirect(True) 
-        except:
-            pass
-
-        # --- CLOSE LOGIC ---
-        def close_popup(event=None):
-            root.destroy()
-        
-        root.bind("<Escape>", close_popup)
-        root.bind("<Button-1>", close_popup)
-
-        # --- CONTENT ---
-        inner_frame = tk.Frame(root, bg=bg_color)
-        inner_frame.pack_propagate(False) 
-        inner_frame.pack(expand=True, fill="both", padx=5, pady=5)
-        inner_frame.bind("<Button-1>", close_popup)
-
-        # Title
-        tk.Label(inner_frame, text="Che disastro!", font=("Times New Roman", 22, "bold italic"), 
-                 bg=bg_color, fg=accent_color).pack(pady=(20, 10))
-
-        # Image (With Resize Loop)
-        try:
-            if os.path.exists(img_path):
-                photo = tk.PhotoImage(file=img_path)
-                # Auto-shrink logic
-                while photo.width() > 220 or photo.height() > 220:
-                    photo = photo.subsample(2, 2)
-                img_lbl = tk.Label(inner_frame, image=photo, bg=bg_color)
-                img_lbl.image = photo
-                img_lbl.pack(pady=5)
-                img_lbl.bind("<Button-1>", close_popup)
-            else:
-                tk.Label(inner_frame, text="😡", font=("Arial", 50), bg=bg_color).pack(pady=10)
-        except Exception:
-            tk.Label(inner_frame, text="😡", font=("Arial", 50), bg=bg_color).pack(pady=10)
-
-        # Message
-        msg_text = (f"You dare waste your genius on\n{app_name}?\n\n"
-                    f"I did not paint the Mona Lisa\nwhile distracted by such nonsense.")
-        
-        msg_lbl = tk.Label(inner_frame, text=msg_text, font=("Garamond", 15), 
-                 bg=bg_color, fg=text_color, justify="center")
-        msg_lbl.pack(pady=15, padx=10)
-        msg_lbl.bind("<Button-1>", close_popup)
-
-        # --- CUSTOM FAKE BUTTON (For High Contrast) ---
-        btn = tk.Label(inner_frame, 
-                       text="I SHALL FOCUS NOW", 
-                       font=("Helvetica", 11, "bold"),
-                       bg=btn_bg, 
-                       fg="white",
-                       padx=20, 
-                       pady=12,
-                       cursor="hand2")
-        
-        btn.pack(side="bottom", pady=25)
-        btn.bind("<Button-1>", close_popup)
-
-        # --- SHOW WINDOW ---
-        # Reveal the window now that it is positioned correctly
-        root.deiconify()
-
-        # --- FORCE FOCUS (CRITICAL FOR MAC) ---
-        root.lift()
-        root.focus_force()
-        
-        # Mac-specific: Force window to front using AppleScript
-        if sys.platform == "darwin":
-            try:
-                os.system('''/usr/bin/osascript -e 'tell app "System Events" to set frontmost of first process whose unix id is %d to true' ''' % os.getpid())
-            except:
-                pass
-
-        root.mainloop()
-
-    except Exception as e:
-        print(f"Popup error: {e}")
-
-if __name__ == "__main__":
-    try:
-        app = sys.argv[1] if len(sys.argv) > 1 else "Distraction"
-        img = sys.argv[2] if len(sys.argv) > 2 else ""
-        show_popup(app, img)
-    except:
-        pass
-"""
-
 # -----------------------------
 # Apllication Configuration
 # -----------------------------
@@ -155,6 +42,29 @@ PRODUCTIVE_APPS = ["VSCode", "PyCharm", "Terminal", "Word", "Excel", "Electron",
 BROWSER_DISTRACTIONS = ["Facebook", "Instagram", "Netflix", "YouTube", "TikTok", "Reddit", "Twitter", "Prime Video", "Twitch", "Spotify"]
 STOP_REQUESTED = False
 
+# Context overrides edit the lists above; every session starts again from these
+_DEFAULT_APP_LISTS = (list(DISTRACTING_APPS), list(PRODUCTIVE_APPS), list(BROWSER_DISTRACTIONS))
+
+# Sampling intervals (seconds): loops run at the floor while the user is active
+# and back off towards the ceiling during pauses
+MONITOR_INTERVAL_FLOOR = 0.5
+MONITOR_INTERVAL_CEILING = 5.0
+REPORT_INTERVAL_FLOOR = 1.0
+REPORT_INTERVAL_CEILING = 3.0
+
+# An LLM evaluation that takes longer than this is abandoned (the UI never waits for it)
+LLM_DEADLINE_SECONDS = 20.0
+
+# Crash recovery: a checkpoint every few seconds, compacted to one snapshot every
+# few minutes; a journal older than the max age is a session nobody will resume
+CHECKPOINT_INTERVAL = 5.0
+CHECKPOINT_SNAPSHOT_SECONDS = 300.0
+CHECKPOINT_MAX_AGE = 30 * 60.0
+
+# The final report shows the last focus changes from the event log
+SWITCH_TIMELINE_SECONDS = 15 * 60.0
+SWITCH_TIMELINE_LIMIT = 20
+
 # SYSTEM PROCESSES TO IGNORE (Windows)
 SYSTEM_PROCESSES = [
     "Program Manager",
@@ -202,80 +112,189 @@ APP_CATEGORIES = {
 # -----------------------------
 # GLOBAL STATE
 # -----------------------------
-activity_state = {
-    "key_presses": 0,
-    "mouse_moves": 0,
-    "mouse_clicks": 0,
-    "active_window": None,
-    "last_window": None,
-    "window_switches": 0,
-    "last_switch_time": time.time(),
-    "window_times": {},
-    "window_open_count": {},
-    "window_background_time": {},
-    "window_log": [],
-    "session_start": time.time(),
-    "last_input_time": time.time(),
-    "inactive_threshold": 10,
-    "click_per_app": {},
-    "switch_sequence": [],
-    "key_combinations": {},
-    "scroll_events": 0,
-    "reading_time": {},
-    "session_end": None,
-    "pause_periods": [],
-    "last_pause_start": None,
-    "hourly_activity": {},
-    "productive_switches": 0,
-    "document_names": {},
-    "all_open_windows": [],
-    "total_distracted_time" : 0
-}
+def new_activity_state():
+    return {
+        "key_presses": 0,
+        "mouse_distance": 0.0,
+        "mouse_active_seconds": 0.0,
+        "mouse_clicks": 0,
+        "active_window": None,
+        "last_window": None,
+        "window_switches": 0,
+        "window_open_count": {},
+        "session_start": time.time(),
+        "last_input_time": time.time(),
+        "inactive_threshold": 10,
+        "click_per_app": {},
+        "switch_sequence": [],
+        "key_combinations": {},
+        "scroll_events": 0,
+        "session_end": None,
+        "pause_periods": [],
+        "last_pause_start": None,
+        "productive_switches": 0,
+        "document_names": {},
+        "all_open_windows": []
+    }
+
+activity_state = new_activity_state()
+
+# Single owner of every time counter (window times, reading, distraction, hourly).
+# Window sources timestamp focus changes with time.time(), so the engine uses that clock too
+accounting = AccountingEngine(clock=time.time)
+
+# Every foreground/background switch, interned and columnar
+window_log = EventLog()
+
+monitor_scheduler = AdaptiveScheduler(floor=MONITOR_INTERVAL_FLOOR, ceiling=MONITOR_INTERVAL_CEILING)
+report_scheduler = AdaptiveScheduler(floor=REPORT_INTERVAL_FLOOR, ceiling=REPORT_INTERVAL_CEILING)
+
+def wake_schedulers():
+    """Drop both loops back to their fast rate"""
+    monitor_scheduler.poke()
+    report_scheduler.poke()
+
+# One event loop for sampling, commands, packet output and LLM calls.
+# Two LLM threads: an abandoned (past-deadline) call must not block the next one
+runtime = AsyncRuntime(llm_workers=2)
+
+# -----------------------------
+# PACKET OUTPUT
+# -----------------------------
+# JSON lines by default (what Flutter reads); other clients can switch to binary frames
+# with "PROTO <framing>" before START
+packet_stream = sys.stdout      # a daemon connection in daemon mode
+packet_writer = JsonLinesWriter(packet_stream)
+_emit_lock = threading.Lock()
+
+# What Flutter asked to receive (RATE / PAUSE / SUBSCRIBE, see commands.py)
+output_control = OutputControl(update_interval=REPORT_INTERVAL_FLOOR)
+
+def _write_packets(packets):
+    # One writer at a time or frames interleave
+    with _emit_lock:
+        packet_writer.write_many(packets)
+
+# Started with the session; before START and after it stops packets are written directly
+outbox = PacketOutbox(runtime, _write_packets)
+
+def emit_packet(packet):
+    if not output_control.allows(packet.get("type")):
+        return
+    session_log.log_packet(packet)
+    if not outbox.put(packet):
+        _write_packets((packet,))
+
+def negotiate_framing(framing):
+    global packet_writer
+    if framing == packet_writer.framing:
+        emit_packet({"type": "protocol", "framing": framing})
+        return
+    if load_codec(framing) is None or not hasattr(packet_stream, "buffer"):
+        # Unknown/unavailable framing: stay on what we have and say so
+        emit_packet({"type": "protocol", "framing": packet_writer.framing,
+                     "error": f"Framing '{framing}' is not available (library not installed)"})
+        return
+
+    # Last packet in the old format, everything after it is framed
+    emit_packet({"type": "protocol", "framing": framing})
+    packet_stream.flush()
+    packet_writer = FramedWriter(_binary_stdout() if packet_stream is sys.stdout else packet_stream.buffer, framing)
+
+def _binary_stdout():
+    """
+    Private binary handle on the real stdout for the frames. File descriptor 1 is
+    then pointed at stderr, so debug print()s cannot corrupt the binary stream;
+    sys.stdout itself stays the same object.
+    """
+    sys.stdout.flush()
+    frames_out = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    return frames_out
 
 # -----------------------------
 # HELPER FUNCTIONS
 # -----------------------------
+_classifier = None
+
+def get_classifier():
+    """Return the title classifier, built from the app lists on first use after they change"""
+    global _classifier
+    if _classifier is None:
+        _classifier = TitleClassifier(
+            SYSTEM_PROCESSES + MAC_SYSTEM_PROCESSES,
+            DISTRACTING_APPS,
+            PRODUCTIVE_APPS,
+            BROWSER_DISTRACTIONS,
+            APP_CATEGORIES
+        )
+    return _classifier
+
+def invalidate_classifier():
+    """Call after editing the app lists (context override): the next lookup rebuilds"""
+    global _classifier
+    _classifier = None
+
 def is_system_process(window_name):
     """Check if a window is a system process that should be ignored"""
-    if not window_name:
-        return True
-    
-    # Check Windows system processes
-    for system_proc in SYSTEM_PROCESSES:
-        if system_proc.lower() in window_name.lower():
-            return True
-    
-    # Check macOS system processes
-    for system_proc in MAC_SYSTEM_PROCESSES:
-        if system_proc.lower() in window_name.lower():
-            return True
-    
-    # Ignore very short names (likely system processes)
-    if len(window_name.strip()) < 2:
-        return True
-    
-    # Ignore windows with sharing notifications
-    if "compartiendo tu pantalla" in window_name.lower():
-        return True
-    if "is sharing your screen" in window_name.lower():
-        return True
-    
-    return False
+    return get_classifier().classify(window_name).system
+
+# Structured session log: queued in memory, written in batches by a background thread
+session_log = SessionLogger.from_env(os.path.join(os.path.expanduser("~"), ".leofocus", "logs", "debug_leonardo.jsonl"))
+
+# Unfinished session journal, removed once the report has been delivered
+journal = CheckpointJournal(
+    os.environ.get("LEO_JOURNAL_PATH", os.path.join(os.path.expanduser("~"), ".leofocus", "session_journal.jsonl")),
+    snapshot_every=CHECKPOINT_SNAPSHOT_SECONDS
+)
 
 def log_debug(data):
     #for debugging
-    # Scrive nella stessa cartella dello script
-    with open("debug_leonardo.jsonl", "a", encoding="utf-8") as f:
-        f.write(json.dumps(data, ensure_ascii=False) + "\n")
+    # Scrive in ~/.leofocus/logs (never blocks the caller)
+    session_log.log(dict(data, kind="debug") if isinstance(data, dict) else {"kind": "debug", "data": data})
+
+# -----------------------------
+# OS QUERY HELPER
+# -----------------------------
+_os_helper = None
+
+def get_os_helper():
+    """
+    Long-lived helper process for OS queries (macOS, or LEO_OS_HELPER=standin).
+    None elsewhere, and while the helper is out of restarts: callers then query in-process.
+    """
+    global _os_helper
+    if _os_helper is None:
+        backend = default_backend()
+        if backend is None:
+            return None
+        _os_helper = OSQueryClient(backend=backend)
+    return _os_helper if _os_helper.available() else None
+
+def run_applescript(script):
+    """Run through the helper when available, otherwise fork osascript as before"""
+    helper = get_os_helper()
+    if helper is not None:
+        try:
+            return helper.query("applescript", source=script)
+        except OSHelperError:
+            pass    # this call takes the slow path, the helper restarts on the next one
+    return subprocess.check_output(['osascript', '-e', script]).decode('utf-8').strip()
 
 # -----------------------------
 # ACTIVE WINDOW DETECTION
 # -----------------------------
 def get_active_window():
     try:
+        helper = get_os_helper()
+        if helper is not None:
+            try:
+                active_app = helper.query("active_app")
+                return active_app if not is_system_process(active_app) else None
+            except OSHelperError:
+                pass
         if sys.platform == "darwin":
-            script = 'tell application "System Events" to get name of first application process whose frontmost is true'
-            active_app = subprocess.check_output(['osascript', '-e', script]).decode('utf-8').strip()
+            active_app = subprocess.check_output(['osascript', '-e', MAC_FRONTMOST_SCRIPT]).decode('utf-8').strip()
             return active_app if not is_system_process(active_app) else None
         else:
             import pygetwindow as gw
@@ -289,31 +308,28 @@ def get_active_window():
 # -----------------------------
 # DOCUMENT / TAB NAMES
 # -----------------------------
+doc_name_cache = DocumentNameCache(ttl=5.0, max_size=256)
+
 def get_document_name(window_name):
+    """Cached front-end for _lookup_document_name (one osascript/COM call per title per TTL)"""
+    if not window_name:
+        return ""
+    return doc_name_cache.get(window_name, _lookup_document_name)
+
+def _lookup_document_name(window_name):
     if not window_name:
         return ""
 
     if sys.platform == "darwin":
         try:
-            if "Word" in window_name:
-                script = 'tell application "Microsoft Word" to get name of active document'
-                return subprocess.check_output(['osascript', '-e', script]).decode('utf-8').strip()
-            if "Excel" in window_name:
-                script = 'tell application "Microsoft Excel" to get name of active workbook'
-                return subprocess.check_output(['osascript', '-e', script]).decode('utf-8').strip()
-            if "Safari" in window_name:
-                script = 'tell application "Safari" to get name of front document'
-                return subprocess.check_output(['osascript', '-e', script]).decode('utf-8').strip()
-            if "Chrome" in window_name:
-                script = 'tell application "Google Chrome" to get title of active tab of front window'
-                return subprocess.check_output(['osascript', '-e', script]).decode('utf-8').strip()
             if "Firefox" in window_name:
                 if " — " in window_name:
                     return window_name.split(" — ")[0]
                 return window_name
-            if "Edge" in window_name:
-                script = 'tell application "Microsoft Edge" to get title of active tab of front window'
-                return subprocess.check_output(['osascript', '-e', script]).decode('utf-8').strip()
+            # Word, Excel, Safari, Chrome, Edge
+            script = mac_document_script(window_name)
+            if script:
+                return run_applescript(script)
         except:
             return window_name
 
@@ -359,12 +375,10 @@ def get_document_name(window_name):
 def is_browser_distraction(window_name):
     if window_name is None or not isinstance(window_name, str):     # returns false when it cant read the page title instead of creating an error
         return False                                                # may happen when switching windows or if the window has no title
-    doc_name = get_document_name(window_name)
-    if any(browser in window_name for browser in ["Chrome", "Safari", "Firefox", "Edge"]):
-        for keyword in BROWSER_DISTRACTIONS:
-            if keyword.lower() in doc_name.lower():
-                return True
-    return False
+    # Only browsers need the (possibly expensive) document name lookup
+    if not get_classifier().classify(window_name).browser:
+        return False
+    return get_classifier().classify(window_name, get_document_name(window_name)).distracting_tab
 
 # -----------------------------
 # ALL OPEN WINDOWS / APPS - FIXED WITH FILTERING
@@ -372,9 +386,14 @@ def is_browser_distraction(window_name):
 def get_all_windows():
     """Get all open windows - FILTERED to exclude system processes"""
     try:
+        helper = get_os_helper()
+        if helper is not None:
+            try:
+                return [w for w in helper.query("windows") if not is_system_process(w)]
+            except OSHelperError:
+                pass
         if sys.platform == "darwin":
-            script = 'tell application "System Events" to get name of every process whose background only is false'
-            output = subprocess.check_output(['osascript', '-e', script], stderr=subprocess.DEVNULL).decode('utf-8').strip()
+            output = subprocess.check_output(['osascript', '-e', MAC_PROCESSES_SCRIPT], stderr=subprocess.DEVNULL).decode('utf-8').strip()
             windows = [a.strip() for a in output.split(",") if a.strip()]
             # Filter out system processes
             windows = [w for w in windows if not is_system_process(w)]
@@ -392,144 +411,224 @@ def get_all_windows():
 # -----------------------------
 # MONITOR WINDOW
 # -----------------------------
-def monitor_active_window():
+def get_app_category(win):
+    title_class = get_classifier().classify(win)
+    if title_class.productive:
+        return "productive"
+    if title_class.distracting or is_browser_distraction(win):
+        return "distracting"
+    return "other"
+
+def query_focus_change(last, current):
+    """OS side of a focus change (executor): open windows, the new document and both categories"""
+    # With the OS helper one round trip brings the window list and the document name
+    snapshot = None
+    helper = get_os_helper()
+    if helper is not None:
+        try:
+            snapshot = helper.snapshot()
+        except Exception:
+            snapshot = None
+
+    # Update all open windows list (filtered) only when something actually changed
+    if snapshot is not None:
+        open_windows = [w for w in snapshot["windows"] if not is_system_process(w)]
+    else:
+        open_windows = get_all_windows()
+
+    document = None
+    if current:
+        # The document behind this title may have changed while it was in the background
+        if snapshot is not None and snapshot["active_app"] == current and snapshot["document"]:
+            doc_name_cache.put(current, snapshot["document"])
+        else:
+            doc_name_cache.invalidate(current)
+        document = get_document_name(current)
+
+    # Browser categories need the document name: looked up here, not on the loop
+    categories = (get_app_category(last), get_app_category(current)) if last else None
+    return open_windows, document, categories
+
+def on_focus_change(current, now, open_windows, document, categories):
+    """Apply a focus change to the session state (on the loop, like every other writer)"""
+    last = activity_state["last_window"]
+    activity_state["all_open_windows"] = open_windows
+
+    if last:
+        window_log.append(EventType.BACKGROUND if current else EventType.CLOSED, last)
+
+    if current:
+        activity_state["window_open_count"][current] = activity_state["window_open_count"].get(current, 0) + 1
+        window_log.append(EventType.FOREGROUND, current)
+        activity_state["document_names"][current] = document
+
+    activity_state["switch_sequence"].append(current)
+    if len(activity_state["switch_sequence"]) > 50:
+        activity_state["switch_sequence"] = activity_state["switch_sequence"][-50:]
+
+    # Productive/distracting switches
+    if categories:
+        last_cat, curr_cat = categories
+        if last_cat != curr_cat and last_cat != "other" and curr_cat != "other":
+            activity_state["productive_switches"] += 1
+
+    # The source's timestamp, not "now": the OS queries take time, and replays are scripted
+    accounting.switch(current, now)
+    activity_state["window_switches"] += 1
+    activity_state["active_window"] = current
+    activity_state["last_window"] = current
+
+    wake_schedulers()
+
+async def apply_focus_changes(focus_events):
+    # In arrival order, one at a time; only the OS queries leave the loop
     while True:
-        current = get_active_window()
-        now = time.time()
+        current, now = await focus_events.get()
         last = activity_state["last_window"]
+        if current == last:
+            continue
+        open_windows, document, categories = await runtime.run_blocking(query_focus_change, last, current)
+        on_focus_change(current, now, open_windows, document, categories)
+
+async def monitor_active_window(window_source):
+    # Focus changes are pushed by the source (from its own thread) onto the loop
+    focus_events = asyncio.Queue()
+    activity_state["window_source"] = window_source.name
+    window_source.start(lambda current, now: runtime.call_soon_threadsafe(focus_events.put_nowait, (current, now)))
+    runtime.spawn(apply_focus_changes(focus_events), name="focus-changes")
+
+    # dt is the real time covered by this tick (the interval is adaptive)
+    monitor_scheduler.reset()
+    dt = 0.0
+    try:
+        while True:
+            flush_input()
+            now = time.time()
 
-        # Update all open windows list (filtered)
-        activity_state["all_open_windows"] = get_all_windows()
-
-        # Pause detection
-        inactive_elapsed = now - activity_state["last_input_time"]
+            # Pause detection
+            inactive_elapsed = now - activity_state["last_input_time"]
         
-        # Start pause if inactive for too long
-        if inactive_elapsed > activity_state["inactive_threshold"]:
-            if activity_state["last_pause_start"] is None:
-                activity_state["last_pause_start"] = activity_state["last_input_time"]
-                print(f"Pause started at {time.ctime(activity_state['last_pause_start'])}")
-        else:
-            # End pause when activity resumes
-            if activity_state["last_pause_start"] is not None:
-                pause_end = now
-                pause_duration = pause_end - activity_state["last_pause_start"]
-                activity_state["pause_periods"].append({
-                    "start": time.ctime(activity_state["last_pause_start"]),
-                    "end": time.ctime(pause_end),
-                    "duration": int(pause_duration)
-                })
-                print(f"Pause ended. Duration: {int(pause_duration)} seconds")
-                activity_state["last_pause_start"] = None
-
-        # Window switching logic
-        if current != last:
-            if last:
-                elapsed = now - activity_state["last_switch_time"]
-                activity_state["window_times"][last] = activity_state["window_times"].get(last, 0) + elapsed
-                activity_state["window_background_time"][last] = activity_state["window_background_time"].get(last, 0)
-                activity_state["window_log"].append((time.ctime(), last, "background" if current else "closed"))
-
-            if current:
-                activity_state["window_open_count"][current] = activity_state["window_open_count"].get(current, 0) + 1
-                activity_state["window_log"].append((time.ctime(), current, "foreground"))
-                activity_state["document_names"][current] = get_document_name(current)
-
-            activity_state["switch_sequence"].append(current)
-            if len(activity_state["switch_sequence"]) > 50:
-                activity_state["switch_sequence"] = activity_state["switch_sequence"][-50:]
-
-            # Productive/distracting switches
-            if last:
-                def get_app_category(win):
-                    if win in PRODUCTIVE_APPS:
-                        return "productive"
-                    if win in DISTRACTING_APPS or is_browser_distraction(win):
-                        return "distracting"
-                    return "other"
-
-                last_cat = get_app_category(last)
-                curr_cat = get_app_category(current)
-
-                if last_cat != curr_cat and last_cat != "other" and curr_cat != "other":
-                    activity_state["productive_switches"] += 1
-
-            activity_state["window_switches"] += 1
-            activity_state["active_window"] = current
-            activity_state["last_window"] = current
-            activity_state["last_switch_time"] = now
-
-        # Background time and reading time
-        hour = time.localtime(now).tm_hour
-        activity_state["hourly_activity"][hour] = activity_state["hourly_activity"].get(hour, 0) + 0.5
-
-        for w in activity_state["window_times"]:
-            if w != current:
-                activity_state["window_background_time"][w] = activity_state["window_background_time"].get(w, 0) + 0.5
+            # Start pause if inactive for too long
+            if inactive_elapsed > activity_state["inactive_threshold"]:
+                if activity_state["last_pause_start"] is None:
+                    activity_state["last_pause_start"] = activity_state["last_input_time"]
+                    print(f"Pause started at {time.ctime(activity_state['last_pause_start'])}")
             else:
-                if inactive_elapsed < 5:
-                    activity_state["reading_time"][w] = activity_state["reading_time"].get(w, 0) + 0.5
-
-        time.sleep(0.5)
+                # End pause when activity resumes
+                if activity_state["last_pause_start"] is not None:
+                    pause_end = now
+                    pause_duration = pause_end - activity_state["last_pause_start"]
+                    activity_state["pause_periods"].append({
+                        "start": time.ctime(activity_state["last_pause_start"]),
+                        "end": time.ctime(pause_end),
+                        "duration": int(pause_duration)
+                    })
+                    print(f"Pause ended. Duration: {int(pause_duration)} seconds")
+                    activity_state["last_pause_start"] = None
+
+            hour = time.localtime(now).tm_hour
+            accounting.add_activity(hour, dt)
+
+            # Reading time goes to the window in front; background time is derived on read
+            if inactive_elapsed < 5:
+                accounting.add_reading(dt)
+
+            dt = await monitor_scheduler.wait_async(idle=activity_state["last_pause_start"] is not None)
+    finally:
+        window_source.stop()
 
 # -----------------------------
 # KEYBOARD & MOUSE
 # -----------------------------
+# Listener callbacks only touch their own slot; flush_input() merges into activity_state
+input_aggregator = InputAggregator()
+keyboard_slot = input_aggregator.slot("keyboard")
+mouse_slot = input_aggregator.slot("mouse")
+mouse_motion = MouseMotionSampler(mouse_slot)
+_input_flush_lock = threading.Lock()
+_input_listeners = []
+
+def flush_input():
+    """Merge listener counters into activity_state (called by the sampling loops)"""
+    with _input_flush_lock:
+        for key, delta in input_aggregator.flush().items():
+            if isinstance(key, tuple):
+                bucket, name = key
+                activity_state[bucket][name] = activity_state[bucket].get(name, 0) + delta
+            else:
+                activity_state[key] += delta
+
+        last_input = input_aggregator.last_input()
+        if last_input:
+            last_input_wall = time.time() - (time.monotonic() - last_input)
+            activity_state["last_input_time"] = max(activity_state["last_input_time"], last_input_wall)
+
+def start_input_listeners():
+    """Start the pynput listeners once; a daemon keeps them warm between sessions"""
+    if _input_listeners:
+        return
+    from pynput import keyboard, mouse
+    # pynput owns its listener threads; callbacks only touch their slots
+    _input_listeners.append(keyboard.Listener(on_press=on_key_press))
+    _input_listeners.append(mouse.Listener(on_move=on_move, on_click=on_click, on_scroll=on_scroll))
+    for listener in _input_listeners:
+        listener.start()
+
+def _wake_if_idle():
+    # First event after an idle stretch: stop backing off
+    if monitor_scheduler.backed_off or report_scheduler.backed_off:
+        wake_schedulers()
+
 def on_key_press(key):
-    activity_state["key_presses"] += 1
-    activity_state["last_input_time"] = time.time()
+    keyboard_slot.add("key_presses")
 
     try:
         k = str(key)
         if "Key.ctrl" in k or "Key.cmd" in k:
-            activity_state["key_combinations"]["ctrl"] = activity_state["key_combinations"].get("ctrl", 0) + 1
+            keyboard_slot.add(("key_combinations", "ctrl"))
         elif "Key.tab" in k:
-            activity_state["key_combinations"]["tab"] = activity_state["key_combinations"].get("tab", 0) + 1
+            keyboard_slot.add(("key_combinations", "tab"))
         elif "Key.shift" in k:
-            activity_state["key_combinations"]["shift"] = activity_state["key_combinations"].get("shift", 0) + 1
+            keyboard_slot.add(("key_combinations", "shift"))
     except:
         pass
 
+    _wake_if_idle()
+
 def on_move(x, y):
-    activity_state["mouse_moves"] += 1
-    activity_state["last_input_time"] = time.time()
+    mouse_motion.on_move(x, y)
+    _wake_if_idle()
 
 def on_click(x, y, button, pressed):
     if pressed:
-        activity_state["mouse_clicks"] += 1
-        activity_state["last_input_time"] = time.time()
+        mouse_slot.add("mouse_clicks")
         current = activity_state["active_window"]
         if current:
-            activity_state["click_per_app"][current] = activity_state["click_per_app"].get(current, 0) + 1
+            mouse_slot.add(("click_per_app", current))
+        _wake_if_idle()
 
 def on_scroll(x, y, dx, dy):
-    activity_state["scroll_events"] += 1
-    activity_state["last_input_time"] = time.time()
+    mouse_slot.add("scroll_events")
+    _wake_if_idle()
 
 # -----------------------------
 # CATEGORIZE APP
 # -----------------------------
 def categorize_app(app_name, doc_name=None):
-    for category, apps in APP_CATEGORIES.items():
-        if app_name in apps:
-            return category
-
-    if app_name in ["Safari", "Chrome", "Firefox", "Edge"] and doc_name:
-        for keyword in BROWSER_DISTRACTIONS:
-            if keyword.lower() in doc_name.lower():
-                return "distracting"
-
-    return "other"
+    return get_classifier().classify(app_name, doc_name).category
 
 
 # ============================================
-# SUBPROCESS POPUP LAUNCHER (Safe for Mac/Linux)
+# POPUP SERVER CLIENT (Safe for Mac/Linux)
 # ============================================
 last_scold_time = 0
 
+# Separate process: Tk must own its main thread (crashes on macOS otherwise)
+popup_client = PopupClient()
+
 def show_da_vinci_scolding(distraction_name):
     """
-    Launches a completely separate python process to show the popup.
+    Shows the popup in the popup server process (see popup_server.py).
     This prevents 'Main Thread' crashes on macOS and Linux.
     """
     
@@ -540,56 +639,228 @@ def show_da_vinci_scolding(distraction_name):
             clean_name = app
             break
     
-    # 2. Prepare paths
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    img_path = os.path.join(script_dir, "angry.png")
-    
-    # 3. Launch the popup in a new independent process
+    # 2. Show it through the popup server (started on the first scolding, then kept warm)
     try:
-        # We pass the python code string directly to the new process using "-c"
-        subprocess.Popen(
-            [sys.executable, "-c", POPUP_SCRIPT_CODE, clean_name, img_path],
-            stdout=subprocess.DEVNULL, # Hide output
-            stderr=subprocess.DEVNULL, # Hide errors
-            start_new_session=True     # Detach completely (Linux/Mac)
-        )
+        popup_client.show(clean_name)
     except Exception as e:
-        print(f"Failed to launch popup subprocess: {e}")
+        print(f"Failed to show popup: {e}")
 
 
+# -----------------------------
+# LLM EVALUATION (background worker)
+# -----------------------------
+def evaluate_chunk(chunk):
+    """Runs on the LLM executor; always builds on the newest memory"""
+    from llm_client_2 import create_json_memory
+    return create_json_memory(chunk["data"], activity_state["memory_context"], activity_state["user_context"])
+
+def apply_evaluation(chunk, new_memory):
+    """Back on the loop: score override, history, emotion, popup and leo_comment"""
+    global last_scold_time # Access the global timer
+    memory_context = activity_state["memory_context"]
+    recent_distraction = chunk["data"]["recent_distraction"]
+    global_distraction = chunk["data"]["global_distraction"]
+    unique_windows = chunk["data"]["windows"]
+
+    # --- 2. IL POLIZIOTTO CATTIVO (MATH OVERRIDE) ---
+    # Se l'LLM è troppo gentile, correggiamo noi il voto.
+    # Regola: Il focus score non può essere superiore a (100 - % distrazione recente)
+    max_allowed_score = 100 - recent_distraction
+
+    # Bonus di tolleranza: diamo +10 punti extra se non è 100% distrazione, ma non oltre 100
+    if recent_distraction < 100:
+        max_allowed_score += 10 
+
+    llm_score = new_memory.get('focus_score', 50)
+
+    # Applichiamo la correzione se l'LLM ha dato voti troppo alti
+    if llm_score > max_allowed_score:
+        # Se l'LLM dice 90 ma tu eri su WhatsApp (90% distr), max_allowed è 20.
+        # Riscriviamo lo score brutale.
+        new_memory['focus_score'] = max_allowed_score
+        new_memory['leonardo_comment'] = "I see your distraction clearly. Do not deceive yourself." # Forziamo un commento severo se serve
+
+    # -----------------------------------------------
+
+    if 'history' not in new_memory:
+        new_memory['history'] = memory_context.get('history', [])
+
+    history_entry = {
+        "iteration": len(new_memory['history']) + 1,
+        "timestamp": chunk["timestamp"],
+        "score": new_memory.get('focus_score', 50),
+        "windows": unique_windows,
+        "recent_distraction": recent_distraction,
+        "global_distraction": global_distraction,
+        "duration": 30
+    }
+    new_memory['history'].append(history_entry)
+
+    if len(new_memory['history']) > 50:
+        new_memory['history'] = new_memory['history'][-50:]
+
+    memory_context = new_memory
+    activity_state["memory_context"] = memory_context 
+
+    # Determina emozione basata sui DATI REALI, non sull'LLM
+    # Determina emozione basata sui DATI REALI, non sull'LLM
+    current_emotion = 'neutral'
+    current_score = memory_context.get('focus_score', 100)
+
+    if recent_distraction > 50:
+        current_emotion = 'angry'
+
+        # --- SMARTER POPUP TRIGGER ---
+        now = time.time()
+        if (now - last_scold_time) > 60:
+
+            # 1. Count which windows were used in this "angry" chunk
+            # chunk["windows"] contains the active window for every second of the chunk
+            window_counts = Counter(chunk["windows"])
+
+            # 2. Sort them: most frequent first
+            most_common_windows = window_counts.most_common()
+
+            # 3. Pick the top one that isn't our own app
+            blame_app = "Distraction" # Fallback name
+
+            for win_name, count in most_common_windows:
+                # IGNORE: leonardoapp, python, or empty names
+                lower_name = win_name.lower()
+                if "leonardoapp" not in lower_name and "python" not in lower_name and "debug" not in lower_name:
+                    blame_app = win_name
+                    break
+
+            # 4. Show the popup blaming the real culprit
+            show_da_vinci_scolding(blame_app)
+            last_scold_time = now
+        # -------------------------------
+
+    elif current_score < 60:
+        current_emotion = 'worried'
+    elif current_score > 85:
+        current_emotion = 'happy'
+
+    leo_packet = {
+        "type": "leo_comment",
+        "content": memory_context.get('leonardo_comment', 'Observing...'),
+        "focus_score": current_score,
+        "emotion": current_emotion # Usiamo l'emozione calcolata da Python
+    }
+    emit_packet(leo_packet)
+
+
+# Newest chunk only, one call at a time, never longer than the deadline
+llm_worker = EvaluationWorker(runtime.run_llm, evaluate_chunk, apply_evaluation, deadline=LLM_DEADLINE_SECONDS)
+
+# -----------------------------
+# CHECKPOINTS (crash recovery)
+# -----------------------------
+# Enough to carry on the same session after a crash; everything else is rebuilt live
+RESUMABLE_KEYS = ("session_start", "key_presses", "mouse_distance", "mouse_active_seconds", "mouse_clicks",
+                  "window_switches", "window_open_count", "click_per_app", "key_combinations",
+                  "scroll_events", "pause_periods", "productive_switches", "user_context",
+                  "startup_advice", "memory_context")
+
+def _detached(value):
+    """Copy of the containers (not of the values in them): the journal serializes it on the OS pool
+    while the loop, the only writer of activity_state, keeps mutating the originals"""
+    if isinstance(value, dict):
+        return {k: _detached(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_detached(v) for v in value]
+    return value
+
+def checkpoint_state():
+    """Flat dict of the resumable state: small per-checkpoint deltas in the journal"""
+    state = {key: _detached(activity_state[key]) for key in RESUMABLE_KEYS if key in activity_state}
+    snapshot = accounting.snapshot(include_background=True)
+    now = time.time()
+    state["foreground"] = {w: round(seconds, 1) for w, seconds in snapshot.foreground.items()}
+    # Wall-clock first sighting instead of background time: it does not change every tick
+    state["first_seen"] = {w: int(now - seconds - snapshot.background.get(w, 0.0))
+                           for w, seconds in snapshot.foreground.items()}
+    state["reading"] = {w: round(seconds, 1) for w, seconds in snapshot.reading.items()}
+    state["distracted"] = round(snapshot.distracted, 1)
+    state["hourly"] = {str(hour): round(seconds, 1) for hour, seconds in snapshot.hourly.items()}
+    return state
+
+async def write_checkpoint():
+    """The state is taken on the loop; diff, json.dumps and fsync run on the OS pool"""
+    try:
+        state = checkpoint_state()
+        await runtime.run_blocking(journal.checkpoint, state)
+    except (OSError, RuntimeError, TypeError, ValueError) as e:
+        # A lost checkpoint only costs crash recovery: never the report loop
+        print(f"Checkpoint failed: {e}", file=sys.stderr)
+
+def load_recoverable_session(user_context):
+    """(state, last checkpoint time) of a crashed session with the same goal, or None"""
+    loaded = CheckpointJournal.load(journal.path, max_age=CHECKPOINT_MAX_AGE)
+    if loaded is None or loaded[0].get("user_context") != user_context:
+        return None
+    return loaded
+
+def restore_checkpoint(state, last_checkpoint):
+    for key in RESUMABLE_KEYS:
+        if key in state:
+            activity_state[key] = state[key]
+    foreground = state.get("foreground", {})
+    accounting.restore({
+        "foreground": foreground,
+        "background": {w: max(0.0, (last_checkpoint - first) - foreground.get(w, 0.0))
+                       for w, first in state.get("first_seen", {}).items()},
+        "reading": state.get("reading", {}),
+        "distracted": state.get("distracted", 0.0),
+        "hourly": state.get("hourly", {}),
+    })
+    # The time the backend was down counts as a pause
+    now = time.time()
+    activity_state["pause_periods"].append({
+        "start": time.ctime(last_checkpoint),
+        "end": time.ctime(now),
+        "duration": int(now - last_checkpoint)
+    })
+
 # -----------------------------
 # REPORT LOOP
 # -----------------------------
-def report_loop_json():
-    # Initial State of the memory
-    memory_context = {
+async def report_loop_json():
+    # Initial State of the memory (a recovered session keeps its own)
+    activity_state.setdefault("memory_context", {
         "focus_score": 100,
         "status": "Starting",
         "user_role": activity_state.get("user_context", "General Creator"),
         "summary_so_far": "Session started.",
         "leonardo_comment": "I am observing.",
         "history": []
-    }
-    
-    activity_state["memory_context"] = memory_context
+    })
     last_chunk_time = time.time()
+    last_checkpoint = 0.0
     
     chunk_windows_list = []      
-    chunk_distraction_hits = 0   
-    chunk_samples = 0            
+    chunk_window_seconds = {}     # full window name -> seconds in front during this chunk
+    chunk_distracted_time = 0.0
+    chunk_time = 0.0
 
+    update_encoder = DeltaEncoder("update")
+    last_update_sent = 0.0
+
+    report_scheduler.reset()
     while not STOP_REQUESTED:
-        time.sleep(1)
+        # Slower updates while paused; dt keeps the accounting exact
+        dt = await report_scheduler.wait_async(idle=activity_state["last_pause_start"] is not None)
+        if STOP_REQUESTED:
+            break
+        flush_input()
         now = time.time()
         
         app_name = activity_state["active_window"]
         doc_name = ""
         
         if app_name:
-            doc_name = get_document_name(app_name)
-            elapsed = now - activity_state["last_switch_time"]
-            activity_state["window_times"][app_name] = activity_state["window_times"].get(app_name, 0) + elapsed
-            activity_state["last_switch_time"] = now
+            # Cache hit is instant; a miss may run AppleScript, so it goes to the executor
+            doc_name = await runtime.run_blocking(get_document_name, app_name)
 
         # 1. RILEVAMENTO DISTRAZIONI PIÙ INTELLIGENTE
         is_distracted_now = False
@@ -599,164 +870,85 @@ def report_loop_json():
             if doc_name:
                 full_window_name = f"{app_name} ({doc_name})"
             
-            # FIX: Controllo se una delle app vietate è CONTENUTA nel nome (non match esatto)
-            # Es. "WhatsApp" in "(1) WhatsApp" -> True
-            is_distracted_by_app = any(d_app.lower() in app_name.lower() for d_app in DISTRACTING_APPS)
-            
-            if is_distracted_by_app:
-                is_distracted_now = True
-            
-            # Check Browser
-            elif app_name in ["Google Chrome", "Safari", "Firefox", "Microsoft Edge", "Arc"]:
-                for distractor in BROWSER_DISTRACTIONS:
-                    if distractor.lower() in doc_name.lower():
-                        is_distracted_now = True
-                        break
+            # App name (substring, es. "(1) WhatsApp") or distracting browser tab, in one pass
+            is_distracted_now = get_classifier().classify(app_name, doc_name).distracting
         
         # Accumula dati
-        chunk_samples += 1
+        chunk_time += dt
         if is_distracted_now:
-            chunk_distraction_hits += 1
-            activity_state["total_distracted_time"] += 1
+            chunk_distracted_time += dt
+            accounting.add_distracted(dt)
         
         if app_name:
             chunk_windows_list.append(full_window_name)
-
-        # Invia dati UI a Flutter
-        data_packet = {
-            "type": "update",
-            "active_window": full_window_name,
-            "total_time": int(now - activity_state["session_start"]),
-            "switches": activity_state['window_switches'],
-            "keys": activity_state['key_presses'],
-            "mouse": activity_state['mouse_moves'],
-            "is_inactive": (now - activity_state["last_input_time"]) > activity_state["inactive_threshold"],
-            "top_apps": sorted(activity_state["window_times"].items(), key=lambda x: x[1], reverse=True)[:5]
-        }
-        print(json.dumps(data_packet), flush=True)
+            chunk_window_seconds[full_window_name] = chunk_window_seconds.get(full_window_name, 0.0) + dt
+
+        # Invia dati UI a Flutter: full snapshot first, then only the fields that changed.
+        # Nothing is encoded while updates are muted, so the encoder never gets ahead of
+        # the UI; RESUME / SUBSCRIBE / SNAPSHOT ask for a fresh full packet.
+        force_full = output_control.take_snapshot_request()
+        if force_full:
+            update_encoder.reset()
+        send_update = output_control.allows("update") and (
+            force_full or now - last_update_sent >= output_control.update_interval - 0.05
+        )
+        data_packet = None
+        if send_update:
+            last_update_sent = now
+            data_packet = update_encoder.encode({
+                "active_window": full_window_name,
+                "total_time": int(now - activity_state["session_start"]),
+                "switches": activity_state['window_switches'],
+                "keys": activity_state['key_presses'],
+                "mouse": int(activity_state['mouse_distance']),   # pixels travelled
+                "clicks": activity_state['mouse_clicks'],
+                "is_inactive": (now - activity_state["last_input_time"]) > activity_state["inactive_threshold"],
+                "top_apps": [(w, round(seconds, 1)) for w, seconds in accounting.top(5)]
+            })
+        if data_packet is not None:
+            emit_packet(data_packet)
 
         # === CHECK EVERY 30 SECONDS ===
         if now - last_chunk_time >= 30:
             
             # Calcolo Percentuali Matematiche
             recent_distraction = 0
-            if chunk_samples > 0:
-                recent_distraction = int((chunk_distraction_hits / chunk_samples) * 100)
+            if chunk_time > 0:
+                recent_distraction = int((chunk_distracted_time / chunk_time) * 100)
 
             session_duration = now - activity_state["session_start"]
             global_distraction = 0
             if session_duration > 0:
-                global_distraction = int((activity_state["total_distracted_time"] / session_duration) * 100)
+                global_distraction = int((accounting.distracted_time() / session_duration) * 100)
             
             unique_windows = list(set(chunk_windows_list))
             
             chunk_data = {
                 "windows": unique_windows,
+                "window_seconds": chunk_window_seconds,   # time share, for prompt compaction
                 "duration": 30,
                 "recent_distraction": recent_distraction, 
                 "global_distraction": global_distraction
             }
             
-            try:
-                # Chiediamo all'LLM di valutare
-                new_memory = create_json_memory(chunk_data, memory_context, activity_state["user_context"])
-                
-                # --- 2. IL POLIZIOTTO CATTIVO (MATH OVERRIDE) ---
-                # Se l'LLM è troppo gentile, correggiamo noi il voto.
-                # Regola: Il focus score non può essere superiore a (100 - % distrazione recente)
-                max_allowed_score = 100 - recent_distraction
-                
-                # Bonus di tolleranza: diamo +10 punti extra se non è 100% distrazione, ma non oltre 100
-                if recent_distraction < 100:
-                    max_allowed_score += 10 
-                
-                llm_score = new_memory.get('focus_score', 50)
-                
-                # Applichiamo la correzione se l'LLM ha dato voti troppo alti
-                if llm_score > max_allowed_score:
-                    # Se l'LLM dice 90 ma tu eri su WhatsApp (90% distr), max_allowed è 20.
-                    # Riscriviamo lo score brutale.
-                    new_memory['focus_score'] = max_allowed_score
-                    new_memory['leonardo_comment'] = "I see your distraction clearly. Do not deceive yourself." # Forziamo un commento severo se serve
-                
-                # -----------------------------------------------
-
-                if 'history' not in new_memory:
-                    new_memory['history'] = memory_context.get('history', [])
-                
-                history_entry = {
-                    "iteration": len(new_memory['history']) + 1,
-                    "timestamp": now,
-                    "score": new_memory.get('focus_score', 50),
-                    "windows": unique_windows,
-                    "recent_distraction": recent_distraction,
-                    "global_distraction": global_distraction,
-                    "duration": 30
-                }
-                new_memory['history'].append(history_entry)
-                
-                if len(new_memory['history']) > 50:
-                    new_memory['history'] = new_memory['history'][-50:]
-                
-                memory_context = new_memory
-                activity_state["memory_context"] = memory_context 
-                
-                # Determina emozione basata sui DATI REALI, non sull'LLM
-                # Determina emozione basata sui DATI REALI, non sull'LLM
-                current_emotion = 'neutral'
-                current_score = memory_context.get('focus_score', 100)
-                
-                global last_scold_time # Access the global timer
-                
-                if recent_distraction > 50:
-                    current_emotion = 'angry'
-                    
-                    # --- SMARTER POPUP TRIGGER ---
-                    if (now - last_scold_time) > 60:
-                        
-                        # 1. Count which windows were used in this "angry" chunk
-                        # chunk_windows_list contains the active window for every second of the last 30s
-                        window_counts = Counter(chunk_windows_list)
-                        
-                        # 2. Sort them: most frequent first
-                        most_common_windows = window_counts.most_common()
-                        
-                        # 3. Pick the top one that isn't our own app
-                        blame_app = "Distraction" # Fallback name
-                        
-                        for win_name, count in most_common_windows:
-                            # IGNORE: leonardoapp, python, or empty names
-                            lower_name = win_name.lower()
-                            if "leonardoapp" not in lower_name and "python" not in lower_name and "debug" not in lower_name:
-                                blame_app = win_name
-                                break
-                        
-                        # 4. Show the popup blaming the real culprit
-                        show_da_vinci_scolding(blame_app)
-                        last_scold_time = now
-                    # -------------------------------
-
-                elif current_score < 60:
-                    current_emotion = 'worried'
-                elif current_score > 85:
-                    current_emotion = 'happy'
-
-                leo_packet = {
-                    "type": "leo_comment",
-                    "content": memory_context.get('leonardo_comment', 'Observing...'),
-                    "focus_score": current_score,
-                    "emotion": current_emotion # Usiamo l'emozione calcolata da Python
-                }
-                print(json.dumps(leo_packet), flush=True)
-                
-            except Exception as e:
-                print(f"LLM Error: {e}", file=sys.stderr)
+            # L'LLM valuta in background: this loop keeps ticking at 1 Hz meanwhile
+            llm_worker.submit({
+                "data": chunk_data,
+                "timestamp": now,
+                "windows": chunk_windows_list
+            })
 
             # Reset
             chunk_windows_list = []
-            chunk_distraction_hits = 0
-            chunk_samples = 0
+            chunk_window_seconds = {}
+            chunk_distracted_time = 0.0
+            chunk_time = 0.0
             last_chunk_time = now
+
+        # === CHECKPOINT (crash recovery) ===
+        if now - last_checkpoint >= CHECKPOINT_INTERVAL:
+            last_checkpoint = now
+            await write_checkpoint()
             
 # -----------------------------
 # MAIN
@@ -783,20 +975,84 @@ def _calculate_grade(score):
     else:
         return "D"
 
-def listen_for_commands():
-        global STOP_REQUESTED
-        while True:
-            cmd = sys.stdin.readline().strip()
-            if cmd == "STOP":
-                STOP_REQUESTED = True
-                break
+def switch_timeline(window=SWITCH_TIMELINE_SECONDS, limit=SWITCH_TIMELINE_LIMIT):
+    """Last foreground changes in the event log, oldest first"""
+    # The log keeps monotonic timestamps, so the window is a binary search away
+    events = [(at, title) for at, title, kind in window_log.range(time.monotonic() - window)
+              if kind is EventType.FOREGROUND]
+    return [{"at": time.strftime("%H:%M:%S", time.localtime(window_log.wall_time(at))), "window": title}
+            for at, title in events[-limit:]]
+
+def build_stats_package(end_time, snapshot=None):
+    """Session totals for the final report and for STATS requests"""
+    memory = activity_state.get("memory_context", {})
+    snapshot = snapshot or accounting.snapshot()
+    return {
+        "duration_seconds": int(end_time - activity_state["session_start"]),
+        "total_switches": activity_state["window_switches"],
+        "focus_score": memory.get("focus_score", 50),
+        "top_apps": [{"name": k, "seconds": int(v)} for k, v in top_windows(snapshot.foreground, 5)],
+        "total_distraction_time": int(snapshot.distracted),
+        "pause_count": len(activity_state.get("pause_periods", [])),
+        "key_presses": activity_state.get("key_presses", 0),
+        "mouse_clicks": activity_state.get("mouse_clicks", 0),
+        "switch_timeline": switch_timeline()
+    }
 
-if __name__ == "__main__":
-    # 1. ACQUISIZIONE CONTESTO DA ARGOMENTI (passati da Flutter)
-    if len(sys.argv) > 1:
-        user_context = sys.argv[1]
-    else:
-        user_context = "General Work Session"
+def handle_command(line):
+    """Apply one line from Flutter; returns False once STOP was received"""
+    global STOP_REQUESTED
+    name, args = parse_command(line)
+    if name is None:
+        return True
+    if name == "STOP":
+        STOP_REQUESTED = True
+        report_scheduler.poke()
+        return False
+
+    ack = {"type": "ack", "command": name, "ok": True}
+    try:
+        if name == "RATE":
+            ms = output_control.set_rate(args)
+            # The report loop never needs to tick faster than the UI wants packets
+            report_scheduler.floor = min(max(REPORT_INTERVAL_FLOOR, ms / 1000.0), REPORT_INTERVAL_CEILING)
+            report_scheduler.poke()
+            ack["rate_ms"] = ms
+        elif name == "PAUSE":
+            output_control.paused = True
+        elif name == "RESUME":
+            output_control.paused = False
+            output_control.request_snapshot()
+            report_scheduler.poke()
+        elif name == "SNAPSHOT":
+            output_control.request_snapshot()
+            report_scheduler.poke()
+        elif name == "SUBSCRIBE":
+            ack["types"] = output_control.subscribe(args)
+            output_control.request_snapshot()
+        elif name == "STATS":
+            flush_input()
+            emit_packet({"type": "stats", "stats": build_stats_package(time.time())})
+        else:
+            raise CommandError(f"Unknown command: {name}")
+    except CommandError as e:
+        ack["ok"] = False
+        ack["message"] = str(e)
+    emit_packet(ack)
+    return True
+
+async def listen_for_commands(readline):
+    while True:
+        line = await readline()
+        # EOF means Flutter is gone: end the session instead of spinning on ""
+        if not line:
+            line = "STOP"
+        if not handle_command(line):
+            break
+
+def apply_context_overrides(user_context):
+    """Relax the app lists for whatever the user said they will be using"""
+    DISTRACTING_APPS[:], PRODUCTIVE_APPS[:], BROWSER_DISTRACTIONS[:] = (list(l) for l in _DEFAULT_APP_LISTS)
 
     # --- MAGIC FIX: CONTEXT OVERRIDE ---
     # Rende Leonardo intelligente: se dici che usi WhatsApp, lui non si arrabbia.
@@ -817,34 +1073,84 @@ if __name__ == "__main__":
             print(f"Context Override: {site} allowed in browser.")
             BROWSER_DISTRACTIONS.remove(site)
     # -------------------------------------------------------
+    invalidate_classifier()
+
+def reset_session_state(stream=None):
+    """Fresh per-session state, so a daemon can run session after session in one process"""
+    global activity_state, accounting, window_log, output_control, llm_worker
+    global packet_stream, packet_writer, STOP_REQUESTED
+    STOP_REQUESTED = False
+    activity_state = new_activity_state()
+    accounting = AccountingEngine(clock=time.time)
+    window_log = EventLog()
+    output_control = OutputControl(update_interval=REPORT_INTERVAL_FLOOR)
+    llm_worker = EvaluationWorker(runtime.run_llm, evaluate_chunk, apply_evaluation, deadline=LLM_DEADLINE_SECONDS)
+    report_scheduler.floor = REPORT_INTERVAL_FLOOR
+    doc_name_cache.reset()
+    # Input seen between sessions belongs to nobody
+    with _input_flush_lock:
+        input_aggregator.flush()
+    packet_stream = stream or sys.stdout
+    packet_writer = JsonLinesWriter(packet_stream)
+
+def get_start_session_advice(user_context):
+    # Imported here: loading the LLM client overlaps with the rest of startup
+    from local_summarizer import get_start_session_advice as generate_advice
+    return generate_advice(user_context)
+
+def prepare_session_io():
+    """Blocking OS setup, run on the executor while the startup advice is generated"""
+    start_input_listeners()
+    startup.mark("input listeners (parallel)")
+    window_source = create_window_source(get_active_window)
+    get_os_helper()
+    get_classifier()
+    startup.mark("window source + OS helper (parallel)")
+    return window_source
+
+async def run_session(user_context, readline=None):
+    """Advice, wait for START, track until STOP, send the report (all on the runtime loop)"""
+    monitor_scheduler.bind_loop(runtime.loop)
+    report_scheduler.bind_loop(runtime.loop)
+    if readline is None:
+        # Read by the loop itself: sys.stdin must not be read anywhere else from now on
+        readline = await runtime.open_line_reader(sys.stdin)
+
+    startup.mark("stdin reader")
+    activity_state["user_context"] = user_context
 
-    try:
-        # --- ADVICE PRE-SESSION ---
-        # asking llm for advice
-        startup_advice = get_start_session_advice(user_context)
-
-        # sending to flutter
-        print(json.dumps({
-            "type": "leo_comment",
-            "content": startup_advice,
-            #"emotion": "interested"
-        }), flush=True)
+    # Listeners, window source and OS helper come up while the LLM writes the advice
+    session_io = runtime.spawn(runtime.run_blocking(prepare_session_io), name="prepare-io")
 
-    except Exception as e:
-        sys.stderr.write(f"Error getting startup advice: {e}\n")
-            
-    activity_state["user_context"] = user_context
+    # A session that crashed with the same goal can be picked up where it stopped ("START RESUME")
+    recovered = load_recoverable_session(user_context)
+    startup.mark("checkpoint journal")
 
     # --- MODIFICA CHIAVE: Generazione Consigli Iniziali ---
-    # Prima di partire, chiediamo a Leonardo il consiglio e lo mandiamo a Flutter
+    # Prima di partire, chiediamo a Leonardo il consiglio (una sola volta) e lo mandiamo a Flutter
     try:
+        if recovered is not None and recovered[0].get("startup_advice"):
+            # Same advice as before the crash, no LLM round trip
+            advice = recovered[0]["startup_advice"]
+        else:
+            advice = await runtime.run_llm(get_start_session_advice, user_context)
+            startup.mark("advice (LLM)")
+        activity_state["startup_advice"] = advice
+
+        # sending to flutter: same text as comment and as the advice card
+        emit_packet({
+            "type": "leo_comment",
+            "content": advice,
+            #"emotion": "interested"
+        })
         # Nota: Flutter deve gestire un pacchetto con type: "initial_advice"
-        advice = get_start_session_advice(user_context)
-        print(json.dumps({
+        emit_packet({
             "type": "initial_advice",
-            "content": advice
-        }), flush=True)
+            "content": advice,
+            "resumable": recovered is not None
+        })
     except Exception as e:
+        sys.stderr.write(f"Error getting startup advice: {e}\n")
         log_debug({"error_advice": str(e)})
     # -------------------------------------------------------
     
@@ -853,56 +1159,89 @@ if __name__ == "__main__":
     # =========================================================================
     while True:
         try:
-            line = sys.stdin.readline().strip()
-            if line == "START":
+            line = await readline()
+            if not line:
+                return
+            name, args = parse_command(line)
+            if name == "START":
+                # Only on request: a plain START begins a new session over the old journal
+                if not (args and args[0].upper() == "RESUME"):
+                    recovered = None
                 break
-            elif line == "STOP":
-                sys.exit(0)
+            elif name == "STOP":
+                return
+            elif name == "PROTO" and args:
+                negotiate_framing(args[0].lower())
+            else:
+                # RATE / SUBSCRIBE may be set up before the session starts
+                handle_command(line)
         except Exception:
             pass
     # =========================================================================
+    startup.mark("waiting for START (user)")
+
+    # Framing is settled: from here on packets go through the outbox task
+    runtime.spawn(outbox.run(), name="packet-outbox")
+    runtime.spawn(listen_for_commands(readline), name="commands")
 
-    threading.Thread(target=listen_for_commands, daemon=True).start()
+    window_source = await session_io
+    # Keys and clicks before START are not part of the session
+    with _input_flush_lock:
+        input_aggregator.flush()
 
     # Avvia monitoraggio
-    activity_state["session_start"] = time.time()
-    
-    # Thread separati per input
-    threading.Thread(target=monitor_active_window, daemon=True).start()
-    keyboard_listener = keyboard.Listener(on_press=on_key_press)
-    keyboard_listener.start()
-    mouse_listener = mouse.Listener(on_move=on_move, on_click=on_click, on_scroll=on_scroll)
-    mouse_listener.start()
+    if recovered is not None:
+        restore_checkpoint(*recovered)
+    else:
+        activity_state["session_start"] = time.time()
+    session_log.log({"kind": "session_start", "user_context": user_context, "resumed": recovered is not None})
+    runtime.spawn(monitor_active_window(window_source), name="monitor")
+    runtime.spawn(llm_worker.run(), name="llm-worker")
+    startup.mark("session running")
+
+    if startup.enabled:
+        startup.report()
+        emit_packet({"type": "startup_profile", "phases": startup.phases()})
 
     # Usiamo il loop JSON
-    report_loop_json()
+    await report_loop_json()
 
     # Session ended cleanly
+    flush_input()
     activity_state["session_end"] = time.time()
+    # A crash while the report is written must not lose the last seconds
+    await write_checkpoint()
 
-    print(json.dumps({"type": "status", "message": "Leonardo is composing the Codex..."}), flush=True)
+    emit_packet({"type": "status", "message": "Leonardo is composing the Codex..."})
 
     final_memory = activity_state.get("memory_context", {})
 
-    session_duration = activity_state["session_end"] - activity_state["session_start"]
-    sorted_apps = sorted(activity_state["window_times"].items(), key=lambda x: x[1], reverse=True)[:5]
-
-    stats_package = {
-        "duration_seconds": int(session_duration),
-        "total_switches": activity_state["window_switches"],
-        "focus_score": final_memory.get("focus_score", 50),
-        "top_apps": [{"name": k, "seconds": int(v)} for k, v in sorted_apps],
-        "total_distraction_time": activity_state.get("total_distracted_time", 0),
-        "pause_count": len(activity_state.get("pause_periods", [])),
-        "key_presses": activity_state.get("key_presses", 0),
-        "mouse_clicks": activity_state.get("mouse_clicks", 0)
-    }
-
-    report_markdown = generate_final_report_from_memory(
+    final_snapshot = accounting.snapshot(include_background=True)
+
+    # Plain dicts for anything that still reads activity_state (e.g. build_prompt)
+    activity_state["window_times"] = final_snapshot.foreground
+    activity_state["window_background_time"] = final_snapshot.background
+    activity_state["reading_time"] = final_snapshot.reading
+    activity_state["hourly_activity"] = final_snapshot.hourly
+    activity_state["total_distracted_time"] = final_snapshot.distracted
+
+    stats_package = build_stats_package(activity_state["session_end"], final_snapshot)
+    # Diagnostics for stderr only, never in the stats the UI shows
+    print(f"Document name cache: {doc_name_cache.stats()}", file=sys.stderr)
+    print(f"Event log: {len(window_log)} events, {window_log.memory_bytes()} bytes", file=sys.stderr)
+
+    from llm_client_2 import generate_final_report_from_memory
+    # The Codex is streamed as "report_chunk" packets while it is written; "report" stays the final word
+    report_chunks = ChunkCoalescer(emit_packet, "report_chunk")
+    report_markdown = await runtime.run_llm(
+        generate_final_report_from_memory,
         final_memory,
         activity_state["user_context"],
-        stats_package
+        stats_package,
+        report_chunks.add,
+        report_chunks.reset
     )
+    report_chunks.close()
 
     final_packet = {
         "type": "report",
@@ -913,5 +1252,45 @@ if __name__ == "__main__":
         "total_iterations": len(final_memory.get('history', []))
     }
 
-    print(json.dumps(final_packet), flush=True)
+    emit_packet(final_packet)
+    journal.finish()
+
+def log_session_stats():
+    print(f"Runtime: {runtime.stats()}", file=sys.stderr)
+    print(f"LLM worker: {llm_worker.stats()}", file=sys.stderr)
+    # Only if an LLM call loaded the client; the stats are not worth importing it for
+    llm_client = sys.modules.get("llm_client_2")
+    if llm_client is not None:
+        print(f"LLM providers: {llm_client.llm_chain.stats()}", file=sys.stderr)
+        print(f"Evaluation prompts: {llm_client.memory_prompt_stats.stats()}", file=sys.stderr)
+    session_log.log({"kind": "session_end", "runtime": runtime.stats(),
+                     "llm_worker": llm_worker.stats(), "log": session_log.stats()})
+    session_log.flush()
+
+async def daemon_session(user_context, readline, stream):
+    """SessionDaemon factory: one isolated session over a daemon connection"""
+    startup.restart()
+    apply_context_overrides(user_context)
+    reset_session_state(stream)
+    await runtime.run_async(lambda: run_session(user_context, readline))
+    log_session_stats()
+
+if __name__ == "__main__":
+    # 1. ACQUISIZIONE CONTESTO DA ARGOMENTI (passati da Flutter)
+    positional = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if positional:
+        user_context = positional[0]
+    else:
+        user_context = "General Work Session"
+
+    if "--daemon" in sys.argv[1:]:
+        # One warm process, one session per connection (see daemon.py)
+        asyncio.run(SessionDaemon(daemon_session).serve())
+        sys.exit(0)
+
+    apply_context_overrides(user_context)
+    reset_session_state()
+    startup.mark("context overrides")
+    runtime.run(lambda: run_session(user_context))
+    log_session_stats()
     sys.exit(0)
\ No newline at end of file
@@ -0,0 +1,240 @@
+import json
+import os
+import sys
+import threading
+import time
+
+# ============================================
+# WINDOW SOURCES
+# ============================================
+# A WindowSource pushes focus-change events to a callback instead of letting
+# the tracker rescan the desktop on a fixed timer. Every backend resolves the
+# current title through the same `probe` callable (get_active_window in
+# trackers.py) so system-process filtering stays in one place.
+
+_UNSET = object()
+
+
+class WindowSource:
+    """Base class: subclasses call _emit() whenever the foreground may have changed"""
+
+    name = "base"
+
+    def __init__(self, probe=None):
+        self._probe = probe
+        self._callback = None
+        self._last = _UNSET
+        self._emit_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self, callback):
+        """Start delivering callback(title, timestamp) on every focus change"""
+        self._callback = callback
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=f"window-source-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        raise NotImplementedError
+
+    def _refresh(self):
+        """Ask the probe for the current title and emit it if it changed"""
+        try:
+            title = self._probe() if self._probe else None
+        except Exception:
+            title = None
+        self._emit(title)
+
+    def _emit(self, title, timestamp=None):
+        with self._emit_lock:
+            if title == self._last:
+                return
+            self._last = title
+        if self._callback is not None:
+            self._callback(title, timestamp if timestamp is not None else time.time())
+
+
+# -----------------------------
+# POLLING FALLBACK
+# -----------------------------
+class PollingWindowSource(WindowSource):
+    """Calls the probe on a timer but only emits when the title actually changes"""
+
+    name = "polling"
+
+    def __init__(self, probe, interval=0.5):
+        super().__init__(probe)
+        self.interval = interval
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._refresh()
+            self._stop_event.wait(self.interval)
+
+
+# -----------------------------
+# WINDOWS: SetWinEventHook
+# -----------------------------
+class WindowsWindowSource(WindowSource):
+    """Foreground and title-change hooks from user32 (no polling at all)"""
+
+    name = "win32"
+
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    EVENT_OBJECT_NAMECHANGE = 0x800C
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    OBJID_WINDOW = 0
+    WM_QUIT = 0x0012
+
+    def __init__(self, probe):
+        super().__init__(probe)
+        import ctypes
+        from ctypes import wintypes
+        self._ctypes = ctypes
+        self._wintypes = wintypes
+        self._user32 = ctypes.windll.user32
+        self._thread_id = None
+
+    def _run(self):
+        ctypes, wintypes, user32 = self._ctypes, self._wintypes, self._user32
+        self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+
+        WinEventProc = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+        )
+
+        def on_event(hook, event, hwnd, id_object, id_child, thread, ms):
+            # Title changes fire for every control; only the foreground window matters
+            if event == self.EVENT_OBJECT_NAMECHANGE:
+                if id_object != self.OBJID_WINDOW or hwnd != user32.GetForegroundWindow():
+                    return
+            self._refresh()
+
+        # Keep a reference, otherwise the callback gets garbage collected
+        self._proc = WinEventProc(on_event)
+        hooks = [
+            user32.SetWinEventHook(event, event, 0, self._proc, 0, 0, self.WINEVENT_OUTOFCONTEXT)
+            for event in (self.EVENT_SYSTEM_FOREGROUND, self.EVENT_OBJECT_NAMECHANGE)
+        ]
+
+        self._refresh()
+        msg = wintypes.MSG()
+        while not self._stop_event.is_set() and user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+
+        for hook in hooks:
+            if hook:
+                user32.UnhookWinEvent(hook)
+
+    def stop(self):
+        super().stop()
+        if self._thread_id:
+            self._user32.PostThreadMessageW(self._thread_id, self.WM_QUIT, 0, 0)
+
+
+# -----------------------------
+# MACOS: NSWorkspace notifications
+# -----------------------------
+class MacWindowSource(WindowSource):
+    """Frontmost-application notifications from NSWorkspace (needs pyobjc)"""
+
+    name = "nsworkspace"
+
+    def __init__(self, probe):
+        super().__init__(probe)
+        from AppKit import NSWorkspace
+        from Foundation import NSOperationQueue
+        self._workspace = NSWorkspace.sharedWorkspace()
+        self._queue = NSOperationQueue.alloc().init()
+        self._observer = None
+
+    def _run(self):
+        center = self._workspace.notificationCenter()
+        self._observer = center.addObserverForName_object_queue_usingBlock_(
+            "NSWorkspaceDidActivateApplicationNotification", None, self._queue,
+            lambda notification: self._refresh()
+        )
+        self._refresh()
+        # Notifications arrive on the operation queue, this thread has no run loop
+        # sources: it only sleeps until stop() (runUntilDate_ would return at once and spin)
+        self._stop_event.wait()
+        center.removeObserver_(self._observer)
+
+
+# -----------------------------
+# REPLAY (tests / benchmarks)
+# -----------------------------
+class ReplayWindowSource(WindowSource):
+    """
+    Emits a scripted list of (offset_seconds, title) events.
+    With realtime=False the whole script is delivered at once using synthetic timestamps.
+    """
+
+    name = "replay"
+
+    def __init__(self, events, realtime=True, start_time=None):
+        super().__init__()
+        self.events = list(events)
+        self.realtime = realtime
+        self.start_time = start_time
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """Load a JSONL script: one {"t": seconds, "title": "..."} object per line"""
+        events = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entry = json.loads(line)
+                    events.append((float(entry.get("t", 0)), entry.get("title")))
+        return cls(events, **kwargs)
+
+    def _run(self):
+        base = self.start_time if self.start_time is not None else time.time()
+        for offset, title in self.events:
+            if self.realtime:
+                delay = base + offset - time.time()
+                if delay > 0 and self._stop_event.wait(delay):
+                    return
+            elif self._stop_event.is_set():
+                return
+            self._emit(title, base + offset)
+
+
+# -----------------------------
+# FACTORY
+# -----------------------------
+def create_window_source(probe, poll_interval=0.5):
+    """
+    Pick the best backend for this OS.
+    LEO_WINDOW_SOURCE can force one: "polling", "native", "nsworkspace" or "replay:<path.jsonl>".
+    """
+    choice = os.environ.get("LEO_WINDOW_SOURCE", "native")
+
+    if choice.startswith("replay:"):
+        return ReplayWindowSource.from_file(choice[len("replay:"):])
+
+    if choice != "polling":
+        try:
+            if sys.platform.startswith("win"):
+                return WindowsWindowSource(probe)
+            # NSWorkspace posts to an accessory process only while the main thread runs a Cocoa
+            # run loop, and ours runs asyncio: opt-in until that is verified, polling otherwise
+            if sys.platform == "darwin" and choice == "nsworkspace":
+                return MacWindowSource(probe)
+        except Exception as e:
+            print(f"Native window source unavailable ({e}), falling back to polling", file=sys.stderr)
+
+    return PollingWindowSource(probe, interval=poll_interval)
@@ -0,0 +1,79 @@
+import pytest
+
+from accounting import AccountingEngine, TimeAccountant
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_foreground_and_background_are_derived_from_switches():
+    clock = Clock()
+    accountant = TimeAccountant(clock)
+    accountant.switch("Code")
+    clock.now = 30
+    accountant.switch("Chrome")
+    clock.now = 40
+    accountant.switch("Code")
+    clock.now = 100
+    assert accountant.foreground_times() == {"Code": 90.0, "Chrome": 10.0}
+    # Chrome first seen at 30: 70 s since, 10 of them in front
+    assert accountant.background_time("Chrome") == 60.0
+    assert accountant.background_time("Code") == 10.0
+    assert accountant.background_time("Never seen") == 0.0
+
+
+def test_top_merges_the_live_window_into_closed_totals():
+    clock = Clock()
+    accountant = TimeAccountant(clock, top_k=3)
+    for at, window in [(0, "A"), (50, "B"), (60, "C"), (65, "D"), (66, "B")]:
+        clock.now = at
+        accountant.switch(window)
+    clock.now = 120
+    assert accountant.top(2) == [("B", 64.0), ("A", 50.0)]
+    # Only top_k closed totals are kept: D (1 s) fell out
+    assert [w for w, _ in accountant.top(10)] == ["B", "A", "C"]
+
+
+def test_reading_goes_to_the_window_in_front():
+    accountant = TimeAccountant(Clock())
+    accountant.add_reading(5)       # nothing in front yet
+    accountant.switch("Notes")
+    accountant.add_reading(2.5)
+    accountant.switch(None)
+    accountant.add_reading(9)
+    assert accountant.reading_times() == {"Notes": 2.5}
+
+
+def test_restore_continues_from_checkpointed_totals():
+    clock = Clock(1000.0)
+    accountant = TimeAccountant(clock)
+    accountant.restore({"Code": 300.0}, {"Code": 50.0}, {"Code": 120.0})
+    assert accountant.foreground_time("Code") == 300.0
+    assert accountant.background_time("Code") == pytest.approx(50.0)
+    accountant.switch("Code")
+    clock.now = 1010.0
+    assert accountant.foreground_time("Code") == 310.0
+
+
+def test_engine_snapshot_applies_posted_events_in_order():
+    clock = Clock()
+    engine = AccountingEngine(clock=clock)
+    engine.switch("Code", 0.0)
+    engine.add_reading(3.0)
+    engine.add_distracted(4.0)
+    engine.add_activity(9, 1.5)
+    engine.add_activity(9, 1.5)
+    engine.switch("YouTube", 20.0)
+    clock.now = 25.0
+    snapshot = engine.snapshot(include_background=True)
+    assert snapshot.foreground == {"Code": 20.0, "YouTube": 5.0}
+    assert snapshot.reading == {"Code": 3.0}
+    assert snapshot.distracted == 4.0
+    assert snapshot.hourly == {9: 3.0}
+    assert snapshot.current == "YouTube"
+    assert snapshot.background["Code"] == 5.0
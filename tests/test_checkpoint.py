@@ -0,0 +1,31 @@
+from checkpoint import CheckpointJournal, apply_delta, diff_state
+
+
+def test_diff_appends_merges_and_sets():
+    old = {"keys": 3, "pauses": [1], "clicks": {"A": 1}, "goal": "x"}
+    new = {"keys": 5, "pauses": [1, 2], "clicks": {"A": 1, "B": 2}, "goal": "x"}
+    set_, merge, append = diff_state(old, new)
+    assert (set_, merge, append) == ({"keys": 5}, {"clicks": {"B": 2}}, {"pauses": [2]})
+    assert apply_delta(dict(old, pauses=[1], clicks={"A": 1}),
+                       {"set": set_, "merge": merge, "append": append}) == new
+
+
+def test_journal_recovers_snapshot_plus_deltas_and_ignores_torn_line(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    now = [100.0]
+    journal = CheckpointJournal(path, snapshot_every=300, clock=lambda: now[0])
+    journal.checkpoint({"keys": 1, "pauses": []})
+    now[0] = 105.0
+    journal.checkpoint({"keys": 4, "pauses": [{"duration": 3}]})
+    journal.checkpoint({"keys": 4, "pauses": [{"duration": 3}]})    # unchanged: nothing written
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"t": "delta", "set": {"ke')
+    assert (journal.snapshots_written, journal.deltas_written) == (1, 1)
+
+    state, last = CheckpointJournal.load(path)
+    assert state == {"keys": 4, "pauses": [{"duration": 3}]}
+    assert last == 105.0
+    assert CheckpointJournal.load(path, max_age=60, clock=lambda: 200.0) is None
+
+    journal.finish()
+    assert CheckpointJournal.load(path) is None
@@ -0,0 +1,56 @@
+from classifier import TitleClassifier, _MultiMatcher
+
+
+def test_longest_term_wins_but_prefix_terms_are_still_found():
+    matcher = _MultiMatcher({"short": ["Face"], "long": ["Facebook"], "other": ["book"]})
+    # One regex position matches "facebook"; "face" (a prefix) and "book" (inside) are recovered
+    assert matcher.kinds("facebook - messages") == {"short", "long", "other"}
+    assert matcher.kinds("face time") == {"short"}
+    assert matcher.kinds("") == set()
+
+
+def test_overlapping_terms_found_at_every_position():
+    matcher = _MultiMatcher({"a": ["you"], "b": ["youtube"], "c": ["tube"]})
+    assert matcher.kinds("youtube") == {"a", "b", "c"}
+    assert matcher.kinds("the tube map") == {"c"}
+
+
+def test_word_bounded_kinds_need_word_edges():
+    matcher = _MultiMatcher({"browser": ["arc"], "app": ["arc"]}, word_bounded=("browser",))
+    assert matcher.kinds("searching") == {"app"}
+    assert matcher.kinds("arc - new tab") == {"browser", "app"}
+
+
+def test_empty_matcher():
+    assert _MultiMatcher({"x": ["", ""]}).kinds("anything") == set()
+
+
+def make_classifier():
+    return TitleClassifier(
+        system_processes=["Dock", "loginwindow"],
+        distracting_apps=["YouTube", "WhatsApp"],
+        productive_apps=["VSCode", "Terminal"],
+        browser_distractions=["Reddit", "YouTube"],
+        app_categories={"coding": ["VSCode"], "chat": ["WhatsApp"]},
+    )
+
+
+def test_classify_titles_and_tabs():
+    classifier = make_classifier()
+    code = classifier.classify("VSCode")
+    assert (code.productive, code.distracting, code.category) == (True, False, "coding")
+
+    tab = classifier.classify("Google Chrome", "r/python - Reddit")
+    assert (tab.browser, tab.distracting_tab, tab.distracting, tab.category) == (True, True, True, "distracting")
+    assert not classifier.classify("Google Chrome", "Docs").distracting
+
+    assert classifier.classify("Dock").system
+    assert classifier.classify("Zoom (is sharing your screen)").system
+    assert classifier.classify("x").system     # too short to be a real window
+
+
+def test_classify_is_memoized_on_normalized_title():
+    classifier = make_classifier()
+    first = classifier.classify("  WhatsApp ")
+    assert classifier.classify("whatsapp") is first
+    assert classifier.memo_size() == 1
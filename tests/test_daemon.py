@@ -0,0 +1,114 @@
+import asyncio
+import json
+import os
+import socket
+import stat
+import threading
+import time
+
+import pytest
+
+import daemon
+from daemon import SessionDaemon, connect, parse_address, read_token
+
+
+class RunningDaemon:
+    """SessionDaemon on its own loop thread; sessions echo their context and first command"""
+
+    def __init__(self, address, token_path):
+        self.sessions = []
+
+        async def session(user_context, readline, stream):
+            line = await readline()
+            self.sessions.append((user_context, line.strip()))
+            stream.write(json.dumps({"type": "ack", "context": user_context}) + "\n")
+
+        self.daemon = SessionDaemon(session, address=address, idle_exit=0, token_path=token_path)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self.daemon.serve(),), daemon=True)
+        self.thread.start()
+        deadline = time.monotonic() + 5
+        while self.daemon._server is None or not self.daemon._server.is_serving():
+            assert time.monotonic() < deadline, "daemon did not start"
+            time.sleep(0.01)
+
+    def tcp_address(self):
+        host, port = self.daemon._server.sockets[0].getsockname()[:2]
+        return f"tcp:{host}:{port}"
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.daemon.close)
+        self.thread.join(5)
+
+
+def exchange(sock, *lines):
+    sock.sendall("".join(line + "\n" for line in lines).encode("utf-8"))
+    sock.settimeout(5)
+    data = b""
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    sock.close()
+    return [json.loads(line) for line in data.decode("utf-8").splitlines()]
+
+
+def test_parse_address():
+    assert parse_address("unix:/tmp/leo.sock") == ("unix", "/tmp/leo.sock")
+    assert parse_address("tcp:127.0.0.1:47820") == ("tcp", ("127.0.0.1", 47820))
+    with pytest.raises(ValueError):
+        parse_address("pipe:leo")
+
+
+def test_tcp_requires_the_token(tmp_path):
+    token_path = str(tmp_path / "daemon.token")
+    running = RunningDaemon("tcp:127.0.0.1:0", token_path)
+    try:
+        address = running.tcp_address()
+        assert stat.S_IMODE(os.stat(token_path).st_mode) == 0o600
+
+        host, port = parse_address(address)[1]
+        intruder = socket.create_connection((host, port), timeout=5)
+        assert exchange(intruder, "OPEN stealing", "START") == [{"type": "error", "message": "Not authorized"}]
+        intruder = socket.create_connection((host, port), timeout=5)
+        assert exchange(intruder, "AUTH " + "0" * 64, "PING")[0]["type"] == "error"
+
+        assert exchange(connect(address, token_path=token_path), "PING") == [{"type": "pong"}]
+        assert exchange(connect(address, token_path=token_path), "OPEN coding", "START") == \
+            [{"type": "ack", "context": "coding"}]
+        assert running.sessions == [("coding", "START")]
+    finally:
+        running.stop()
+    assert read_token(token_path) is None     # removed on exit
+
+
+def test_tcp_client_without_token_file_cannot_connect(tmp_path):
+    running = RunningDaemon("tcp:127.0.0.1:0", str(tmp_path / "daemon.token"))
+    try:
+        assert connect(running.tcp_address(), token_path=str(tmp_path / "missing.token")) is None
+    finally:
+        running.stop()
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="no unix sockets")
+def test_unix_socket_is_owner_only_from_bind(tmp_path, monkeypatch):
+    path = str(tmp_path / "run" / "daemon.sock")
+    modes = []
+    real_start = asyncio.start_unix_server
+
+    async def start_and_look(*args, **kwargs):
+        server = await real_start(*args, **kwargs)
+        modes.append(stat.S_IMODE(os.stat(path).st_mode))    # before serve() could chmod anything
+        return server
+
+    monkeypatch.setattr(daemon.asyncio, "start_unix_server", start_and_look)
+    running = RunningDaemon("unix:" + path, str(tmp_path / "unused.token"))
+    try:
+        assert modes == [0o600]
+        assert exchange(connect("unix:" + path), "PING") == [{"type": "pong"}]
+        current = os.umask(0o022)
+        os.umask(current)
+        assert current != 0o177     # restored after bind
+    finally:
+        running.stop()
@@ -0,0 +1,11 @@
+from doc_cache import DocumentNameCache
+
+
+def test_reset_drops_entries_and_counters():
+    cache = DocumentNameCache(ttl=60, clock=lambda: 0.0)
+    assert cache.get("Word", lambda title: "report.docx") == "report.docx"
+    assert cache.get("Word", lambda title: "other.docx") == "report.docx"
+    assert cache.stats()["hits"] == 1
+    cache.reset()
+    assert cache.stats() == {"hits": 0, "misses": 0, "evictions": 0, "size": 0, "hit_rate": 0.0}
+    assert cache.get("Word", lambda title: "other.docx") == "other.docx"
@@ -0,0 +1,48 @@
+from event_log import EventLog, EventType
+
+
+def test_columns_grow_a_chunk_at_a_time():
+    log = EventLog(chunk_size=4, clock=lambda: 0.0)
+    for i in range(5):
+        log.append(EventType.FOREGROUND, "Code", at=float(i))
+    assert len(log) == 5
+    # Five rows need two chunks; the spare slots are not events
+    assert len(log._times) == 8
+    assert [at for at, _, _ in log] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    before = log.memory_bytes()
+    for i in range(5, 8):
+        log.append(EventType.FOREGROUND, "Code", at=float(i))
+    assert log.memory_bytes() == before
+
+
+def test_titles_are_interned_once():
+    log = EventLog(clock=lambda: 0.0)
+    log.append(EventType.FOREGROUND, "Code", at=1.0)
+    log.append(EventType.BACKGROUND, "Code", at=2.0)
+    log.append(EventType.FOREGROUND, "Chrome", at=2.0)
+    log.append(EventType.CLOSED, "Chrome", at=3.0)
+    assert log.titles() == ["Code", "Chrome"]
+    assert log.intern("Code") == 0
+    assert list(log) == [(1.0, "Code", EventType.FOREGROUND), (2.0, "Code", EventType.BACKGROUND),
+                         (2.0, "Chrome", EventType.FOREGROUND), (3.0, "Chrome", EventType.CLOSED)]
+
+
+def test_range_includes_start_and_excludes_end():
+    log = EventLog(chunk_size=2, clock=lambda: 0.0)
+    for at, title in [(1.0, "A"), (2.0, "B"), (2.0, "C"), (3.0, "D"), (5.0, "E")]:
+        log.append(EventType.FOREGROUND, title, at=at)
+    assert [title for _, title, _ in log.range(2.0, 3.0)] == ["B", "C"]
+    assert [title for _, title, _ in log.range(2.5)] == ["D", "E"]
+    assert [title for _, title, _ in log.range(end=2.0)] == ["A"]
+    # Past the last event: nothing, and the unused chunk slots are never read
+    assert list(log.range(6.0)) == []
+    assert len(list(log.range())) == 5
+
+
+def test_default_timestamps_come_from_the_clock():
+    now = [10.0]
+    log = EventLog(clock=lambda: now[0])
+    log.append(EventType.FOREGROUND, "Code")
+    now[0] = 12.5
+    log.append(EventType.FOREGROUND, "Chrome")
+    assert [at for at, _, _ in log] == [10.0, 12.5]
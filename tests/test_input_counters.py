@@ -0,0 +1,32 @@
+import pytest
+
+from input_counters import InputAggregator, MouseMotionSampler
+
+
+def test_flush_returns_increments_since_previous_flush():
+    aggregator = InputAggregator(clock=lambda: 5.0)
+    keyboard = aggregator.slot("keyboard")
+    mouse = aggregator.slot("mouse")
+    keyboard.add("key_presses", 3)
+    mouse.add("mouse_clicks")
+    assert aggregator.flush() == {"key_presses": 3, "mouse_clicks": 1}
+    keyboard.add("key_presses")
+    assert aggregator.flush() == {"key_presses": 1}
+    assert aggregator.flush() == {}
+    assert aggregator.last_input() == 5.0
+
+
+def test_mouse_sampler_measures_distance_not_event_rate():
+    now = [0.0]
+    aggregator = InputAggregator(clock=lambda: now[0])
+    sampler = MouseMotionSampler(aggregator.slot("mouse"), sample_interval=0.02, clock=lambda: now[0])
+    # 1000 Hz along a 3-4-5 line, then a long pause and one nudge
+    for step in range(101):
+        now[0] = step / 1000
+        sampler.on_move(3 * step, 4 * step)
+    now[0] = 10.0
+    sampler.on_move(300, 404)
+    deltas = aggregator.flush()
+    # Samples every 20 ms: (0, 0) ... (300, 400), then 4 px
+    assert deltas["mouse_distance"] == pytest.approx(504.0)
+    assert deltas["mouse_active_seconds"] == pytest.approx(0.1 + 0.25)
@@ -0,0 +1,55 @@
+from llm_cache import ResponseCache, cache_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_covers_every_input():
+    base = cache_key("groq", "llama", "prompt", 100, 0.2)
+    assert base == cache_key("groq", "llama", "prompt", 100, 0.2)
+    assert len({base, cache_key("ollama", "llama", "prompt", 100, 0.2),
+                cache_key("groq", "llama", "prompt!", 100, 0.2),
+                cache_key("groq", "llama", "prompt", 101, 0.2),
+                cache_key("groq", "llama", "prompt", 100, 0.3)}) == 5
+
+
+def test_hit_miss_and_ttl(tmp_path):
+    clock = Clock()
+    cache = ResponseCache(str(tmp_path / "cache" / "llm.sqlite3"), ttl=60, clock=clock)
+    assert cache.get("k") is None
+    cache.put("k", "Bene.")
+    clock.now = 59
+    assert cache.get("k") == "Bene."
+    clock.now = 61
+    assert cache.get("k") is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "evictions": 0, "hit_rate": 0.333}
+    cache.close()
+
+
+def test_survives_reopening(tmp_path):
+    path = str(tmp_path / "llm.sqlite3")
+    cache = ResponseCache(path, clock=Clock())
+    cache.put("k", "persisted")
+    cache.close()
+    assert ResponseCache(path, clock=Clock()).get("k") == "persisted"
+
+
+def test_least_recently_used_is_evicted_first(tmp_path):
+    clock = Clock()
+    cache = ResponseCache(str(tmp_path / "llm.sqlite3"), max_bytes=25, clock=clock)
+    cache.put("a", "x" * 10)
+    clock.now = 1
+    cache.put("b", "y" * 10)
+    clock.now = 2
+    assert cache.get("a") == "x" * 10     # a is now more recent than b
+    clock.now = 3
+    cache.put("c", "z" * 10)
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 10 and cache.get("c") == "z" * 10
+    assert cache.evictions == 1
+    cache.close()
@@ -0,0 +1,113 @@
+import threading
+import time
+
+import pytest
+
+from llm_failover import ChainExhausted, CircuitBreaker, LatencyTracker, ProviderChain
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_after_threshold_and_lets_one_trial_through():
+    clock = Clock()
+    breaker = CircuitBreaker(threshold=2, reset_after=30, clock=clock)
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now = 30
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()      # only one trial at a time
+    breaker.record_failure()        # the trial failed: open again, for a full period
+    assert breaker.state == "open"
+
+    clock.now = 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow() and breaker.allow()
+
+
+def test_latency_p95_needs_enough_samples():
+    tracker = LatencyTracker(min_samples=5)
+    for seconds in (0.1, 0.2, 0.3, 0.4):
+        tracker.add(seconds)
+    assert tracker.p95() is None
+    tracker.add(2.0)
+    assert tracker.p95() == 2.0
+
+
+def provider(answer=None, error=None, delay=0.0):
+    def ask(prompt, max_tokens, temperature):
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        return answer
+    return ask
+
+
+def test_chain_fails_over_to_the_next_provider():
+    chain = ProviderChain([("groq", provider(error=RuntimeError("down"))), ("ollama", provider("Bene."))])
+    assert chain.call(("p", 10, 0.2), budget=5) == ("Bene.", "ollama")
+    assert chain.failovers == 1
+
+
+def test_chain_hedges_a_slow_provider():
+    chain = ProviderChain([("groq", provider("slow", delay=1.0)), ("ollama", provider("fast"))],
+                          default_hedge=0.05)
+    assert chain.call(("p", 10, 0.2), budget=5) == ("fast", "ollama")
+    assert chain.hedges == 1
+
+
+def test_chain_uses_fallback_or_raises_when_out_of_budget():
+    chain = ProviderChain([("groq", provider("late", delay=0.5))], default_hedge=10)
+    assert chain.call(("p", 10, 0.2), budget=0.1, fallback=lambda: "template") == ("template", "fallback")
+    with pytest.raises(ChainExhausted):
+        chain.call(("p", 10, 0.2), budget=0.1)
+
+
+def test_timed_out_attempt_is_counted_once():
+    release = threading.Event()
+    late = []
+
+    def slow(prompt, max_tokens, temperature):
+        release.wait(2)
+        late.append(prompt)
+        raise RuntimeError("late failure")
+
+    chain = ProviderChain([("groq", slow)], default_hedge=10)
+    assert chain.call(("p", 10, 0.2), budget=0.05, fallback=lambda: "template") == ("template", "fallback")
+    assert chain.breakers["groq"]._failures == 1
+    # The attempt ends after the budget: its callback must not count it again
+    release.set()
+    deadline = time.monotonic() + 2
+    while not late and time.monotonic() < deadline:
+        time.sleep(0.01)
+    chain._executor.shutdown(wait=True)
+    assert chain.breakers["groq"]._failures == 1
+
+
+def test_open_breaker_skips_the_provider():
+    calls = []
+
+    def failing(prompt, max_tokens, temperature):
+        calls.append(prompt)
+        raise RuntimeError("down")
+
+    chain = ProviderChain([("groq", failing), ("ollama", provider("ok"))])
+    for _ in range(3):
+        chain.call(("p", 10, 0.2), budget=5)
+    deadline = time.monotonic() + 2
+    while chain.breakers["groq"].state != "open" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert chain.breakers["groq"].state == "open"
+    chain.call(("p", 10, 0.2), budget=5)
+    assert len(calls) == 3
+    assert chain.stats()["providers"]["groq"]["state"] == "open"
@@ -0,0 +1,67 @@
+import pytest
+
+from os_helper import OSHelperError, OSQueryClient
+
+
+@pytest.fixture
+def client():
+    client = OSQueryClient(backend="standin", timeout=5.0)
+    yield client
+    client.close()
+
+
+def test_standin_helper_answers_pipelined_requests(client):
+    futures = [client.submit("ping") for _ in range(20)]
+    assert [f.result(timeout=5) for f in futures] == ["pong"] * 20
+    assert isinstance(client.snapshot()["windows"], list)
+
+
+def test_crash_fails_pending_and_next_query_restarts(client):
+    assert client.query("ping") == "pong"
+    first_pid = client._proc.pid
+    with pytest.raises(OSHelperError):
+        client.query("applescript", source="crash")
+    assert client.query("ping") == "pong"
+    assert client.restarts == 1
+    assert client._proc.pid != first_pid
+
+
+def test_timeout_kills_helper_and_fails_queued_requests(client):
+    client.timeout = 0.3
+    assert client.query("ping") == "pong"
+    hung_pid = client._proc.pid
+
+    hung = client.submit("applescript", source="delay 30")
+    queued = client.submit("ping")   # stuck behind the hung script
+    with pytest.raises(OSHelperError):
+        client.query("ping")
+    with pytest.raises(OSHelperError):
+        queued.result(timeout=1)
+    with pytest.raises(OSHelperError):
+        hung.result(timeout=1)
+    assert client._proc.poll() is not None
+
+    client.timeout = 5.0
+    assert client.query("ping") == "pong"
+    assert client._proc.pid != hung_pid
+
+
+def test_restart_budget_is_per_window():
+    now = [0.0]
+    client = OSQueryClient(backend="standin", timeout=5.0, max_restarts=2, restart_window=60.0,
+                           clock=lambda: now[0])
+    try:
+        for _ in range(3):
+            with pytest.raises(OSHelperError):
+                client.query("applescript", source="crash")
+            client._proc.wait(timeout=5)
+        assert client.restarts == 2
+        assert not client.available()
+        with pytest.raises(OSHelperError):
+            client.query("ping")
+
+        now[0] = 61.0   # the old restarts left the window
+        assert client.available()
+        assert client.query("ping") == "pong"
+    finally:
+        client.close()
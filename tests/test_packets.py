@@ -0,0 +1,68 @@
+import io
+import json
+
+import pytest
+
+from packets import PACKET_TAGS, FramedWriter, JsonLinesWriter, read_frames
+
+
+def sample_packets():
+    return [
+        {"type": "update", "active_window": "Code (trackers.py)", "keys": 12, "top_apps": [["Code", 3.5]]},
+        {"type": "leo_comment", "content": "Bene! La tua virtù brilla.", "focus_score": 82},
+        {"type": "report_chunk", "seq": 0, "content": "# Codex"},
+        {"type": "custom_packet", "value": None},
+    ]
+
+
+def test_json_lines_batch_is_one_line_per_packet():
+    stream = io.StringIO()
+    JsonLinesWriter(stream).write_many(sample_packets())
+    assert [json.loads(line) for line in stream.getvalue().splitlines()] == sample_packets()
+
+
+@pytest.mark.parametrize("framing", ["msgpack", "cbor"])
+def test_frames_round_trip(framing):
+    pytest.importorskip({"msgpack": "msgpack", "cbor": "cbor2"}[framing])
+    stream = io.BytesIO()
+    writer = FramedWriter(stream, framing)
+    writer.write_many(sample_packets()[:2])
+    writer.write(sample_packets()[2])
+    writer.write(sample_packets()[3])
+
+    stream.seek(0)
+    frames = list(read_frames(stream, framing))
+    assert [name for name, _ in frames] == ["update", "leo_comment", "report_chunk", "unknown"]
+    assert [packet for _, packet in frames] == sample_packets()
+
+
+def test_frame_header_carries_length_and_tag():
+    pytest.importorskip("msgpack")
+    frame = FramedWriter(io.BytesIO(), "msgpack").encode({"type": "report", "content": "x"})
+    assert int.from_bytes(frame[:4], "big") == len(frame) - 5
+    assert frame[4] == PACKET_TAGS["report"]
+
+
+def test_truncated_stream_ends_iteration():
+    pytest.importorskip("msgpack")
+    stream = io.BytesIO()
+    FramedWriter(stream, "msgpack").write({"type": "status", "message": "ok"})
+    stream = io.BytesIO(stream.getvalue() + b"\x00\x00")
+    assert [name for name, _ in read_frames(stream)] == ["status"]
+
+
+def test_unavailable_codec_is_refused():
+    with pytest.raises(ValueError):
+        FramedWriter(io.BytesIO(), "protobuf")
+
+
+def test_delta_encoder_sends_full_then_changed_fields():
+    from packets import DeltaEncoder
+
+    encoder = DeltaEncoder()
+    assert encoder.encode({"keys": 1, "switches": 0}) == {"type": "update", "full": True, "keys": 1, "switches": 0}
+    assert encoder.encode({"keys": 1, "switches": 0}) is None
+    assert encoder.encode({"keys": 4, "switches": 0}) == {"type": "update", "keys": 4}
+    assert encoder.encode({"keys": 4, "switches": 0, "top_apps": []}) == {"type": "update", "top_apps": []}
+    encoder.reset()
+    assert encoder.encode({"keys": 4})["full"] is True
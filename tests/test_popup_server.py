@@ -0,0 +1,62 @@
+import time
+
+import pytest
+
+from popup_server import HeadlessPopup, PopupClient, scolding_text
+
+
+def wait_reply(client, request_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        reply = client.replies.get(timeout=max(0.01, deadline - time.monotonic()))
+        if reply["id"] == request_id:
+            return reply
+    raise AssertionError(f"no reply to {request_id}")
+
+
+@pytest.fixture
+def client():
+    client = PopupClient(headless=True)
+    yield client
+    client.close()
+
+
+def test_headless_popup_remembers_the_message():
+    popup = HeadlessPopup()
+    assert popup.show("YouTube") == {"visible": True, "shown": 1}
+    assert popup.message == scolding_text("YouTube")
+    assert popup.hide() == {"visible": False}
+    assert not popup.visible
+
+
+def test_crashed_server_is_restarted_and_the_command_resent(client):
+    assert wait_reply(client, client.send("ping"))["result"] == {"backend": "headless"}
+    client._proc.kill()
+    client._proc.wait()
+
+    reply = wait_reply(client, client.show("Instagram"))
+    assert reply["result"] == {"visible": True, "shown": 1}   # a fresh server
+    assert client.restarts == 1
+    assert client.degraded is None
+
+
+def test_out_of_restarts_degrades_to_in_process_headless_popup():
+    now = [0.0]
+    client = PopupClient(headless=True, max_restarts=1, restart_window=60.0, clock=lambda: now[0])
+    try:
+        for _ in range(2):
+            wait_reply(client, client.send("ping"))
+            client._proc.kill()
+            client._proc.wait()
+
+        reply = wait_reply(client, client.show("Reddit"))   # no PopupError
+        assert reply["result"]["visible"] is True
+        assert client.degraded.message == scolding_text("Reddit")
+        assert client.restarts == 1
+
+        now[0] = 61.0
+        assert wait_reply(client, client.send("ping"))["result"] == {"backend": "headless"}
+        assert client.degraded is None
+        assert client.restarts == 2
+    finally:
+        client.close()
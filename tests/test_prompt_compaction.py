@@ -0,0 +1,74 @@
+import pytest
+
+import prompt_compaction
+from prompt_compaction import (compact_text, compact_windows, estimate_tokens, heuristic_tokens,
+                               set_tokenizer, short_doc, split_title)
+
+
+@pytest.fixture(autouse=True)
+def heuristic_counts():
+    # Budgets below are in estimated tokens, whatever tokenizer this machine has
+    set_tokenizer("heuristic")
+    yield
+    prompt_compaction._counter = None
+
+
+def test_heuristic_counts_words_and_punctuation():
+    assert heuristic_tokens("") == 0
+    assert heuristic_tokens("focus") == 2
+    assert heuristic_tokens("Bene, ragazzo!") == 5
+    assert estimate_tokens("Bene, ragazzo!") == 5
+
+
+def test_unavailable_tokenizer_falls_back_to_heuristic(capsys):
+    assert set_tokenizer("tiktoken:no_such_encoding") == "heuristic"
+    assert set_tokenizer("sentencepiece:x") == "heuristic"
+    assert "estimating tokens" in capsys.readouterr().err
+    assert estimate_tokens("one two") == 2
+
+
+def test_split_title_redacts_but_keeps_the_file_name():
+    assert split_title("VSCode (/Users/me/projects/leonardo/trackers.py - leonardo)") == \
+        ("VSCode", "…/trackers.py - leonardo")
+    assert split_title("Chrome (Inbox (3) - someone@example.com - Gmail - Google Chrome)") == \
+        ("Chrome", "Inbox - email@… - Gmail")
+    assert split_title("Finder (/Users/me/)") == ("Finder", "…/me")
+    assert split_title("Bank (Account 12345678)") == ("Bank", "Account ####")
+    assert split_title("(2) WhatsApp") == ("WhatsApp", "")
+
+
+def test_short_doc_keeps_the_site():
+    assert short_doc("Lecture 7 - Fourier transforms and the FFT, part two - YouTube") == "Lecture 7 - YouTube"
+    assert short_doc("A very long document title without any separators in it") == \
+        "A very long document title with…"
+    assert short_doc("short") == "short"
+
+
+def test_compact_windows_merges_ranks_and_folds_the_tail():
+    windows = {
+        "Google Chrome (Lecture 7 - Fourier transforms - YouTube - Google Chrome)": 11.0,
+        "Google Chrome (Lecture 7 - Fourier transforms - YouTube)": 3.0,
+        "VSCode (/Users/me/leonardo/trackers.py - leonardo)": 9.0,
+        "(3) WhatsApp": 2.0,
+        "Notion (Exam prep)": 1.0,
+        "Mail (Inbox)": 1.0,
+    }
+    lines, tokens = compact_windows(windows, token_budget=30)
+    assert lines == ["Google Chrome: Lecture 7 - YouTube 52%", "VSCode: …/trackers.py - leonardo 33%",
+                     "+3 others 15%"]
+    assert tokens == sum(estimate_tokens(line) + 1 for line in lines)
+
+    everything, _ = compact_windows(windows, token_budget=1000)
+    assert len(everything) == 5 and not any(line.startswith("+") for line in everything)
+
+
+def test_compact_windows_empty():
+    assert compact_windows({}) == ([], 0)
+
+
+def test_compact_text_keeps_whole_sentences_within_budget():
+    text = "Deep work on the parser. Then a short YouTube break. Back to tests afterwards."
+    assert compact_text(text, token_budget=1000) == text
+    assert compact_text(text, token_budget=8) == "Deep work on the parser."
+    shortened = compact_text("a" * 200, token_budget=10)
+    assert shortened.endswith("…")
@@ -0,0 +1,49 @@
+import json
+import os
+
+from session_log import SessionLogger
+
+
+def read_records(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_packets_are_logged_by_type_unless_contents_opted_in(tmp_path):
+    path = str(tmp_path / "logs" / "debug.jsonl")
+    logger = SessionLogger(path, update_every=0)
+    logger.log_packet({"type": "update", "active_window": "Chrome (Bank statement)"})
+    logger._write_batch()
+    record = read_records(path)[0]
+    assert (record["kind"], record["type"]) == ("packet", "update")
+    assert "packet" not in record
+
+    verbose = SessionLogger(path, update_every=0, log_contents=True)
+    verbose.log_packet({"type": "leo_comment", "content": "Bene."})
+    verbose._write_batch()
+    assert read_records(path)[1]["packet"] == {"type": "leo_comment", "content": "Bene."}
+
+
+def test_age_of_an_existing_file_counts_from_its_timestamp(tmp_path):
+    path = str(tmp_path / "debug.jsonl")
+    with open(path, "w") as f:
+        f.write('{"kind": "old"}\n')
+    os.utime(path, (1000.0, 1000.0))
+    now = [1000.0 + 25 * 3600]
+    logger = SessionLogger(path, compress=False, clock=lambda: now[0])
+    logger.log({"kind": "new"})
+    logger._write_batch()
+    assert logger.rotations == 1
+    assert [r["kind"] for r in read_records(path + ".1")] == ["old"]
+    assert [r["kind"] for r in read_records(path)] == ["new"]
+
+
+def test_rotation_by_size_keeps_backups(tmp_path):
+    path = str(tmp_path / "debug.jsonl")
+    logger = SessionLogger(path, max_bytes=200, backups=2, compress=True, clock=lambda: 0.0)
+    for batch in range(4):
+        logger.log({"kind": "debug", "data": "x" * 150, "batch": batch})
+        logger._write_batch()
+    assert logger.rotations == 3
+    assert os.path.exists(path + ".1.gz") and os.path.exists(path + ".2.gz")
+    assert not os.path.exists(path + ".3.gz")
@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+
+from llm_failover import ProviderChain, StreamGate
+from packets import ChunkCoalescer
+
+
+def test_coalescer_first_piece_at_once_then_merged():
+    now = [0.0]
+    packets = []
+    chunks = ChunkCoalescer(packets.append, min_interval=0.05, clock=lambda: now[0])
+    chunks.add("Hel")
+    chunks.add("lo")
+    now[0] = 0.1
+    chunks.add(" world")
+    chunks.add("!")
+    chunks.flush()
+    assert [(p["seq"], p["content"]) for p in packets] == [(0, "Hel"), (1, "lo world"), (2, "!")]
+
+
+def test_coalescer_reset_restarts_seq_and_close_drops_late_pieces():
+    packets = []
+    chunks = ChunkCoalescer(packets.append, min_interval=0.0)
+    chunks.add("half an ans")
+    chunks.reset()
+    chunks.add("Whole answer")
+    chunks.close()
+    chunks.add("late")
+    chunks.reset()
+    assert packets == [
+        {"type": "report_chunk", "seq": 0, "content": "half an ans"},
+        {"type": "report_chunk", "seq": 0, "content": "", "reset": True},
+        {"type": "report_chunk", "seq": 1, "content": "Whole answer"},
+    ]
+
+
+def test_stream_gate_mutes_earlier_attempts_and_resets_once():
+    events = []
+    gate = StreamGate(lambda text: events.append(text), lambda: events.append("<reset>"))
+    first = gate.attempt()
+    first("Gro")
+    second = gate.attempt()
+    first("q late")            # the failed attempt keeps talking
+    second("Olla")
+    second("ma")
+    gate.close()
+    second("!")
+    assert events == ["Gro", "<reset>", "Olla", "ma"]
+    assert gate.resets == 1
+
+
+def _chain(*providers):
+    return ProviderChain(list(providers), default_hedge=0.05)
+
+
+def test_failover_mid_stream_resets_and_late_provider_stays_muted():
+    events = []
+    release = threading.Event()
+
+    def broken(prompt, max_tokens, temperature, stream=None):
+        on_chunk = stream.attempt()
+        on_chunk("partial")
+        raise RuntimeError("connection dropped")
+
+    def slow(prompt, max_tokens, temperature, stream=None):
+        on_chunk = stream.attempt()
+        release.wait(2)
+        on_chunk("too late")
+        return "too late"
+
+    gate = StreamGate(events.append, lambda: events.append("<reset>"))
+    chain = _chain(("groq", broken), ("ollama", slow))
+    result, source = chain.call(("p", 10, 0.2), budget=0.3, fallback=lambda: "template", hedge=False,
+                                stream=gate)
+    gate.replace(result)
+    gate.close()
+    release.set()
+    chain._executor.shutdown(wait=True)
+    assert (result, source) == ("template", "fallback")
+    assert events == ["partial", "<reset>", "template"]
+
+
+def test_ollama_stream_failure_after_first_token_raises(monkeypatch):
+    llm_client_2 = pytest.importorskip("llm_client_2")
+
+    class Response:
+        def iter_lines(self):
+            yield b'{"response": "Bene", "done": false}'
+            raise ConnectionError("reset by peer")
+
+    monkeypatch.setattr(llm_client_2, "post_json", lambda *args, **kwargs: Response())
+    received = []
+    with pytest.raises(ConnectionError):
+        llm_client_2.ask_llm_ollama("p", on_chunk=received.append)
+    assert received == ["Bene"]
@@ -0,0 +1,57 @@
+import json
+import sys
+
+import pytest
+
+from accounting import AccountingEngine
+from window_source import PollingWindowSource, ReplayWindowSource, create_window_source
+
+
+def replay_into_engine(events, end):
+    """Deliver a scripted replay (synthetic timestamps from 0) into an accounting engine"""
+    engine = AccountingEngine(clock=lambda: end)
+    source = ReplayWindowSource(events, realtime=False, start_time=0.0)
+    source.start(lambda title, now: engine.switch(title, now))
+    source.join(2)
+    return engine
+
+
+def test_replay_timestamps_drive_per_app_seconds():
+    engine = replay_into_engine([(0, "VSCode"), (10, "Chrome"), (25, "VSCode"), (40, None)], end=100)
+    snapshot = engine.snapshot(include_background=True)
+    assert snapshot.foreground == {"VSCode": pytest.approx(25.0), "Chrome": pytest.approx(15.0)}
+    # Chrome first seen at 10, in front for 15 s, gone at the end: 75 s not in front
+    assert snapshot.background["Chrome"] == pytest.approx(75.0)
+    assert snapshot.current is None
+
+
+def test_replay_skips_repeated_titles():
+    seen = []
+    source = ReplayWindowSource([(0, "A"), (1, "A"), (2, "B")], realtime=False, start_time=0.0)
+    source.start(lambda title, now: seen.append((title, now)))
+    source.join(2)
+    assert seen == [("A", 0.0), ("B", 2.0)]
+
+
+def test_replay_from_file(tmp_path):
+    script = tmp_path / "replay.jsonl"
+    script.write_text("\n".join(json.dumps(e) for e in [{"t": 0, "title": "Notes"}, {"t": 5, "title": "Mail"}]))
+    engine = AccountingEngine(clock=lambda: 8.0)
+    source = ReplayWindowSource.from_file(str(script), realtime=False, start_time=0.0)
+    source.start(lambda title, now: engine.switch(title, now))
+    source.join(2)
+    assert engine.snapshot().foreground == {"Notes": pytest.approx(5.0), "Mail": pytest.approx(3.0)}
+
+
+def test_late_switch_never_counts_negative_time():
+    engine = AccountingEngine(clock=lambda: 20.0)
+    engine.switch("A", 10.0)
+    engine.switch("B", 5.0)      # delivered out of order
+    assert engine.snapshot().foreground["A"] == 0.0
+
+
+def test_native_polls_on_macos(monkeypatch):
+    monkeypatch.setattr(sys, "platform", "darwin")
+    monkeypatch.setenv("LEO_WINDOW_SOURCE", "native")
+    source = create_window_source(lambda: "VSCode")
+    assert isinstance(source, PollingWindowSource)